@@ -0,0 +1,389 @@
+"""ベンチマーク用のメモリ上の Discord の代用品
+
+ギルド・ロール・チャンネル・メンバー・メッセージを discord.py と同じ使い方で扱えるようにし、
+API の呼び出しはすべて FakeHTTP を通して数える。FakeHTTP は呼び出しごとの遅延と、
+経路ごとのレート制限（一定時間あたりの回数）を再現する。
+"""
+import asyncio
+import itertools
+import time
+from collections import Counter
+from typing import Dict, Iterable, List, Optional, Tuple
+
+import discord
+
+# 経路ごとのレート制限の既定値：経路 → (回数, 秒)。実際の値は公開されていないため目安
+DEFAULT_RATE_LIMITS: Dict[str, Tuple[int, float]] = {
+    "create_role": (50, 10.0),
+    "edit_role": (50, 10.0),
+    "delete_role": (50, 10.0),
+    "create_channel": (50, 10.0),
+    "edit_channel": (50, 10.0),
+    "delete_channel": (50, 10.0),
+    "send_message": (5, 5.0),
+    "delete_message": (5, 1.0),
+    "add_reaction": (1, 0.25),
+    "edit_member": (10, 10.0),
+    "member_role": (10, 10.0),
+    "fetch_member": (50, 1.0),
+}
+
+_ids = itertools.count(10 ** 17)
+
+
+def next_id() -> int:
+    return next(_ids)
+
+
+class RateLimitBucket:
+    """window 秒ごとに limit 回まで通すバケット"""
+
+    def __init__(self, limit: int, window: float):
+        self.limit = limit
+        self.window = window
+        self.remaining = limit
+        self.reset_at = 0.0
+
+
+class FakeHTTP:
+    """API 呼び出しの回数を数え、遅延とレート制限を再現する"""
+
+    def __init__(self, latency: float = 0.0, rate_limits: Optional[Dict[str, Tuple[int, float]]] = None):
+        self.latency = latency
+        self.rate_limits = dict(DEFAULT_RATE_LIMITS if rate_limits is None else rate_limits)
+        self.calls: Counter = Counter()
+        self.ratelimited: Counter = Counter()
+        self.retry_after = 0.0
+        self._buckets: Dict[Tuple[str, object], RateLimitBucket] = {}
+
+    def reset_counters(self) -> None:
+        self.calls.clear()
+        self.ratelimited.clear()
+        self.retry_after = 0.0
+
+    async def call(self, route: str, major: object = None) -> None:
+        """API を1回呼び出す（major はレート制限の単位になるギルド・チャンネルのID）"""
+        self.calls[route] += 1
+        limit = self.rate_limits.get(route)
+        if limit:
+            bucket = self._buckets.get((route, major))
+            if bucket is None:
+                bucket = self._buckets[(route, major)] = RateLimitBucket(*limit)
+            while True:
+                now = time.monotonic()
+                if now >= bucket.reset_at:
+                    bucket.remaining = bucket.limit
+                    bucket.reset_at = now + bucket.window
+                if bucket.remaining > 0:
+                    bucket.remaining -= 1
+                    break
+                # discord.py と同じく、制限が解除されるまで待ってから送り直す
+                wait = bucket.reset_at - now
+                self.ratelimited[route] += 1
+                self.retry_after += wait
+                await asyncio.sleep(wait)
+        if self.latency:
+            await asyncio.sleep(self.latency)
+
+
+class FakeRole:
+    def __init__(self, guild: "FakeGuild", name: str, color=None, hoist: bool = False, position: int = 0):
+        self.id = next_id()
+        self.guild = guild
+        self.name = name
+        self.color = color or discord.Color.default()
+        self.hoist = hoist
+        self.position = position
+
+    def __repr__(self):
+        return f"<FakeRole {self.name}>"
+
+    def __eq__(self, other):
+        return isinstance(other, FakeRole) and other.id == self.id
+
+    def __hash__(self):
+        return self.id >> 22
+
+    @property
+    def mention(self) -> str:
+        return f"<@&{self.id}>"
+
+    @property
+    def members(self) -> List["FakeMember"]:
+        return [member for member in self.guild.members if self in member.roles]
+
+    def is_default(self) -> bool:
+        return self.id == self.guild.id
+
+    async def edit(self, **fields):
+        await self.guild.http.call("edit_role", self.guild.id)
+        for name, value in fields.items():
+            setattr(self, name, value)
+        self.guild.dispatch("guild_role_update", self, self)
+
+    async def delete(self, reason=None):
+        await self.guild.http.call("delete_role", self.guild.id)
+        self.guild.remove_role(self)
+
+
+class _FakeChannelMixin:
+    """テキストチャンネル・カテゴリ・フォーラムの共通部分（discord.py のクラスを継承して isinstance を保つ）"""
+
+    def _setup(self, guild: "FakeGuild", name: str, category=None, overwrites=None, position: int = 0):
+        self.id = next_id()
+        self.guild = guild
+        self.name = name
+        self.category_id = category.id if category else None
+        self.position = position
+        self.nsfw = False
+        self._fake_overwrites = dict(overwrites or {})
+
+    def __repr__(self):
+        return f"<{type(self).__name__} {self.name}>"
+
+    @property
+    def overwrites(self):
+        return dict(self._fake_overwrites)
+
+    @property
+    def category(self):
+        return self.guild.get_channel(self.category_id) if self.category_id else None
+
+    async def edit(self, **fields):
+        await self.guild.http.call("edit_channel", self.guild.id)
+        if "overwrites" in fields:
+            self._fake_overwrites = dict(fields.pop("overwrites"))
+        if "category" in fields:
+            category = fields.pop("category")
+            self.category_id = category.id if category else None
+        for name, value in fields.items():
+            setattr(self, name, value)
+        self.guild.dispatch("guild_channel_update", self, self)
+
+    async def delete(self, reason=None):
+        await self.guild.http.call("delete_channel", self.guild.id)
+        self.guild.remove_channel(self)
+
+
+class FakeCategory(_FakeChannelMixin, discord.CategoryChannel):
+    def __init__(self, guild, name, overwrites=None, position=0):
+        self._setup(guild, name, None, overwrites, position)
+
+    @property
+    def channels(self):
+        return [channel for channel in self.guild.channels if channel.category_id == self.id]
+
+
+class FakeTextChannel(_FakeChannelMixin, discord.TextChannel):
+    def __init__(self, guild, name, category=None, overwrites=None, position=0):
+        self._setup(guild, name, category, overwrites, position)
+        self.topic = None
+        self.messages: Dict[int, FakeMessage] = {}
+
+    async def send(self, content=None, **kwargs):
+        await self.guild.http.call("send_message", self.id)
+        message = FakeMessage(self, content, kwargs.get("embed"))
+        self.messages[message.id] = message
+        return message
+
+    def get_partial_message(self, message_id: int):
+        return self.messages.get(message_id)
+
+
+class FakeForumChannel(_FakeChannelMixin, discord.ForumChannel):
+    def __init__(self, guild, name, category=None, overwrites=None, position=0, topic=None):
+        self._setup(guild, name, category, overwrites, position)
+        self.topic = topic
+
+
+class FakeMessage:
+    def __init__(self, channel: FakeTextChannel, content: Optional[str], embed=None):
+        self.id = next_id()
+        self.channel = channel
+        self.guild = channel.guild
+        self.content = content
+        self.embed = embed
+        self.reactions: List[str] = []
+
+    async def add_reaction(self, emoji):
+        await self.guild.http.call("add_reaction", self.channel.id)
+        self.reactions.append(str(emoji))
+
+    async def delete(self):
+        await self.guild.http.call("delete_message", self.channel.id)
+        self.channel.messages.pop(self.id, None)
+
+
+class FakeMember:
+    def __init__(self, guild: "FakeGuild", name: str, roles: Iterable[FakeRole] = ()):
+        self.id = next_id()
+        self.guild = guild
+        self.name = name
+        self.display_name = name
+        self.bot = False
+        self._roles = list(roles)
+
+    def __repr__(self):
+        return f"<FakeMember {self.name}>"
+
+    @property
+    def roles(self) -> List[FakeRole]:
+        return [self.guild.default_role] + self._roles
+
+    @property
+    def mention(self) -> str:
+        return f"<@{self.id}>"
+
+    def get_role(self, role_id: int) -> Optional[FakeRole]:
+        return next((role for role in self._roles if role.id == role_id), None)
+
+    async def edit(self, roles=None, **fields):
+        await self.guild.http.call("edit_member", self.guild.id)
+        if roles is not None:
+            self._roles = [role for role in (self.guild.get_role(role.id) for role in roles) if role and not role.is_default()]
+
+    async def add_roles(self, *roles, reason=None):
+        for role in roles:
+            await self.guild.http.call("member_role", self.guild.id)
+            if role not in self._roles:
+                self._roles.append(role)
+
+    async def remove_roles(self, *roles, reason=None):
+        for role in roles:
+            await self.guild.http.call("member_role", self.guild.id)
+            if role in self._roles:
+                self._roles.remove(role)
+
+
+class FakeGuild:
+    """メモリ上のギルド（作成・削除は FakeHTTP を通し、ゲートウェイのイベントも Bot に送る）"""
+
+    def __init__(self, http: FakeHTTP, name: str = "ベンチマーク", dispatch=None):
+        self.id = next_id()
+        self.name = name
+        self.http = http
+        self._dispatch = dispatch
+        self._roles: Dict[int, FakeRole] = {}
+        self._channels: Dict[int, _FakeChannelMixin] = {}
+        self._members: Dict[int, FakeMember] = {}
+        default_role = FakeRole(self, "@everyone")
+        default_role.id = self.id
+        self._roles[default_role.id] = default_role
+        self.default_role = default_role
+        self.chunked = True
+
+    def dispatch(self, event: str, *args) -> None:
+        if self._dispatch:
+            self._dispatch(event, *args)
+
+    # キャッシュの参照
+    @property
+    def roles(self) -> List[FakeRole]:
+        return sorted(self._roles.values(), key=lambda role: role.position)
+
+    @property
+    def channels(self):
+        return list(self._channels.values())
+
+    @property
+    def categories(self) -> List[FakeCategory]:
+        return [channel for channel in self._channels.values() if isinstance(channel, FakeCategory)]
+
+    @property
+    def text_channels(self) -> List[FakeTextChannel]:
+        return [channel for channel in self._channels.values() if isinstance(channel, FakeTextChannel)]
+
+    @property
+    def members(self) -> List[FakeMember]:
+        return list(self._members.values())
+
+    @property
+    def member_count(self) -> int:
+        return len(self._members)
+
+    def get_role(self, role_id: int) -> Optional[FakeRole]:
+        return self._roles.get(role_id)
+
+    def get_channel(self, channel_id: int):
+        return self._channels.get(channel_id)
+
+    def get_member(self, user_id: int) -> Optional[FakeMember]:
+        return self._members.get(user_id)
+
+    async def fetch_member(self, user_id: int) -> FakeMember:
+        await self.http.call("fetch_member", self.id)
+        member = self._members.get(user_id)
+        if member is None:
+            raise discord.NotFound(_FakeResponse(404), "Unknown Member")
+        return member
+
+    async def chunk(self, cache: bool = True):
+        return self.members
+
+    # 準備用（API 呼び出しとして数えない）
+    def add_role(self, name: str, **fields) -> FakeRole:
+        role = FakeRole(self, name, position=len(self._roles), **fields)
+        self._roles[role.id] = role
+        return role
+
+    def add_text_channel(self, name: str, category=None) -> FakeTextChannel:
+        channel = FakeTextChannel(self, name, category)
+        self._channels[channel.id] = channel
+        return channel
+
+    def add_members(self, count: int, roles: Iterable[FakeRole] = ()) -> List[FakeMember]:
+        roles = list(roles)
+        members = [FakeMember(self, f"member{len(self._members) + i}", roles) for i in range(count)]
+        self._members.update((member.id, member) for member in members)
+        return members
+
+    def remove_role(self, role: FakeRole) -> None:
+        if self._roles.pop(role.id, None):
+            self.dispatch("guild_role_delete", role)
+
+    def remove_channel(self, channel) -> None:
+        if self._channels.pop(channel.id, None):
+            self.dispatch("guild_channel_delete", channel)
+
+    # API
+    async def create_role(self, name: str, color=None, hoist: bool = False, **fields) -> FakeRole:
+        await self.http.call("create_role", self.id)
+        role = self.add_role(name, color=color, hoist=hoist)
+        self.dispatch("guild_role_create", role)
+        return role
+
+    async def _create_channel(self, channel):
+        await self.http.call("create_channel", self.id)
+        self._channels[channel.id] = channel
+        self.dispatch("guild_channel_create", channel)
+        return channel
+
+    async def create_category(self, name: str, overwrites=None, **fields) -> FakeCategory:
+        return await self._create_channel(FakeCategory(self, name, overwrites, fields.get("position", 0)))
+
+    async def create_text_channel(self, name: str, category=None, overwrites=None, position: int = 0, **fields) -> FakeTextChannel:
+        return await self._create_channel(FakeTextChannel(self, name, category, overwrites, position))
+
+    async def create_forum(self, name: str, category=None, overwrites=None, topic=None, **fields) -> FakeForumChannel:
+        return await self._create_channel(FakeForumChannel(self, name, category, overwrites, topic=topic))
+
+
+class _FakeResponse:
+    def __init__(self, status: int):
+        self.status = status
+        self.reason = "Fake"
+        self.headers = {}
+
+
+class FakeReactionPayload:
+    """on_raw_reaction_add / on_raw_reaction_remove に渡すイベント"""
+
+    def __init__(self, guild: FakeGuild, message: FakeMessage, member: FakeMember, emoji: str, event_type: str):
+        self.guild_id = guild.id
+        self.channel_id = message.channel.id
+        self.message_id = message.id
+        self.user_id = member.id
+        self.emoji = emoji
+        self.event_type = event_type
+        # 削除イベントにはメンバー情報が含まれない
+        self.member = member if event_type == "REACTION_ADD" else None
@@ -0,0 +1,300 @@
+"""Cogの内部処理のベンチマーク
+
+メモリ上の Discord の代用品（benchmarks/fake_discord.py）に対して、期の作成・イベントの作成・
+リアクションの集中・多数のメンバーへのロール付与を実行し、処理時間・API の呼び出し回数・
+レート制限による待機・メモリ使用量の最大値を出力する。
+
+    python -m benchmarks.run
+    python -m benchmarks.run --scenario provision --class-counts 1,10,50 --latency 0.05 --realistic-limits
+    python -m benchmarks.run --scenario reactions --members 10000 --reactions 5000 --json
+"""
+import argparse
+import asyncio
+import contextlib
+import json
+import os
+import sys
+import tempfile
+import time
+import tracemalloc
+from typing import Callable, Dict, List
+
+# config.settings はトークンが必須のため、ベンチマークではダミーを設定する
+os.environ.setdefault("DISCORD_TOKEN", "benchmark")
+sys.path.insert(0, os.path.dirname(os.path.dirname(os.path.abspath(__file__))))
+
+import discord
+from discord.ext import commands
+
+from benchmarks.fake_discord import DEFAULT_RATE_LIMITS, FakeGuild, FakeHTTP, FakeReactionPayload
+from cogs.events.event_management import EventManagement
+from cogs.sakuraria.categories import Categories
+from cogs.sakuraria.channels import Channels
+from cogs.sakuraria.reaction_roles import ReactionRoles
+from cogs.sakuraria.roles import Roles
+from cogs.system.name_index import NameIndexSync
+from config.settings import REACTION_ROLE_CHANNELS, STAFF_ROLE_NAME, UNASSIGNED_ROLE_NAME
+from utils.bulk_roles import BulkRoleAssigner
+from utils.event_layout import build_event_layout
+from utils.jobs import JobManager
+from utils.rename_queue import RenameQueue
+from utils.season_registry import SeasonRegistry
+from utils.state_store import SQLiteStateStore
+
+SCENARIOS = ("provision", "event", "reactions", "bulk_roles")
+
+
+class BenchmarkBot(commands.Bot):
+    """ゲートウェイに接続せず、FakeGuild をキャッシュとして使う Bot"""
+
+    def __init__(self, store):
+        super().__init__(command_prefix="!", intents=discord.Intents.none())
+        self.fake_guilds: Dict[int, FakeGuild] = {}
+        self.fake_user = discord.Object(id=1)
+        self.state_store = store
+        self.job_manager = JobManager(self, store)
+        self.season_registry = SeasonRegistry(store)
+        self.rename_queue = RenameQueue(self, store)
+
+    @property
+    def user(self):
+        return self.fake_user
+
+    def get_guild(self, guild_id):
+        return self.fake_guilds.get(guild_id)
+
+    def get_channel(self, channel_id):
+        for guild in self.fake_guilds.values():
+            channel = guild.get_channel(channel_id)
+            if channel:
+                return channel
+        return None
+
+    def create_guild(self, http: FakeHTTP, name: str) -> FakeGuild:
+        """Botの管理に必要なロール・チャンネルがあるギルドを作る"""
+        guild = FakeGuild(http, name, dispatch=self.dispatch)
+        self.fake_guilds[guild.id] = guild
+        guild.add_role(STAFF_ROLE_NAME)
+        guild.add_role(UNASSIGNED_ROLE_NAME)
+        guild.add_role("OB")
+        guild.add_text_channel("📕🤖｜管理bot")
+        guild.add_text_channel(REACTION_ROLE_CHANNELS["staff"])
+        guild.add_text_channel(REACTION_ROLE_CHANNELS["student"])
+        return guild
+
+
+async def settle() -> None:
+    """Botに送ったイベントの処理がすべて終わるまで待つ"""
+    current = asyncio.current_task()
+    while True:
+        pending = [
+            task for task in asyncio.all_tasks()
+            if task is not current and not task.done() and task.get_name().startswith("discord.py:")
+        ]
+        if not pending:
+            return
+        await asyncio.gather(*pending, return_exceptions=True)
+
+
+class Runner:
+    """シナリオを実行して計測結果を集める"""
+
+    def __init__(self, bot: BenchmarkBot, http: FakeHTTP, trace_memory: bool):
+        self.bot = bot
+        self.http = http
+        self.trace_memory = trace_memory
+        self.rows: List[Dict] = []
+
+    async def measure(self, scenario: str, params: Dict, func: Callable):
+        self.http.reset_counters()
+        if self.trace_memory:
+            tracemalloc.reset_peak()
+            baseline = tracemalloc.get_traced_memory()[0]
+        started = time.perf_counter()
+        value = await func()
+        await settle()
+        elapsed = time.perf_counter() - started
+        row = {
+            "scenario": scenario,
+            **params,
+            "seconds": round(elapsed, 4),
+            "rest_calls": sum(self.http.calls.values()),
+            "ratelimited": sum(self.http.ratelimited.values()),
+            "retry_after": round(self.http.retry_after, 3),
+            "peak_mb": round((tracemalloc.get_traced_memory()[1] - baseline) / (1024 * 1024), 2) if self.trace_memory else None,
+            "calls": dict(sorted(self.http.calls.items()))
+        }
+        self.rows.append(row)
+        return value
+
+    async def untimed(self, func: Callable):
+        """準備の処理（計測しない。レート制限もかけない）"""
+        latency, limits = self.http.latency, self.http.rate_limits
+        self.http.latency, self.http.rate_limits = 0.0, {}
+        try:
+            value = await func()
+            await settle()
+            return value
+        finally:
+            self.http.latency, self.http.rate_limits = latency, limits
+
+    def cog(self, cls):
+        return self.bot.get_cog(cls.__cog_name__)
+
+    async def provision_season(self, guild: FakeGuild, semester: int, class_count: int, timed: bool = True) -> None:
+        """期の作成（ロール → カテゴリ → チャンネル → リアクションロールメッセージ）"""
+        steps = (
+            ("roles", lambda: self.cog(Roles).create_roles_internal(guild, semester, class_count)),
+            ("categories", lambda: self.cog(Categories).create_categories_internal(guild, semester)),
+            ("channels", lambda: self.cog(Channels).create_channels_internal(guild, semester, class_count)),
+            ("reaction_roles", lambda: self.cog(ReactionRoles).create_reaction_roles_internal(guild, semester, class_count)),
+        )
+        for step, func in steps:
+            if timed:
+                await self.measure("provision", {"step": step, "class_count": class_count}, func)
+            else:
+                await self.untimed(func)
+
+    async def run_provision(self, class_counts: List[int]) -> None:
+        for class_count in class_counts:
+            guild = self.bot.create_guild(self.http, f"provision-{class_count}")
+            await self.provision_season(guild, 1, class_count)
+
+    async def run_event(self, events: int) -> None:
+        guild = self.bot.create_guild(self.http, "event")
+        cog = self.cog(EventManagement)
+
+        async def create_events():
+            for i in range(events):
+                await cog.create_event_internal(guild, f"イベント{i + 1}")
+        await self.measure("event", {"events": events}, create_events)
+
+        # テンプレートからの一括作成（全イベントを並行に作成する）
+        batch_guild = self.bot.create_guild(self.http, "event_batch")
+        layouts = [build_event_layout(f"イベント{i + 1}") for i in range(events)]
+
+        async def create_events_batch():
+            reports = await cog.create_events_internal(batch_guild, layouts)
+            failed = [report for report in reports if report[1] != "ok"]
+            if failed:
+                raise Exception(f"{len(failed)}個のイベントの作成に失敗しました: {failed[0][3]}")
+        await self.measure("event_batch", {"events": events}, create_events_batch)
+
+    async def run_reactions(self, members: int, reactions: int, class_count: int) -> None:
+        guild = self.bot.create_guild(self.http, "reactions")
+        await self.provision_season(guild, 1, class_count, timed=False)
+        people = guild.add_members(members)
+        cog = self.cog(ReactionRoles)
+        message_id = cog.find_reaction_role_message(guild.id, 1, "student")
+        channel = self.bot.get_channel(cog.reaction_roles[message_id]["channel_id"])
+        message = channel.get_partial_message(message_id)
+        # 1人が1回ずつリアクションする（人数より多い場合は同じ人が別のクラスを選び直す）
+        payloads = [
+            (people[i % len(people)], f"{i % class_count + 1}️⃣")
+            for i in range(reactions)
+        ]
+        params = {"members": members, "reactions": reactions, "class_count": class_count}
+
+        async def burst(event_type: str, event: str):
+            for member, emoji in payloads:
+                self.bot.dispatch(event, FakeReactionPayload(guild, message, member, emoji, event_type))
+            await settle()
+            # 待機時間を待たずに、まとめられたロール更新を反映する
+            await cog.role_buffer.flush_all()
+        await self.measure("reaction_add", params, lambda: burst("REACTION_ADD", "raw_reaction_add"))
+        await self.measure("reaction_remove", params, lambda: burst("REACTION_REMOVE", "raw_reaction_remove"))
+
+    async def run_bulk_roles(self, members: int) -> None:
+        guild = self.bot.create_guild(self.http, "bulk_roles")
+        student_role = guild.add_role("1期生")
+        ob_role = next(role for role in guild.roles if role.name == "OB")
+        guild.add_members(members, [student_role])
+
+        async def assign():
+            targets = [member for member in student_role.members if ob_role not in member.roles]
+            results = await BulkRoleAssigner().add_role(targets, ob_role)
+            failed = [result for result in results if not result.ok]
+            if failed:
+                raise Exception(f"{len(failed)}人へのロール付与に失敗しました: {failed[0].error}")
+        await self.measure("bulk_roles", {"members": members}, assign)
+
+
+def parse_rate_limits(args) -> Dict:
+    limits = dict(DEFAULT_RATE_LIMITS) if args.realistic_limits else {}
+    for value in args.rate_limit:
+        route, _, spec = value.partition("=")
+        count, _, window = spec.partition("/")
+        limits[route] = (int(count), float(window))
+    return limits
+
+
+def format_table(rows: List[Dict]) -> str:
+    columns = ["scenario", "step", "class_count", "events", "members", "reactions", "seconds", "rest_calls", "ratelimited", "retry_after", "peak_mb"]
+    columns = [column for column in columns if any(row.get(column) is not None for row in rows)]
+    cells = [[("" if row.get(column) is None else str(row.get(column))) for column in columns] for row in rows]
+    widths = [max(len(column), *(len(cell[i]) for cell in cells)) for i, column in enumerate(columns)]
+    lines = ["  ".join(column.ljust(width) for column, width in zip(columns, widths))]
+    lines.append("  ".join("-" * width for width in widths))
+    lines += ["  ".join(cell.ljust(width) for cell, width in zip(row, widths)) for row in cells]
+    return "\n".join(lines)
+
+
+async def main(args) -> List[Dict]:
+    http = FakeHTTP(args.latency, parse_rate_limits(args))
+    with tempfile.TemporaryDirectory() as directory:
+        store = SQLiteStateStore(os.path.join(directory, "benchmark.db"))
+        bot = BenchmarkBot(store)
+        async with bot:
+            await bot.season_registry.load()
+            for cog in (NameIndexSync, Roles, Categories, Channels, ReactionRoles, EventManagement):
+                await bot.add_cog(cog(bot))
+            runner = Runner(bot, http, not args.no_tracemalloc)
+            if runner.trace_memory:
+                tracemalloc.start()
+            try:
+                scenarios = args.scenario or SCENARIOS
+                if "provision" in scenarios:
+                    await runner.run_provision(args.class_counts)
+                if "event" in scenarios:
+                    await runner.run_event(args.events)
+                if "reactions" in scenarios:
+                    await runner.run_reactions(args.members, args.reactions, args.reaction_class_count)
+                if "bulk_roles" in scenarios:
+                    await runner.run_bulk_roles(args.bulk_members)
+            finally:
+                if runner.trace_memory:
+                    tracemalloc.stop()
+                for name in list(bot.cogs):
+                    await bot.remove_cog(name)
+        await store.close()
+    return runner.rows
+
+
+def parse_args(argv=None):
+    parser = argparse.ArgumentParser(description="Cogの内部処理をメモリ上のDiscordに対して計測します")
+    parser.add_argument("--scenario", action="append", choices=SCENARIOS, help="実行するシナリオ（複数指定可。既定はすべて）")
+    parser.add_argument("--class-counts", type=lambda value: [int(count) for count in value.split(",")], default=[1, 5, 10, 25, 50],
+                        help="期の作成で試すクラス数（カンマ区切り）")
+    parser.add_argument("--events", type=int, default=10, help="作成するイベントの数")
+    parser.add_argument("--members", type=int, default=10000, help="リアクションのシナリオのメンバー数")
+    parser.add_argument("--reactions", type=int, default=1000, help="集中して届くリアクションの数")
+    parser.add_argument("--reaction-class-count", type=int, default=9, help="リアクションのシナリオのクラス数")
+    parser.add_argument("--bulk-members", type=int, default=1000, help="ロールをまとめて付与するメンバー数")
+    parser.add_argument("--latency", type=float, default=0.0, help="API呼び出し1回あたりの遅延（秒）")
+    parser.add_argument("--realistic-limits", action="store_true", help="経路ごとのレート制限の目安（fake_discord.DEFAULT_RATE_LIMITS）を使う")
+    parser.add_argument("--rate-limit", action="append", default=[], metavar="ROUTE=COUNT/SECONDS",
+                        help="経路のレート制限を指定する（例: edit_member=10/10）")
+    parser.add_argument("--no-tracemalloc", action="store_true", help="メモリ使用量を計測しない（計測による処理時間の増加をなくす）")
+    parser.add_argument("--json", action="store_true", help="結果をJSONで出力する")
+    return parser.parse_args(argv)
+
+
+if __name__ == "__main__":
+    arguments = parse_args()
+    # Bot側のログは標準エラーに出し、標準出力には結果だけを出す
+    with contextlib.redirect_stdout(sys.stderr):
+        results = asyncio.run(main(arguments))
+    if arguments.json:
+        print(json.dumps(results, ensure_ascii=False, indent=2))
+    else:
+        print(format_table(results))
@@ -1,25 +1,27 @@
 import discord
-from discord import app_commands
+from utils.authz import ADMINISTRATOR, authorize, channel_check, role_check
 from config.settings import EVENT_SETTINGS
 
+# イベントコマンドを実行できるチャンネル
+EVENT_ADMIN_CHANNEL = channel_check(
+    "event_admin_channel",
+    lambda name: name == EVENT_SETTINGS["admin_channel"],
+    f"❌ このコマンドは `{EVENT_SETTINGS['admin_channel']}` チャンネルでのみ実行できます。"
+)
+
+# イベント管理者ロール
+EVENT_ADMIN_ROLE = role_check(
+    "event_admin_role",
+    lambda name: name == EVENT_SETTINGS["admin_role"],
+    f"❌ このコマンドを実行するには `{EVENT_SETTINGS['admin_role']}` ロールが必要です。"
+)
+
 def is_event_admin_channel():
-    async def predicate(interaction: discord.Interaction) -> bool:
-        if interaction.channel.name != EVENT_SETTINGS["admin_channel"]:
-            await interaction.response.send_message(
-                f"❌ このコマンドは `{EVENT_SETTINGS['admin_channel']}` チャンネルでのみ実行できます。",
-                ephemeral=True
-            )
-            return False
-        return True
-    return app_commands.check(predicate)
+    return authorize(EVENT_ADMIN_CHANNEL)
 
 def has_event_admin_role():
-    async def predicate(interaction: discord.Interaction) -> bool:
-        if not any(role.name == EVENT_SETTINGS["admin_role"] for role in interaction.user.roles):
-            await interaction.response.send_message(
-                f"❌ このコマンドを実行するには `{EVENT_SETTINGS['admin_role']}` ロールが必要です。",
-                ephemeral=True
-            )
-            return False
-        return True
-    return app_commands.check(predicate) 
\ No newline at end of file
+    return authorize(EVENT_ADMIN_ROLE)
+
+def is_event_admin():
+    """イベント管理チャンネル・イベント管理者ロール・管理者権限をまとめて確認するデコレータ"""
+    return authorize(EVENT_ADMIN_CHANNEL, EVENT_ADMIN_ROLE, ADMINISTRATOR)
@@ -1,115 +1,112 @@
+import io
+import time
+
 import discord
 from discord import app_commands
 from discord.ext import commands
 
-from utils.checks import is_administrator
-from utils.helpers import format_error_message
-from config.settings import EVENT_SETTINGS
-from .checks import is_event_admin_channel, has_event_admin_role
+from utils.event_layout import build_event_layout, event_key, event_keys, find_existing_event, parse_event_template, schedule_event, schedule_events
+from utils.helpers import format_error_message, get_category_by_name, get_role_by_name, object_target
+from utils.jobs import JobContext
+from utils.progress import ProgressReporter
+from utils.provisioning import ProvisioningScheduler, raise_for_failures, summarize_failures
+from utils.teardown import describe_teardown_failures, run_teardown
+from config.settings import EVENT_SETTINGS, JOB_SETTINGS
+from .checks import is_event_admin
 
 class EventManagement(commands.Cog):
     def __init__(self, bot: commands.Bot):
         self.bot = bot
 
+    async def cog_load(self):
+        self.bot.job_manager.register("delete_event", "イベントの削除", self.run_delete_event_job)
+
     async def create_event_internal(self, guild, event_name: str):
-        # 1. イベント用のロールを作成
-        event_role = await guild.create_role(
-            name=f"🎯 {event_name}",
-            color=discord.Color.purple(),
-            hoist=True
-        )
-
-        # 2. カテゴリを作成
-        overwrites = {
-            guild.default_role: discord.PermissionOverwrite(view_channel=False),
-            event_role: discord.PermissionOverwrite(view_channel=True)
-        }
-        
-        category = await guild.create_category(
-            name=event_name,
-            overwrites=overwrites
-        )
-
-        # 3. チャンネルを作成
-        channels = []
-        channel_names = [
-            f"ログ-{event_name}",
-            f"ロール付与-{event_name}"
-        ]
-
-        for channel_name in channel_names:
-            if "ログ" in channel_name:
-                # フォーラムチャンネルを作成
-                channel = await guild.create_forum(
-                    name=channel_name,
-                    category=category,
-                    topic=f"{event_name}のログを記録するフォーラムです。"
-                )
-            else:
-                channel = await guild.create_text_channel(
-                    name=channel_name,
-                    category=category
-                )
-                # ロール付与チャンネルに説明メッセージを投稿
-                if "ロール付与" in channel_name:
-                    embed = discord.Embed(
-                        title="🎯 イベントロールの付与方法",
-                        description=f"このチャンネルで以下のコマンドを使用して、`{event_name}`のメンバーを管理できます：",
-                        color=discord.Color.blue()
-                    )
-                    embed.add_field(
-                        name="コマンド",
-                        value=f"`/add_role [ユーザー名]`\n`/remove_role [ユーザー名]`",
-                        inline=False
-                    )
-                    embed.add_field(
-                        name="説明",
-                        value=f"`/add_role` - 指定したユーザーに`{event_name}`ロールを付与します。\n`/remove_role` - 指定したユーザーから`{event_name}`ロールを削除します。",
-                        inline=False
-                    )
-                    await channel.send(embed=embed)
-            channels.append(channel)
+        # ロール → カテゴリ → チャンネル → 説明の投稿の順を守りつつ、チャンネルは並行に作成する
+        layout = build_event_layout(event_name)
+        scheduler = ProvisioningScheduler.from_settings()
+        schedule_event(scheduler, guild, layout)
+        results = await scheduler.run()
+        raise_for_failures(results)
 
+        category = results[event_key(layout, "category")].value
+        channels = [results[event_key(layout, f"channel:{spec.position}")].value for spec in layout.channels]
+        event_role = results[f"role:{layout.role_name}"].value
         return category, channels, event_role
 
-    async def delete_event_internal(self, guild, event_name: str):
-        # 1. カテゴリを検索
-        category = discord.utils.get(guild.categories, name=event_name)
+    async def create_events_internal(self, guild, layouts, on_result=None):
+        """複数のイベントを経路ごとの同時実行数を共有しながら並行に作成し、イベントごとの結果を返す
+
+        結果は (構成, 状態, かかった時間, 失敗の説明の一覧) で、状態は "ok" / "failed" / "skipped"。
+        """
+        scheduler = ProvisioningScheduler.from_settings()
+        reports = {}
+        owners = {}
+        to_create = []
+        for layout in layouts:
+            # 既にあるイベントは作成しない（他のイベントはそのまま作成する）
+            existing = find_existing_event(guild, layout)
+            if existing:
+                reports[layout.name] = (layout, "skipped", 0.0, [existing])
+                continue
+            to_create.append(layout)
+        missing = schedule_events(scheduler, guild, to_create)
+        for layout in to_create:
+            if layout.name in missing:
+                reports[layout.name] = (layout, "failed", 0.0, [f"権限の上書きに指定したロールが見つかりません: {', '.join(missing[layout.name])}"])
+            else:
+                owners.update({key: layout.name for key in event_keys(layout)})
+
+        started = time.perf_counter()
+        finished = {}
+        def record(result):
+            # イベントごとに、最後の処理が終わった時点までの時間を記録する
+            finished[owners[result.key]] = time.perf_counter() - started
+            if on_result:
+                on_result(result)
+        results = await scheduler.run(record) if len(scheduler) else {}
+
+        for layout in layouts:
+            if layout.name in reports:
+                continue
+            event_results = {key: results[key] for key in event_keys(layout)}
+            failures = summarize_failures(event_results)
+            reports[layout.name] = (layout, "failed" if failures else "ok", finished.get(layout.name, 0.0), failures)
+        return [reports[layout.name] for layout in layouts]
+
+    def collect_event_targets(self, guild, event_name: str):
+        """イベントの削除対象（カテゴリ内のチャンネル・カテゴリ・ロール）を集める"""
+        category = get_category_by_name(guild, event_name)
         if not category:
             raise Exception(f"{event_name}のカテゴリが見つかりません。")
+        targets = [object_target(channel) for channel in category.channels]
+        targets.append(object_target(category))
+        role = get_role_by_name(guild, f"🎯 {event_name}")
+        if role:
+            targets.append(object_target(role))
+        return targets
 
-        # 2. カテゴリ内のチャンネルを削除
-        channels_to_delete = []
-        for channel in category.channels:
-            channels_to_delete.append(channel)
-        
-        for channel in channels_to_delete:
-            try:
-                await channel.delete()
-            except Exception as e:
-                raise Exception(f"チャンネル {channel.name} の削除に失敗しました: {e}")
-
-        # 3. カテゴリを削除
-        try:
-            await category.delete()
-        except Exception as e:
-            raise Exception(f"カテゴリ {event_name} の削除に失敗しました: {e}")
+    async def run_delete_event_job(self, ctx: JobContext):
+        """イベントの削除ジョブ（子から親の順に並行に削除し、削除済みの対象は再開時に飛ばす）"""
+        targets = ctx.params["targets"]
+        ctx.set_total(len(targets))
+        failures = describe_teardown_failures(targets, await run_teardown(ctx.guild, targets, step=ctx.step))
+        if failures:
+            raise Exception("以下の削除に失敗しました：\n" + "\n".join(failures))
+        return f'✅ {ctx.params["event_name"]}イベントの削除が完了しました。'
 
-        # 4. ロールを削除
-        role = discord.utils.get(guild.roles, name=f"🎯 {event_name}")
-        if role:
-            try:
-                await role.delete()
-            except Exception as e:
-                raise Exception(f"ロール 🎯 {event_name} の削除に失敗しました: {e}")
+    async def delete_event_internal(self, guild, event_name: str):
+        # チャンネル → カテゴリの順を守りつつ、ロールなどは並行に削除する
+        targets = self.collect_event_targets(guild, event_name)
+        failures = describe_teardown_failures(targets, await run_teardown(guild, targets))
+        if failures:
+            raise Exception("以下の削除に失敗しました：\n" + "\n".join(failures))
 
     @app_commands.command(name="create_event", description="イベント用のカテゴリ、チャンネル、ロールを作成します")
     @app_commands.describe(
         event_name="イベント名"
     )
-    @is_event_admin_channel()
-    @has_event_admin_role()
-    @is_administrator()
+    @is_event_admin()
     async def create_event(self, interaction: discord.Interaction, event_name: str):
         try:
             await interaction.response.send_message('イベントの設定を開始します...')
@@ -129,13 +126,59 @@ class EventManagement(commands.Cog):
         except Exception as e:
             await interaction.followup.send(format_error_message(e))
 
+    @app_commands.command(name="create_events", description="テンプレート（YAML / JSON）から複数のイベントをまとめて作成します")
+    @app_commands.describe(
+        template="作成するイベントの一覧を書いたファイル（.yaml / .yml / .json）"
+    )
+    @is_event_admin()
+    async def create_events(self, interaction: discord.Interaction, template: discord.Attachment):
+        try:
+            if template.size > EVENT_SETTINGS["template_max_bytes"]:
+                raise Exception(f"テンプレートが大きすぎます（{EVENT_SETTINGS['template_max_bytes'] // 1024}KBまで）。")
+            layouts = parse_event_template(await template.read(), template.filename)
+            await interaction.response.send_message(f'{len(layouts)}個のイベントの設定を開始します...')
+
+            # 進捗は1つのメッセージを編集して表示する
+            total = sum(len(event_keys(layout)) for layout in layouts)
+            progress_message = await interaction.followup.send(f'⏳ イベントを作成しています: 0/{total}', wait=True)
+            reporter = ProgressReporter(progress_message, JOB_SETTINGS["progress_interval"])
+            done = []
+            def on_result(result):
+                done.append(result)
+                reporter.update(f'⏳ イベントを作成しています: {len(done)}/{total}')
+            started = time.perf_counter()
+            reports = await self.create_events_internal(interaction.guild, layouts, on_result)
+            elapsed = time.perf_counter() - started
+            await reporter.finish(f'✅ イベントの作成が終わりました（{elapsed:.1f}秒）')
+
+            # イベントごとの結果を報告する（長い場合は一覧をファイルとして添付する）
+            lines = []
+            for layout, status, seconds, failures in reports:
+                if status == "ok":
+                    lines.append(f'✅ {layout.name}（チャンネル{len(layout.channels)}個、{seconds:.1f}秒）')
+                elif status == "skipped":
+                    lines.append(f'⏭️ {layout.name}：{failures[0]}')
+                else:
+                    lines.append(f'❌ {layout.name}（{seconds:.1f}秒）：\n' + "\n".join(f"  - {failure}" for failure in failures))
+            created = sum(1 for report in reports if report[1] == "ok")
+            summary = f'📋 {created}/{len(reports)}個のイベントを作成しました（{elapsed:.1f}秒）。'
+            body = summary + "\n" + "\n".join(lines)
+            if len(body) > 1900:
+                file = discord.File(io.BytesIO("\n".join(lines).encode("utf-8")), filename="create_events.txt")
+                await interaction.followup.send(summary, file=file)
+            else:
+                await interaction.followup.send(body)
+        except Exception as e:
+            if interaction.response.is_done():
+                await interaction.followup.send(format_error_message(e))
+            else:
+                await interaction.response.send_message(format_error_message(e))
+
     @app_commands.command(name="delete_event", description="イベント用のカテゴリ、チャンネル、ロールを削除します")
     @app_commands.describe(
         event_name="イベント名"
     )
-    @is_event_admin_channel()
-    @has_event_admin_role()
-    @is_administrator()
+    @is_event_admin()
     async def delete_event(self, interaction: discord.Interaction, event_name: str):
         try:
             await interaction.response.send_message('イベントの削除を開始します...')
@@ -165,9 +208,14 @@ class EventManagement(commands.Cog):
                     await button_interaction.response.send_message("削除を開始します...")
                     
                     try:
-                        await self.cog.delete_event_internal(interaction.guild, event_name)
+                        # 削除はバックグラウンドジョブで行う（中断しても続きから再開できる）
+                        targets = self.cog.collect_event_targets(interaction.guild, event_name)
+                        job = await self.cog.bot.job_manager.start(
+                            "delete_event", interaction.guild, button_interaction.channel,
+                            {"event_name": event_name, "targets": targets}
+                        )
                         await button_interaction.followup.send(
-                            f'✅ {event_name}イベントの削除が完了しました。'
+                            f'⏳ ジョブ `{job["job_id"]}` として実行しています。進捗はジョブのメッセージまたは `/job_status` で確認できます。'
                         )
                     except Exception as e:
                         await button_interaction.followup.send(format_error_message(e))
@@ -1,104 +1,205 @@
+import io
+import time
+
 import discord
 from discord import app_commands
 from discord.ext import commands
 
-from utils.helpers import format_error_message
-from config.settings import EVENT_SETTINGS
+from utils.bulk_roles import BulkRoleAssigner
+from utils.helpers import format_error_message, get_role_by_name
+from utils.progress import ProgressReporter
+from utils.roster import parse_mentions, parse_roster_file, resolve_members
+from utils.runtime_profile import ensure_members_loaded
+from config.settings import EVENT_SETTINGS, JOB_SETTINGS
 from .checks import has_event_admin_role
 
 class RoleManagement(commands.Cog):
     def __init__(self, bot: commands.Bot):
         self.bot = bot
 
-    @app_commands.command(name="add_role", description="イベントメンバーにロールを付与します")
-    @app_commands.describe(
-        user="ロールを付与するユーザー"
-    )
-    @has_event_admin_role()
-    async def add_role(self, interaction: discord.Interaction, user: discord.Member):
-        try:
-            # 現在のチャンネル名からイベント名を取得
-            channel_name = interaction.channel.name
-            if not channel_name.startswith(EVENT_SETTINGS["role_assignment_channel_prefix"]):
-                await interaction.response.send_message(
-                    f"❌ このコマンドは `{EVENT_SETTINGS['role_assignment_channel_prefix']}` で始まるチャンネルでのみ使用できます。",
-                    ephemeral=True
-                )
-                return
+    async def get_event_role(self, interaction: discord.Interaction):
+        """実行したチャンネルの名前からイベント名とイベントロールを求める（使えない場合はエラーを返信して None を返す）"""
+        # 現在のチャンネル名からイベント名を取得
+        channel_name = interaction.channel.name
+        if not channel_name.startswith(EVENT_SETTINGS["role_assignment_channel_prefix"]):
+            await interaction.response.send_message(
+                f"❌ このコマンドは `{EVENT_SETTINGS['role_assignment_channel_prefix']}` で始まるチャンネルでのみ使用できます。",
+                ephemeral=True
+            )
+            return None, None
+
+        event_name = channel_name.replace(EVENT_SETTINGS["role_assignment_channel_prefix"], "")
+        event_role = get_role_by_name(interaction.guild, f"🎯 {event_name}")
+
+        if not event_role:
+            await interaction.response.send_message(
+                f"❌ `{event_name}`のイベントロールが見つかりません。",
+                ephemeral=True
+            )
+            return None, None
+        return event_name, event_role
 
-            event_name = channel_name.replace(EVENT_SETTINGS["role_assignment_channel_prefix"], "")
-            event_role = discord.utils.get(interaction.guild.roles, name=f"🎯 {event_name}")
+    async def collect_members(self, interaction: discord.Interaction, users: str, file: discord.Attachment, source_role: discord.Role):
+        """まとめて指定されたメンバー（メンション・ファイル・ロール）を集める"""
+        tokens = parse_mentions(users) if users else []
+        if file:
+            if file.size > EVENT_SETTINGS["roster_max_bytes"]:
+                raise Exception(f"ファイルが大きすぎます（{EVENT_SETTINGS['roster_max_bytes'] // 1024}KBまで）。")
+            tokens += parse_roster_file(await file.read())
+        # メンバー一覧を読み込んでから引く（起動時に読み込まないプロファイルでは、メンションやIDのメンバーもキャッシュにないことがある）
+        if tokens or source_role:
+            await ensure_members_loaded(interaction.guild)
+        members, unresolved = resolve_members(interaction.guild, tokens)
+        if source_role:
+            known = {member.id for member in members}
+            members += [member for member in source_role.members if member.id not in known]
+        return members, unresolved
 
-            if not event_role:
+    async def update_event_role(self, interaction: discord.Interaction, add: bool, user, users, file, source_role):
+        event_name, event_role = await self.get_event_role(interaction)
+        if not event_role:
+            return
+
+        # 1人だけ指定された場合は従来どおりすぐに返信する
+        if user and not (users or file or source_role):
+            # ユーザーのロールの状態をチェック
+            if add and user.get_role(event_role.id):
                 await interaction.response.send_message(
-                    f"❌ `{event_name}`のイベントロールが見つかりません。",
+                    f"❌ {user.mention} は既に `{event_name}` ロールを持っています。",
                     ephemeral=True
                 )
                 return
-
-            # ユーザーが既にロールを持っているかチェック
-            if event_role in user.roles:
+            if not add and not user.get_role(event_role.id):
                 await interaction.response.send_message(
-                    f"❌ {user.mention} は既に `{event_name}` ロールを持っています。",
+                    f"❌ {user.mention} は `{event_name}` ロールを持っていません。",
                     ephemeral=True
                 )
                 return
 
-            # ユーザーにロールを付与
-            await user.add_roles(event_role)
-            
-            # 成功メッセージを送信
+            # ユーザーのロールを更新し、成功メッセージを送信
+            if add:
+                await user.add_roles(event_role)
+                await interaction.response.send_message(f"✅ {user.mention} に `{event_name}` ロールを付与しました。")
+            else:
+                await user.remove_roles(event_role)
+                await interaction.response.send_message(f"✅ {user.mention} から `{event_name}` ロールを削除しました。")
+            return
+
+        if not (user or users or file or source_role):
             await interaction.response.send_message(
-                f"✅ {user.mention} に `{event_name}` ロールを付与しました。"
+                "❌ ユーザー・メンションの一覧・ファイル・ロールのいずれかを指定してください。",
+                ephemeral=True
+            )
+            return
+
+        await interaction.response.defer(thinking=True)
+        members, unresolved = await self.collect_members(interaction, users, file, source_role)
+        if user and all(member.id != user.id for member in members):
+            members.append(user)
+
+        # 既に目的の状態のメンバーはキャッシュのロールで判定して省略する（APIは呼ばない）
+        targets = [member for member in members if bool(member.get_role(event_role.id)) != add]
+        skipped = len(members) - len(targets)
+        verb = "付与" if add else "削除"
+
+        # 同時実行数を制限して並行に実行し、進捗は1つのメッセージを編集して表示する
+        started = time.perf_counter()
+        results = []
+        if targets:
+            progress_message = await interaction.followup.send(
+                f'⏳ `{event_name}` ロールを{verb}しています: 0/{len(targets)}', wait=True
+            )
+            reporter = ProgressReporter(progress_message, JOB_SETTINGS["progress_interval"])
+            def on_result(result):
+                results.append(result)
+                reporter.update(f'⏳ `{event_name}` ロールを{verb}しています: {len(results)}/{len(targets)}')
+            assigner = BulkRoleAssigner()
+            reason = f"イベント「{event_name}」のロールの{verb}（{interaction.user.name}）"
+            if add:
+                await assigner.add_role(targets, event_role, reason=reason, on_result=on_result)
+            else:
+                await assigner.remove_role(targets, event_role, reason=reason, on_result=on_result)
+            succeeded = sum(1 for result in results if result.ok)
+            await reporter.finish(f'✅ `{event_name}` ロールの{verb}が終わりました: {succeeded}/{len(targets)}')
+        updated_members = [result.member for result in results if result.ok]
+        failed_members = [result for result in results if not result.ok]
+        elapsed = time.perf_counter() - started
+
+        # 結果をまとめて報告（概要だけをメッセージにし、一覧はファイルとして添付する）
+        result_message = []
+        details = []
+        if updated_members:
+            target = "に" if add else "から"
+            result_message.append(f'✅ {len(updated_members)}人{target} `{event_name}` ロールを{verb}しました（{elapsed:.1f}秒）。')
+            details.append(f"■ ロールを{verb}したメンバー\n" + "\n".join(f"- {member.name}" for member in updated_members))
+        if skipped:
+            state = "既にロールを持っている" if add else "ロールを持っていない"
+            result_message.append(f'ℹ️ {state}{skipped}人は省略しました。')
+        if failed_members:
+            result_message.append(f'❌ {len(failed_members)}人へのロールの{verb}に失敗しました。')
+            details.append(
+                f"■ ロールの{verb}に失敗したメンバー\n"
+                + "\n".join(f"- {result.member.name}: {result.error}" for result in failed_members)
             )
+        if unresolved:
+            result_message.append(f'⚠️ {len(unresolved)}件はメンバーが見つかりませんでした。')
+            details.append("■ 見つからなかった値\n" + "\n".join(f"- {value}" for value in unresolved))
+        if not members:
+            result_message.append('⚠️ 対象のメンバーがいませんでした。')
 
+        if details:
+            file = discord.File(io.BytesIO("\n\n".join(details).encode("utf-8")), filename=f"event_roles_{event_name}.txt")
+            await interaction.followup.send("\n".join(result_message), file=file)
+        else:
+            await interaction.followup.send("\n".join(result_message))
+
+    @app_commands.command(name="add_role", description="イベントメンバーにロールを付与します")
+    @app_commands.describe(
+        user="ロールを付与するユーザー",
+        users="ロールを付与するユーザーのメンション・IDの一覧（まとめて付与）",
+        file="ユーザーID・名前を並べた CSV / テキストファイル（まとめて付与）",
+        source_role="このロールを持っている全員に付与"
+    )
+    @has_event_admin_role()
+    async def add_role(
+        self,
+        interaction: discord.Interaction,
+        user: discord.Member = None,
+        users: str = None,
+        file: discord.Attachment = None,
+        source_role: discord.Role = None
+    ):
+        try:
+            await self.update_event_role(interaction, True, user, users, file, source_role)
         except Exception as e:
-            await interaction.response.send_message(format_error_message(e))
+            await self.send_error(interaction, e)
 
     @app_commands.command(name="remove_role", description="イベントメンバーからロールを削除します")
     @app_commands.describe(
-        user="ロールを削除するユーザー"
+        user="ロールを削除するユーザー",
+        users="ロールを削除するユーザーのメンション・IDの一覧（まとめて削除）",
+        file="ユーザーID・名前を並べた CSV / テキストファイル（まとめて削除）",
+        source_role="このロールを持っている全員から削除"
     )
     @has_event_admin_role()
-    async def remove_role(self, interaction: discord.Interaction, user: discord.Member):
+    async def remove_role(
+        self,
+        interaction: discord.Interaction,
+        user: discord.Member = None,
+        users: str = None,
+        file: discord.Attachment = None,
+        source_role: discord.Role = None
+    ):
         try:
-            # 現在のチャンネル名からイベント名を取得
-            channel_name = interaction.channel.name
-            if not channel_name.startswith(EVENT_SETTINGS["role_assignment_channel_prefix"]):
-                await interaction.response.send_message(
-                    f"❌ このコマンドは `{EVENT_SETTINGS['role_assignment_channel_prefix']}` で始まるチャンネルでのみ使用できます。",
-                    ephemeral=True
-                )
-                return
-
-            event_name = channel_name.replace(EVENT_SETTINGS["role_assignment_channel_prefix"], "")
-            event_role = discord.utils.get(interaction.guild.roles, name=f"🎯 {event_name}")
-
-            if not event_role:
-                await interaction.response.send_message(
-                    f"❌ `{event_name}`のイベントロールが見つかりません。",
-                    ephemeral=True
-                )
-                return
-
-            # ユーザーがロールを持っているかチェック
-            if event_role not in user.roles:
-                await interaction.response.send_message(
-                    f"❌ {user.mention} は `{event_name}` ロールを持っていません。",
-                    ephemeral=True
-                )
-                return
-
-            # ユーザーからロールを削除
-            await user.remove_roles(event_role)
-            
-            # 成功メッセージを送信
-            await interaction.response.send_message(
-                f"✅ {user.mention} から `{event_name}` ロールを削除しました。"
-            )
-
+            await self.update_event_role(interaction, False, user, users, file, source_role)
         except Exception as e:
-            await interaction.response.send_message(format_error_message(e))
+            await self.send_error(interaction, e)
+
+    async def send_error(self, interaction: discord.Interaction, error: Exception) -> None:
+        if interaction.response.is_done():
+            await interaction.followup.send(format_error_message(error))
+        else:
+            await interaction.response.send_message(format_error_message(error))
 
 async def setup(bot: commands.Bot):
-    await bot.add_cog(RoleManagement(bot)) 
\ No newline at end of file
+    await bot.add_cog(RoleManagement(bot))
@@ -2,40 +2,42 @@ import discord
 from discord import app_commands
 from discord.ext import commands
 
-from utils.checks import is_admin_channel, has_staff_role, is_administrator
-from utils.helpers import format_error_message, get_category_by_name
+from utils.checks import is_season_admin
+from utils.helpers import format_error_message, get_category_by_name, get_role_by_name
+from utils.provisioning import ProvisioningScheduler, raise_for_failures
+from utils.season_layout import LayoutChange, build_season_layout, schedule_changes
 
 class Categories(commands.Cog):
     def __init__(self, bot: commands.Bot):
         self.bot = bot
 
-    async def create_categories_internal(self, guild, semester):
+    def plan_categories(self, scheduler: ProvisioningScheduler, guild, semester):
+        """指定した学期のカテゴリの作成を予約する"""
         teacher_category = get_category_by_name(guild, f"👨‍🏫 {semester}期職員")
         student_category = get_category_by_name(guild, f"👨‍🎓 {semester}期生徒")
         if teacher_category or student_category:
             raise Exception(f"{semester}期のカテゴリは既に存在します。")
-        semester_teacher_role = discord.utils.get(guild.roles, name=f"{semester}期職員")
-        if not semester_teacher_role:
+        teacher_role_key = f"role:{semester}期職員"
+        if teacher_role_key not in scheduler and not get_role_by_name(guild, f"{semester}期職員"):
             raise Exception(f"{semester}期職員のロールが見つかりません。先にロールを作成してください。")
-        teacher_category_name = f"👨‍🏫 {semester}期職員"
-        overwrites_teacher_category = {
-            guild.default_role: discord.PermissionOverwrite(view_channel=False),
-            semester_teacher_role: discord.PermissionOverwrite(view_channel=True)
-        }
-        await guild.create_category(
-            teacher_category_name,
-            overwrites=overwrites_teacher_category
-        )
-        student_category_name = f"👨‍🎓 {semester}期生徒"
-        await guild.create_category(student_category_name)
+
+        layout = build_season_layout(semester, 0)
+        schedule_changes(scheduler, guild, [LayoutChange("create", "category", spec) for spec in layout.categories])
+
+    async def create_categories_internal(self, guild, semester):
+        scheduler = ProvisioningScheduler.from_settings()
+        self.plan_categories(scheduler, guild, semester)
+        results = await scheduler.run()
+        # 作成したもののIDを期の構成の記録に追加する
+        values = {key: result.value for key, result in results.items() if result.ok}
+        await self.bot.season_registry.record(guild, build_season_layout(semester, 0), values, merge=True)
+        raise_for_failures(results)
 
     @app_commands.command(name="sakuraria_create_categories", description="指定した学期のカテゴリを作成します")
     @app_commands.describe(
         semester="学期（数字）"
     )
-    @is_admin_channel()
-    @has_staff_role()
-    @is_administrator()
+    @is_season_admin()
     async def create_categories(self, interaction: discord.Interaction, semester: int):
         try:
             await interaction.response.send_message('カテゴリを作成中です...')
@@ -1,69 +1,69 @@
+import io
+import time
+from typing import List, NamedTuple
+
 import discord
 from discord import app_commands
 from discord.ext import commands
 
-from utils.checks import is_admin_channel, has_staff_role, is_administrator
-from utils.helpers import format_error_message, get_category_by_name
+from utils.checks import is_season_admin
+from utils.bulk_roles import BulkRoleAssigner
+from utils.helpers import format_error_message, get_category_by_name, get_role_by_name
+from utils.progress import ProgressReporter
+from utils.provisioning import ProvisioningScheduler, raise_for_failures, summarize_failures
+from utils.runtime_profile import ensure_members_loaded
+from utils.season_layout import LayoutChange, build_archive_category_spec, build_season_layout, read_only_overwrites, resolve_overwrites, schedule_changes
+from utils.season_registry import season_channel_ids
+from config.settings import ARCHIVE_SETTINGS, JOB_SETTINGS
+
+
+class ArchiveResult(NamedTuple):
+    """アーカイブカテゴリへの移動の結果"""
+    categories: List[discord.CategoryChannel]  # 移動先のカテゴリ
+    failures: List[str]                         # 発言を止められなかったチャンネル（「キー: 理由」）
+    removed_categories: List[str]               # 空になったため削除した元のカテゴリ
+    remaining_categories: List[str]             # チャンネルが残っている・削除に失敗したため残した元のカテゴリ
+
 
 class Channels(commands.Cog):
     def __init__(self, bot: commands.Bot):
         self.bot = bot
 
-    async def create_channels_internal(self, guild, semester, class_count):
-        teacher_category = get_category_by_name(guild, f"👨‍🏫 {semester}期職員")
-        student_category = get_category_by_name(guild, f"👨‍🎓 {semester}期生徒")
-        if not teacher_category or not student_category:
+    def plan_channels(self, scheduler: ProvisioningScheduler, guild, semester, class_count):
+        """指定した学期のチャンネルの作成を予約する"""
+        teacher_category_key = f"category:👨‍🏫 {semester}期職員"
+        student_category_key = f"category:👨‍🎓 {semester}期生徒"
+        semester_student_role_key = f"role:{semester}期生"
+        semester_teacher_role_key = f"role:{semester}期職員"
+        if (
+            (teacher_category_key not in scheduler and not get_category_by_name(guild, f"👨‍🏫 {semester}期職員"))
+            or (student_category_key not in scheduler and not get_category_by_name(guild, f"👨‍🎓 {semester}期生徒"))
+        ):
             raise Exception(f"{semester}期のカテゴリが見つかりません。先にカテゴリを作成してください。")
-        semester_student_role = discord.utils.get(guild.roles, name=f"{semester}期生")
-        semester_teacher_role = discord.utils.get(guild.roles, name=f"{semester}期職員")
-        if not semester_student_role or not semester_teacher_role:
+        if (
+            (semester_student_role_key not in scheduler and not get_role_by_name(guild, f"{semester}期生"))
+            or (semester_teacher_role_key not in scheduler and not get_role_by_name(guild, f"{semester}期職員"))
+        ):
             raise Exception(f"{semester}期のロールが見つかりません。先にロールを作成してください。")
-        overwrites_semester_channel = {
-            guild.default_role: discord.PermissionOverwrite(view_channel=False),
-            semester_student_role: discord.PermissionOverwrite(view_channel=True),
-            semester_teacher_role: discord.PermissionOverwrite(view_channel=True)
-        }
-        await guild.create_text_channel(
-            name=f"📗📢｜{semester}期連絡",
-            category=student_category,
-            overwrites=overwrites_semester_channel
-        )
-        for i in range(1, class_count + 1):
-            await guild.create_text_channel(
-                name=f"📗📝｜{semester}-{i}教員",
-                category=teacher_category
-            )
-        for i in range(1, class_count + 1):
-            student_role = discord.utils.get(guild.roles, name=f"{semester}-{i}生徒")
-            overwrites_class_channel = {
-                guild.default_role: discord.PermissionOverwrite(view_channel=False),
-                student_role: discord.PermissionOverwrite(view_channel=True, send_messages=True),
-                semester_teacher_role: discord.PermissionOverwrite(view_channel=True, send_messages=True)
-            }
-            await guild.create_text_channel(
-                name=f"📗💬｜{semester}-{i}雑談",
-                category=student_category,
-                overwrites=overwrites_class_channel
-            )
-            await guild.create_text_channel(
-                name=f"📗📸｜{semester}-{i}写真",
-                category=student_category,
-                overwrites=overwrites_class_channel
-            )
-            await guild.create_text_channel(
-                name=f"📗📢｜{semester}-{i}連絡",
-                category=student_category,
-                overwrites=overwrites_class_channel
-            )
+
+        layout = build_season_layout(semester, class_count)
+        schedule_changes(scheduler, guild, [LayoutChange("create", "channel", spec) for spec in layout.channels])
+
+    async def create_channels_internal(self, guild, semester, class_count):
+        scheduler = ProvisioningScheduler.from_settings()
+        self.plan_channels(scheduler, guild, semester, class_count)
+        results = await scheduler.run()
+        # 作成したもののIDを期の構成の記録に追加する
+        values = {key: result.value for key, result in results.items() if result.ok}
+        await self.bot.season_registry.record(guild, build_season_layout(semester, class_count), values, merge=True)
+        raise_for_failures(results)
 
     @app_commands.command(name="sakuraria_create_channels", description="指定した学期のチャンネルを作成します")
     @app_commands.describe(
         semester="学期（数字）",
         class_count="クラス数"
     )
-    @is_admin_channel()
-    @has_staff_role()
-    @is_administrator()
+    @is_season_admin()
     async def create_channels(self, interaction: discord.Interaction, semester: int, class_count: int):
         try:
             await interaction.response.send_message('チャンネルを作成中です...')
@@ -79,30 +79,105 @@ class Channels(commands.Cog):
         except Exception as e:
             await interaction.followup.send(format_error_message(e))
 
+    async def archive_season_channels(self, guild, semester, season, channels) -> ArchiveResult:
+        """期のチャンネルをアーカイブカテゴリへまとめて移動する
+
+        移動はチャンネルごとに編集せず、1回の一括更新（チャンネルの並び替えの API）で行う。
+        教員用チャンネルは期職員だけが閲覧できるカテゴリに移して権限を合わせ、
+        生徒用のチャンネルはクラスごとの閲覧範囲を保ったまま発言だけできないようにする。
+        """
+        staff_channel_ids = {
+            class_entry["channels"]["staff"] for class_entry in season["classes"].values() if "staff" in class_entry["channels"]
+        }
+        staff_channels = [channel for channel in channels if channel.id in staff_channel_ids]
+        student_channels = [channel for channel in channels if channel.id not in staff_channel_ids]
+
+        limit = ARCHIVE_SETTINGS["max_channels_per_category"]
+        recorded = season["categories"]
+        categories = []
+        payload = []
+        for staff, group in ((True, staff_channels), (False, student_channels)):
+            for index, start in enumerate(range(0, len(group), limit)):
+                spec = build_archive_category_spec(semester, index, staff)
+                category = guild.get_channel(recorded[spec.slot]) if spec.slot in recorded else None
+                category = category or get_category_by_name(guild, spec.name)
+                if category is None:
+                    category = await guild.create_category(spec.name, overwrites=resolve_overwrites(guild, spec.overwrites, {}))
+                categories.append((spec.slot, category))
+                for position, channel in enumerate(group[start:start + limit]):
+                    payload.append({
+                        "id": channel.id,
+                        "parent_id": category.id,
+                        "position": position,
+                        # 教員用チャンネルは自分の権限を持たないため、期職員だけのカテゴリに合わせる
+                        "lock_permissions": staff
+                    })
+        await self.bot.http.bulk_channel_update(guild.id, payload, reason=f"{semester}期のOB移行")
+        # 期の削除でアーカイブカテゴリも削除されるよう記録する
+        await self.bot.season_registry.record_categories(guild.id, semester, {slot: category.id for slot, category in categories})
+
+        # 移動で空になった元のカテゴリ（職員・生徒）を削除する。期以外のチャンネルが残っている場合は残す
+        moved_ids = {channel.id for channel in channels}
+        removed_slots, removed_categories, remaining_categories = [], [], []
+        for slot in ("staff", "student"):
+            category = guild.get_channel(recorded[slot]) if slot in recorded else None
+            if category is None:
+                continue
+            if any(channel.id not in moved_ids for channel in category.channels):
+                remaining_categories.append(f"{category.name}（チャンネルが残っています）")
+                continue
+            try:
+                await category.delete(reason=f"{semester}期のOB移行")
+            except discord.HTTPException as e:
+                remaining_categories.append(f"{category.name}（削除に失敗しました: {e}）")
+                continue
+            removed_slots.append(slot)
+            removed_categories.append(category.name)
+        await self.bot.season_registry.forget_categories(guild.id, semester, removed_slots)
+
+        # 生徒用のチャンネルはカテゴリに合わせるとクラスの閲覧制限が外れるため、自分の権限で発言だけを止める
+        scheduler = ProvisioningScheduler.from_settings()
+        for channel in student_channels:
+            async def make_read_only(values, channel=channel):
+                await channel.edit(overwrites=read_only_overwrites(guild, channel.overwrites), reason=f"{semester}期のOB移行")
+                return channel
+            scheduler.add(f"channel:{channel.name}", "channels:update", make_read_only)
+        results = await scheduler.run() if len(scheduler) else {}
+        return ArchiveResult(
+            [category for _, category in categories], summarize_failures(results), removed_categories, remaining_categories
+        )
+
     @app_commands.command(name="sakuraria_next_season", description="指定した学期の生徒にOBロールを付与し、チャンネル名を更新します")
     @app_commands.describe(
-        semester="学期（数字）"
+        semester="学期（数字）",
+        mode="チャンネルの扱い（省略時はチャンネル名の変更のみ）"
     )
-    @is_admin_channel()
-    @has_staff_role()
-    @is_administrator()
-    async def next_season(self, interaction: discord.Interaction, semester: int):
+    @app_commands.choices(mode=[
+        app_commands.Choice(name="チャンネル名を変更（📗→📙）", value="rename"),
+        app_commands.Choice(name="アーカイブカテゴリへまとめて移動", value="archive")
+    ])
+    @is_season_admin()
+    async def next_season(self, interaction: discord.Interaction, semester: int, mode: str = "rename"):
         try:
             await interaction.response.send_message('OBロールの付与とチャンネル名の更新を開始します...')
 
+            # 期の構成の記録を取得（記録がない期は名前から探して記録する）
+            season = await self.bot.season_registry.topology(interaction.guild, semester)
+
             # 期生ロールの存在確認
-            semester_student_role = discord.utils.get(interaction.guild.roles, name=f"{semester}期生")
+            semester_student_role = interaction.guild.get_role(season["roles"]["student"]) if season and "student" in season["roles"] else None
             if not semester_student_role:
                 await interaction.followup.send(f'❌ {semester}期生のロールが見つかりません。')
                 return
 
             # OBロールの存在確認
-            ob_role = discord.utils.get(interaction.guild.roles, name="OB")
+            ob_role = get_role_by_name(interaction.guild, "OB")
             if not ob_role:
                 await interaction.followup.send('❌ OBロールが見つかりません。先に /create_first_roll コマンドを実行してください。')
                 return
 
-            # 期生ロールを持つメンバーを取得
+            # 期生ロールを持つメンバーを取得（起動時にメンバー一覧を読み込まない設定では、ここで読み込む）
+            await ensure_members_loaded(interaction.guild)
             members_with_role = semester_student_role.members
             if not members_with_role:
                 await interaction.followup.send(f'⚠️ {semester}期生のロールを持つメンバーが見つかりません。処理を続行します。')
@@ -115,42 +190,88 @@ class Channels(commands.Cog):
                         await interaction.followup.send(f'❌ 1期生のメンバーは既にOBロールを持っています。このコマンドは実行できません。')
                         return
 
-            # OBロールを付与
-            updated_members = []
-            for member in members_with_role:
-                if ob_role not in member.roles:
-                    await member.add_roles(ob_role)
-                    updated_members.append(member.name)
-
-            # チャンネル名の更新
-            updated_channels = []
-            for channel in interaction.guild.text_channels:
-                if channel.name.startswith(f"📗") and str(semester) in channel.name:
-                    new_name = channel.name.replace("📗", "📙", 1)
-                    await channel.edit(name=new_name)
-                    updated_channels.append(channel.name)
-
-            # 結果を報告
+            # OBロールを付与（同時実行数を制限して並行に実行し、進捗は1つのメッセージを編集して表示する）
+            members_to_update = [member for member in members_with_role if ob_role not in member.roles]
+            started = time.perf_counter()
+            results = []
+            if members_to_update:
+                progress_message = await interaction.followup.send(
+                    f'⏳ OBロールを付与しています: 0/{len(members_to_update)}', wait=True
+                )
+                reporter = ProgressReporter(progress_message, JOB_SETTINGS["progress_interval"])
+                def on_result(result):
+                    results.append(result)
+                    reporter.update(f'⏳ OBロールを付与しています: {len(results)}/{len(members_to_update)}')
+                await BulkRoleAssigner().add_role(members_to_update, ob_role, on_result=on_result)
+                succeeded = sum(1 for result in results if result.ok)
+                await reporter.finish(f'✅ OBロールの付与が終わりました: {succeeded}/{len(members_to_update)}')
+            updated_members = [result.member.name for result in results if result.ok]
+            failed_members = [result for result in results if not result.ok]
+            elapsed = time.perf_counter() - started
+
+            channels = [
+                channel for channel in (interaction.guild.get_channel(channel_id) for channel_id in season_channel_ids(season))
+                if channel
+            ]
+
+            # アーカイブカテゴリへの移動（全チャンネルを1回の一括更新で移動する）
+            archive = None
+            if mode == "archive" and channels:
+                archive = await self.archive_season_channels(interaction.guild, semester, season, channels)
+
+            # チャンネル名の更新（チャンネルごとのレート制限が厳しいため、予約してバックグラウンドで順に反映する）
+            renamed_channels = []
+            if mode == "rename" or ARCHIVE_SETTINGS["rename"]:
+                renamed_channels = [
+                    (channel, channel.name.replace("📗", "📙", 1)) for channel in channels if channel.name.startswith("📗")
+                ]
+                await self.bot.rename_queue.enqueue(
+                    interaction.guild.id, [(channel.id, new_name) for channel, new_name in renamed_channels]
+                )
+
+            # 結果を報告（概要だけをメッセージにし、一覧はファイルとして添付する）
             result_message = []
+            details = []
             
             if updated_members:
-                result_message.append(
-                    f'✅ 以下のメンバーにOBロールを付与しました：\n'
-                    f'{chr(10).join([f"- {name}" for name in updated_members])}'
-                )
+                result_message.append(f'✅ {len(updated_members)}人にOBロールを付与しました（{elapsed:.1f}秒）。')
+                details.append("■ OBロールを付与したメンバー\n" + "\n".join(f"- {name}" for name in updated_members))
             else:
-                if members_with_role:
+                if members_with_role and not failed_members:
                     result_message.append(f'ℹ️ {semester}期生のメンバーは既にOBロールを持っています。')
 
-            if updated_channels:
+            if failed_members:
+                result_message.append(f'❌ {len(failed_members)}人へのOBロールの付与に失敗しました。')
+                details.append(
+                    "■ OBロールの付与に失敗したメンバー\n"
+                    + "\n".join(f"- {result.member.name}: {result.error}" for result in failed_members)
+                )
+
+            if archive:
                 result_message.append(
-                    f'✅ 以下のチャンネルの名前を更新しました：\n'
-                    f'{chr(10).join([f"- {name}" for name in updated_channels])}'
+                    f'✅ {len(channels)}個のチャンネルを {"、".join(category.name for category in archive.categories)} に移動しました。'
                 )
-            else:
+                details.append("■ アーカイブカテゴリに移動したチャンネル\n" + "\n".join(f"- {channel.name}" for channel in channels))
+                if archive.removed_categories:
+                    result_message.append(f'🗑️ 空になったカテゴリを削除しました：{"、".join(archive.removed_categories)}')
+                if archive.remaining_categories:
+                    result_message.append(f'⚠️ 以下のカテゴリは残っています：{"、".join(archive.remaining_categories)}')
+                if archive.failures:
+                    result_message.append(f'❌ {len(archive.failures)}個のチャンネルで発言を止められませんでした。')
+                    details.append("■ 発言を止められなかったチャンネル\n" + "\n".join(f"- {failure}" for failure in archive.failures))
+            if renamed_channels:
+                result_message.append(
+                    f'🕒 {len(renamed_channels)}個のチャンネルの名前の変更を予約しました（チャンネルごとのレート制限の範囲で順に反映されます）。'
+                )
+                details.append("■ 名前の変更を予約したチャンネル\n" + "\n".join(f"- {channel.name} → {new_name}" for channel, new_name in renamed_channels))
+            if not archive and not renamed_channels:
                 result_message.append(f'⚠️ 更新対象のチャンネルが見つかりませんでした。')
 
-            await interaction.followup.send("\n\n".join(result_message))
+            if details:
+                file = discord.File(io.BytesIO("\n\n".join(details).encode("utf-8")), filename=f"next_season_{semester}.txt")
+                await interaction.followup.send("\n".join(result_message), file=file)
+            else:
+                await interaction.followup.send("\n".join(result_message))
 
         except Exception as e:
             await interaction.followup.send(format_error_message(e))
@@ -1,21 +1,141 @@
+import asyncio
+
 import discord
 from discord import app_commands
 from discord.ext import commands
 
-from utils.checks import is_admin_channel, has_staff_role, is_administrator
-from utils.helpers import format_error_message, save_reaction_roles
-from config.settings import STAFF_ROLE_NAME, UNASSIGNED_ROLE_NAME, REACTION_ROLE_CHANNELS
+from utils.checks import is_season_admin
+from utils.helpers import format_error_message, get_role_by_name, load_reaction_roles
+from utils.metrics import instrument_event
+from utils.reaction_index import ReactionRoleIndex, reaction_role_semester_kind
+from utils.reaction_reconciler import ReactionReconciler
+from utils.role_picker import RolePickerSelect, build_role_picker_view
+from utils.role_buffer import MemberRoleBuffer
+from utils.audit_feed import AuditFeed, AuditFlushPolicy
+from config.settings import (
+    STAFF_ROLE_NAME, UNASSIGNED_ROLE_NAME, REACTION_ROLE_CHANNELS, ROLE_UPDATE_SETTINGS, AUDIT_FEED_SETTINGS,
+    REACTION_RECONCILE_SETTINGS, ROLE_PICKER_SETTINGS
+)
+
+def member_label(member, user_id: int) -> str:
+    """管理用チャンネルへの記録に使うメンバーの表示名（キャッシュにない場合はID）"""
+    return member.name if member else str(user_id)
 
 class ReactionRoles(commands.Cog):
     def __init__(self, bot: commands.Bot):
         self.bot = bot
         self.reaction_roles = {}
+        self.index = ReactionRoleIndex(bot.season_registry)
+        self.role_buffer = MemberRoleBuffer(
+            delay=ROLE_UPDATE_SETTINGS["debounce_seconds"],
+            confirm_ttl=ROLE_UPDATE_SETTINGS["confirm_ttl"],
+            shard_count=ROLE_UPDATE_SETTINGS["shard_count"],
+            workers_per_shard=ROLE_UPDATE_SETTINGS["workers_per_shard"]
+        )
+        self.audit_feed = AuditFeed(bot, AuditFlushPolicy(**AUDIT_FEED_SETTINGS))
+        self.reconciler = ReactionReconciler(self)
+
+    async def cog_load(self):
+        # 設定の読み込みはプロセスにつき1回だけ行う（再接続時の on_ready では読み直さない）
+        self.set_reaction_roles(await load_reaction_roles(self.bot.state_store))
+        self.audit_feed.start()
+        # 再起動前に送った選択メニューの操作も受け取れるようにする
+        self.bot.add_dynamic_items(RolePickerSelect)
+
+    async def cog_unload(self):
+        self.bot.remove_dynamic_items(RolePickerSelect)
+        # 未反映のロール変更と管理用チャンネルへの記録を残さない
+        await self.reconciler.close()
+        await self.role_buffer.close()
+        await self.audit_feed.close()
+
+    @commands.Cog.listener()
+    async def on_ready(self):
+        # 停止中・再接続中に付け外しされたリアクションはイベントが届かないため、接続のたびにバックグラウンドで確認する
+        if REACTION_RECONCILE_SETTINGS["enabled"]:
+            self.reconciler.start()
+
+    def set_reaction_roles(self, reaction_roles: dict) -> None:
+        """読み込んだリアクションロールの設定を反映する"""
+        self.reaction_roles = reaction_roles
+        self.index.load(reaction_roles)
+
+    def get_guild_for_event(self, guild_id: int) -> discord.Guild:
+        """イベントのサーバーを取得し、必要ならそのサーバーの索引を作る"""
+        guild = self.bot.get_guild(guild_id) if guild_id else None
+        if guild and not self.index.is_built(guild.id):
+            # サーバーIDが未記録だった設定はここで記録し直す
+            for message_id in self.index.build_guild(guild):
+                asyncio.create_task(
+                    self.bot.state_store.save_reaction_role(message_id, self.reaction_roles[message_id])
+                )
+        return guild
+
+    async def register_reaction_role_message(self, message: discord.Message, role_emojis: dict, semester: int, kind: str, mode: str = "reaction") -> None:
+        """リアクションロールメッセージを登録し、ストアに保存する（選択メニューの場合は絵文字の代わりに選択肢の値を記録する）"""
+        guild = message.guild
+        roles = [get_role_by_name(guild, role_name) for role_name in role_emojis.keys()]
+        self.reaction_roles[message.id] = {
+            "guild_id": guild.id,
+            "channel_id": message.channel.id,
+            "semester": semester,
+            "kind": kind,
+            "mode": mode,
+            "roles": [role.id for role in roles if role],
+            "emojis": role_emojis
+        }
+        self.index.register(guild, message.id, self.reaction_roles[message.id])
+        
+        # 設定をストアに保存（変更したメッセージの分だけ書き込む）
+        await self.bot.state_store.save_reaction_role(message.id, self.reaction_roles[message.id])
+        # 期の構成にも記録する
+        await self.bot.season_registry.record_reaction_message(guild.id, semester, kind, message.channel.id, message.id)
+
+    def find_reaction_role_message(self, guild_id: int, semester: int, kind: str):
+        """登録済みのリアクションロールメッセージのIDを探す（kind は "staff" または "student"）"""
+        season = self.bot.season_registry.get(guild_id, semester)
+        recorded = season["reaction_messages"].get(kind) if season else None
+        if recorded and recorded["message_id"] in self.reaction_roles:
+            return recorded["message_id"]
+        for message_id, data in self.reaction_roles.items():
+            if data.get("guild_id") not in (guild_id, None):
+                continue
+            if reaction_role_semester_kind(data) == (semester, kind):
+                return message_id
+        return None
+
+    def reaction_role_messages(self, guild: discord.Guild, semester: int) -> list:
+        """サーバー・学期のリアクションロールメッセージの (メッセージID, 設定) を返す"""
+        # サーバーIDが未記録の旧形式の設定もこのサーバーのものとして扱えるよう、先に索引を作る
+        self.get_guild_for_event(guild.id)
+        return [(message_id, self.reaction_roles[message_id]) for message_id in self.index.semester_messages(guild.id, semester)]
+
+    async def forget_reaction_role_messages(self, message_ids) -> None:
+        """削除されたリアクションロールメッセージの設定を、索引・ストア・期の構成の記録から消す"""
+        for message_id in message_ids:
+            data = self.reaction_roles.pop(message_id, None)
+            if data is None:
+                continue
+            self.index.unregister(message_id)
+            await self.bot.state_store.delete_reaction_role(message_id)
+            if data.get("guild_id"):
+                await self.bot.season_registry.forget_reaction_message(data["guild_id"], message_id)
 
-    async def create_class_selection_message(self, channel: discord.TextChannel, semester: int, class_count: int) -> discord.Message:
+    async def create_class_selection_message(self, channel: discord.TextChannel, semester: int, class_count: int, mode: str = "reaction") -> discord.Message:
         """クラス選択用のリアクションロールメッセージを作成する"""
+        unassigned_role_id = get_role_by_name(channel.guild, UNASSIGNED_ROLE_NAME).id
+        if mode == "select":
+            # 選択メニュー：リアクションを付ける必要がなく、10クラス以上でも作成できる
+            role_values = {f"{semester}-{i}生徒": str(i) for i in range(1, class_count + 1)}
+            content = f"## {semester}期のクラス選択\n"
+            content += f"<@&{unassigned_role_id}> 下のメニューから、あなたのクラスを選択してください。"
+            message = await channel.send(content, view=build_role_picker_view(role_values, multiple=False))
+            await self.register_reaction_role_message(message, role_values, semester, "student", mode)
+            return message
+
         # メッセージの内容を作成
         content = f"## {semester}期のクラス選択\n"
-        content += f"<@&{discord.utils.get(channel.guild.roles, name=UNASSIGNED_ROLE_NAME).id}> 以下のリアクションをクリックして、あなたのクラスを選択してください：\n\n"
+        content += f"<@&{unassigned_role_id}> 以下のリアクションをクリックして、あなたのクラスを選択してください：\n\n"
         
         # ロールと絵文字の対応を設定
         role_emojis = {}
@@ -34,20 +154,23 @@ class ReactionRoles(commands.Cog):
             await message.add_reaction(emoji)
         
         # リアクションロールの設定を保存
-        self.reaction_roles[message.id] = {
-            "roles": [discord.utils.get(channel.guild.roles, name=role_name) for role_name in role_emojis.keys()],
-            "emojis": role_emojis
-        }
-        
-        # 設定をJSONファイルに保存
-        save_reaction_roles(self.reaction_roles)
+        await self.register_reaction_role_message(message, role_emojis, semester, "student")
         
         return message
 
-    async def create_reaction_role_message(self, channel: discord.TextChannel, roles: list, semester: int) -> discord.Message:
+    async def create_reaction_role_message(self, channel: discord.TextChannel, roles: list, semester: int, mode: str = "reaction") -> discord.Message:
         """リアクションロールのメッセージを作成する"""
         # メッセージの内容を作成
-        staff_role = discord.utils.get(channel.guild.roles, name=STAFF_ROLE_NAME)
+        staff_role = get_role_by_name(channel.guild, STAFF_ROLE_NAME)
+        if mode == "select":
+            # 選択メニュー：担当クラスは複数選択できる
+            role_values = {f"{semester}-{i}職員": str(i) for i in range(1, len(roles) + 1)}
+            content = f"## {staff_role.mention} 各位。{semester}期のロールを選択してください。\n"
+            content += "下のメニューから、あなたの担当クラスを選択してください（複数選択できます）。"
+            message = await channel.send(content, view=build_role_picker_view(role_values, multiple=True))
+            await self.register_reaction_role_message(message, role_values, semester, "staff", mode)
+            return message
+
         content = f"## {staff_role.mention} 各位。{semester}期のロールを選択してください。\n"
         content += "以下のリアクションをクリックして、あなたの担当クラスを選択してください：\n\n"
         
@@ -68,150 +191,208 @@ class ReactionRoles(commands.Cog):
             await message.add_reaction(emoji)
         
         # リアクションロールの設定を保存
-        self.reaction_roles[message.id] = {
-            "roles": [discord.utils.get(channel.guild.roles, name=role_name) for role_name in role_emojis.keys()],
-            "emojis": role_emojis
-        }
-        
-        # 設定をJSONファイルに保存
-        save_reaction_roles(self.reaction_roles)
+        await self.register_reaction_role_message(message, role_emojis, semester, "staff")
         
         return message
 
-    async def create_reaction_roles_internal(self, guild, semester, class_count):
-        semester_student_role = discord.utils.get(guild.roles, name=f"{semester}期生")
-        semester_teacher_role = discord.utils.get(guild.roles, name=f"{semester}期職員")
+    async def create_reaction_roles_internal(self, guild, semester, class_count, kinds=("staff", "student"), mode=None):
+        mode = mode or ROLE_PICKER_SETTINGS["mode"]
+        semester_student_role = get_role_by_name(guild, f"{semester}期生")
+        semester_teacher_role = get_role_by_name(guild, f"{semester}期職員")
         if not semester_student_role or not semester_teacher_role:
             raise Exception(f"{semester}期のロールが見つかりません。先にロールを作成してください。")
         teacher_roles = []
         for i in range(1, class_count + 1):
-            teacher_role = discord.utils.get(guild.roles, name=f"{semester}-{i}職員")
+            teacher_role = get_role_by_name(guild, f"{semester}-{i}職員")
             if teacher_role:
                 teacher_roles.append(teacher_role)
         
         # 職員用リアクションロールチャンネルの取得
-        staff_channel = next((channel for channel in guild.text_channels if REACTION_ROLE_CHANNELS["staff"] in channel.name), None)
-        if staff_channel:
-            await self.create_reaction_role_message(staff_channel, teacher_roles, semester)
-        else:
-            raise Exception(f"職員用リアクションロールチャンネル（{REACTION_ROLE_CHANNELS['staff']}）が見つかりません。")
+        if "staff" in kinds:
+            staff_channel = next((channel for channel in guild.text_channels if REACTION_ROLE_CHANNELS["staff"] in channel.name), None)
+            if staff_channel:
+                await self.create_reaction_role_message(staff_channel, teacher_roles, semester, mode)
+            else:
+                raise Exception(f"職員用リアクションロールチャンネル（{REACTION_ROLE_CHANNELS['staff']}）が見つかりません。")
         
         # 生徒用リアクションロールチャンネルの取得
-        student_channel = next((channel for channel in guild.text_channels if REACTION_ROLE_CHANNELS["student"] in channel.name), None)
-        if student_channel:
-            await self.create_class_selection_message(student_channel, semester, class_count)
-        else:
-            raise Exception(f"生徒用リアクションロールチャンネル（{REACTION_ROLE_CHANNELS['student']}）が見つかりません。")
+        if "student" in kinds:
+            student_channel = next((channel for channel in guild.text_channels if REACTION_ROLE_CHANNELS["student"] in channel.name), None)
+            if student_channel:
+                await self.create_class_selection_message(student_channel, semester, class_count, mode)
+            else:
+                raise Exception(f"生徒用リアクションロールチャンネル（{REACTION_ROLE_CHANNELS['student']}）が見つかりません。")
 
     @app_commands.command(name="sakuraria_create_reaction_roles", description="指定した学期のリアクションロールメッセージを作成します")
     @app_commands.describe(
         semester="学期（数字）",
-        class_count="クラス数"
+        class_count="クラス数",
+        mode="ロールの選び方（省略時は設定の既定値）"
     )
-    @is_admin_channel()
-    @has_staff_role()
-    @is_administrator()
-    async def create_reaction_roles(self, interaction: discord.Interaction, semester: int, class_count: int):
+    @app_commands.choices(mode=[
+        app_commands.Choice(name="リアクション", value="reaction"),
+        app_commands.Choice(name="選択メニュー", value="select")
+    ])
+    @is_season_admin()
+    async def create_reaction_roles(self, interaction: discord.Interaction, semester: int, class_count: int, mode: str = None):
         try:
             await interaction.response.send_message('リアクションロールメッセージを作成中です...')
-            await self.create_reaction_roles_internal(interaction.guild, semester, class_count)
+            await self.create_reaction_roles_internal(interaction.guild, semester, class_count, mode=mode)
             await interaction.followup.send(
                 f'✅ リアクションロールメッセージを作成しました。'
             )
         except Exception as e:
             await interaction.followup.send(format_error_message(e))
 
+    async def apply_role_picker_choice(self, interaction: discord.Interaction, values: list, scope: list) -> None:
+        """選択メニューで選んだロールを、1回のロール更新でまとめて反映する"""
+        message_id = interaction.message.id if interaction.message else None
+        data = self.reaction_roles.get(message_id)
+        guild = self.get_guild_for_event(interaction.guild_id)
+        member = interaction.user
+        if data is None or guild is None or not isinstance(member, discord.Member):
+            await interaction.response.send_message("❌ このメニューは現在使用できません。", ephemeral=True)
+            return
+
+        # メッセージの選択肢ごとの付与先（ロールが削除されているものは除く）
+        targets = {}
+        for value in data["emojis"].values():
+            target = self.index.resolve(message_id, value)
+            if target and guild.get_role(target.role_id):
+                targets[value] = target
+        # 生徒のクラスは1つだけなので、メッセージ全体の選択を置き換える（職員は操作した選択メニューの分だけ）
+        if data.get("kind") == "student":
+            scope = list(targets)
+        chosen = [targets[value] for value in values if value in targets and value in scope]
+        kept = [target for value, target in targets.items() if value not in scope and member.get_role(target.role_id)]
+        selected = chosen + kept
+        removed = [target for value, target in targets.items() if value in scope and target not in chosen]
+
+        # 外したロールの期のロールは、ほかに同じ期のロールを選んでいなければ外す
+        guild_targets = self.index.guild_targets(guild.id)
+        selected_parents = {target.parent_role_id for target in selected}
+        self.role_buffer.remove(member, *(target.role_id for target in removed))
+        self.role_buffer.remove(member, *(target.parent_role_id for target in removed if target.parent_role_id not in selected_parents))
+        self.role_buffer.add(member, *(target.role_id for target in chosen), *selected_parents)
+        if selected:
+            self.role_buffer.remove(member, guild_targets.unassigned_role_id)
+        else:
+            self.role_buffer.add(member, guild_targets.unassigned_role_id)
+
+        names = "、".join(f"`{target.role_name}`" for target in chosen)
+        if chosen:
+            await interaction.response.send_message(f"✅ {names} を選択しました。", ephemeral=True)
+        else:
+            await interaction.response.send_message("✅ 選択を解除しました。", ephemeral=True)
+        self.audit_feed.log(
+            guild_targets.log_channel_id,
+            f"`{member.name}` のロールを選択メニューで変更しました（{names or '選択なし'}）。"
+        )
+
     @commands.Cog.listener()
+    @instrument_event
     async def on_raw_reaction_add(self, payload: discord.RawReactionActionEvent):
         if payload.user_id == self.bot.user.id:
             return
         
-        # メッセージIDがリアクションロールの設定に含まれているか確認
-        if payload.message_id in self.reaction_roles:
-            guild = self.bot.get_guild(payload.guild_id)
-            member = guild.get_member(payload.user_id)
-            emoji = str(payload.emoji)
-            
-            # 絵文字に対応するロールを取得
-            role_type = None
-            for role_type_name, role_emoji in self.reaction_roles[payload.message_id]["emojis"].items():
-                if emoji == role_emoji:
-                    role_type = role_type_name
-                    break
-            
-            if role_type:
-                # 対応するロールを探して付与
-                for role in self.reaction_roles[payload.message_id]["roles"]:
-                    if role.name == role_type:
-                        await member.add_roles(role)
-                        # クラスロールの場合、期生のロールも付与
-                        if role.name.endswith("生徒"):
-                            semester = role.name.split("-")[0]  # 期数を取得
-                            semester_role = discord.utils.get(guild.roles, name=f"{semester}期生")
-                            if semester_role:
-                                await member.add_roles(semester_role)
-                        # 職員ロールの場合、期職員のロールも付与
-                        elif role.name.endswith("職員"):
-                            semester = role.name.split("-")[0]  # 期数を取得
-                            semester_role = discord.utils.get(guild.roles, name=f"{semester}期職員")
-                            if semester_role:
-                                await member.add_roles(semester_role)
-                        
-                        # ロール未付与ロールを削除
-                        unassigned_role = discord.utils.get(guild.roles, name=UNASSIGNED_ROLE_NAME)
-                        if unassigned_role and unassigned_role in member.roles:
-                            await member.remove_roles(unassigned_role)
-                        
-                        # 管理用チャンネルを取得
-                        admin_channel = next((channel for channel in guild.text_channels if "管理bot" in channel.name), None)
-                        if admin_channel:
-                            await admin_channel.send(f"`{member.name}` に `{role.name}` ロールを付与しました。")
+        # 索引から付与先のロールを取得
+        guild = self.get_guild_for_event(payload.guild_id)
+        if not guild:
+            return
+        target = self.index.resolve(payload.message_id, str(payload.emoji))
+        if not target:
+            return
+        self.reconciler.note_event(payload.message_id, payload.user_id)
+        role = guild.get_role(target.role_id)
+        if not role:
+            return
+        
+        # クラスロールと期生・期職員のロールを付与し、ロール未付与ロールを削除する
+        # （まとめて1回のロール更新で反映される。イベントの順序を保つため、ここでは await せずに予約だけ行う）
+        guild_targets = self.index.guild_targets(guild.id)
+        # リアクションの追加イベントにはメンバー情報が含まれる（メンバーをキャッシュしない設定でも取得できる）
+        member = payload.member or guild.get_member(payload.user_id)
+        if member:
+            self.role_buffer.add(member, target.role_id, target.parent_role_id)
+            self.role_buffer.remove(member, guild_targets.unassigned_role_id)
+        else:
+            self.role_buffer.add_by_id(guild, payload.user_id, target.role_id, target.parent_role_id)
+            self.role_buffer.remove_by_id(guild, payload.user_id, guild_targets.unassigned_role_id)
+        
+        # 管理用チャンネルへの記録（まとめて送信される）
+        self.audit_feed.log(guild_targets.log_channel_id, f"`{member_label(member, payload.user_id)}` に `{role.name}` ロールを付与しました。")
 
     @commands.Cog.listener()
+    @instrument_event
     async def on_raw_reaction_remove(self, payload: discord.RawReactionActionEvent):
         if payload.user_id == self.bot.user.id:
             return
         
-        # メッセージIDがリアクションロールの設定に含まれているか確認
-        if payload.message_id in self.reaction_roles:
-            guild = self.bot.get_guild(payload.guild_id)
-            member = guild.get_member(payload.user_id)
-            emoji = str(payload.emoji)
-            
-            # 絵文字に対応するロールを取得
-            role_type = None
-            for role_type_name, role_emoji in self.reaction_roles[payload.message_id]["emojis"].items():
-                if emoji == role_emoji:
-                    role_type = role_type_name
-                    break
-            
-            if role_type:
-                # 対応するロールを探して削除
-                for role in self.reaction_roles[payload.message_id]["roles"]:
-                    if role.name == role_type:
-                        await member.remove_roles(role)
-                        # クラスロールの場合、期生のロールも削除
-                        if role.name.endswith("生徒"):
-                            semester = role.name.split("-")[0]  # 期数を取得
-                            semester_role = discord.utils.get(guild.roles, name=f"{semester}期生")
-                            if semester_role:
-                                await member.remove_roles(semester_role)
-                        # 職員ロールの場合、期職員のロールも削除
-                        elif role.name.endswith("職員"):
-                            semester = role.name.split("-")[0]  # 期数を取得
-                            semester_role = discord.utils.get(guild.roles, name=f"{semester}期職員")
-                            if semester_role:
-                                await member.remove_roles(semester_role)
-                        
-                        # ロール未付与ロールを付与
-                        unassigned_role = discord.utils.get(guild.roles, name=UNASSIGNED_ROLE_NAME)
-                        if unassigned_role and unassigned_role not in member.roles:
-                            await member.add_roles(unassigned_role)
-                        
-                        # 管理用チャンネルを取得
-                        admin_channel = next((channel for channel in guild.text_channels if "管理bot" in channel.name), None)
-                        if admin_channel:
-                            await admin_channel.send(f"`{member.name}` から `{role.name}` ロールを削除しました。")
+        # 索引から削除対象のロールを取得
+        guild = self.get_guild_for_event(payload.guild_id)
+        if not guild:
+            return
+        target = self.index.resolve(payload.message_id, str(payload.emoji))
+        if not target:
+            return
+        self.reconciler.note_event(payload.message_id, payload.user_id)
+        role = guild.get_role(target.role_id)
+        if not role:
+            return
+        
+        # クラスロールと期生・期職員のロールを削除し、ロール未付与ロールを付与する
+        # （削除イベントにはメンバー情報が含まれないため、キャッシュになければロール更新の反映時に取得する）
+        guild_targets = self.index.guild_targets(guild.id)
+        self.role_buffer.remove_by_id(guild, payload.user_id, target.role_id, target.parent_role_id)
+        self.role_buffer.add_by_id(guild, payload.user_id, guild_targets.unassigned_role_id)
+        
+        # 管理用チャンネルへの記録（まとめて送信される）
+        member = guild.get_member(payload.user_id)
+        self.audit_feed.log(guild_targets.log_channel_id, f"`{member_label(member, payload.user_id)}` から `{role.name}` ロールを削除しました。")
+
+    # リアクションロールメッセージが削除されたら設定を消す
+    @commands.Cog.listener()
+    async def on_raw_message_delete(self, payload: discord.RawMessageDeleteEvent):
+        if payload.message_id in self.index:
+            await self.forget_reaction_role_messages([payload.message_id])
+
+    @commands.Cog.listener()
+    async def on_raw_bulk_message_delete(self, payload: discord.RawBulkMessageDeleteEvent):
+        await self.forget_reaction_role_messages([message_id for message_id in payload.message_ids if message_id in self.index])
+
+    @commands.Cog.listener()
+    async def on_member_update(self, before: discord.Member, after: discord.Member):
+        # 反映したロールの変更がキャッシュに届いたら、以後はキャッシュのロールを使う
+        self.role_buffer.note_member_update(after)
+
+    # ロール・チャンネルの変更に合わせて索引を更新する
+    @commands.Cog.listener()
+    async def on_guild_role_create(self, role: discord.Role):
+        self.index.refresh_roles(role.guild)
+
+    @commands.Cog.listener()
+    async def on_guild_role_delete(self, role: discord.Role):
+        self.index.refresh_roles(role.guild)
+
+    @commands.Cog.listener()
+    async def on_guild_role_update(self, before: discord.Role, after: discord.Role):
+        if before.name != after.name:
+            self.index.refresh_roles(after.guild)
+
+    @commands.Cog.listener()
+    async def on_guild_channel_create(self, channel: discord.abc.GuildChannel):
+        self.index.refresh_channels(channel.guild)
+
+    @commands.Cog.listener()
+    async def on_guild_channel_delete(self, channel: discord.abc.GuildChannel):
+        self.index.refresh_channels(channel.guild)
+        # チャンネルごと削除されたメッセージの設定を消す
+        await self.forget_reaction_role_messages(self.index.channel_messages(channel.id))
+
+    @commands.Cog.listener()
+    async def on_guild_channel_update(self, before: discord.abc.GuildChannel, after: discord.abc.GuildChannel):
+        if before.name != after.name:
+            self.index.refresh_channels(after.guild)
 
 async def setup(bot: commands.Bot):
     await bot.add_cog(ReactionRoles(bot)) 
\ No newline at end of file
@@ -2,46 +2,40 @@ import discord
 from discord import app_commands
 from discord.ext import commands
 
-from utils.checks import is_admin_channel, has_staff_role, is_administrator
-from utils.helpers import format_error_message
+from utils.checks import is_season_admin
+from utils.helpers import format_error_message, get_role_by_name
+from utils.provisioning import ProvisioningScheduler, raise_for_failures
+from utils.season_layout import LayoutChange, build_season_layout, schedule_changes
 from config.settings import STAFF_ROLE_NAME
 
 class Roles(commands.Cog):
     def __init__(self, bot: commands.Bot):
         self.bot = bot
 
-    async def create_roles_internal(self, guild, semester, class_count):
-        semester_student_role = discord.utils.get(guild.roles, name=f"{semester}期生")
-        semester_teacher_role = discord.utils.get(guild.roles, name=f"{semester}期職員")
+    def plan_roles(self, scheduler: ProvisioningScheduler, guild, semester, class_count):
+        """指定した学期のロールの作成を予約する"""
+        semester_student_role = get_role_by_name(guild, f"{semester}期生")
+        semester_teacher_role = get_role_by_name(guild, f"{semester}期職員")
         if semester_student_role or semester_teacher_role:
             raise Exception(f"{semester}期のロールは既に存在します。")
-        semester_student_role = await guild.create_role(
-            name=f"{semester}期生",
-            color=discord.Color.blue(),
-        )
-        semester_teacher_role = await guild.create_role(
-            name=f"{semester}期職員",
-            color=discord.Color.green()
-        )
-        for i in range(1, class_count + 1):
-            await guild.create_role(
-                name=f"{semester}-{i}生徒",
-                color=discord.Color.blue(),
-                hoist=True
-            )
-            await guild.create_role(
-                name=f"{semester}-{i}職員",
-                color=discord.Color.green()
-            )
+        layout = build_season_layout(semester, class_count)
+        schedule_changes(scheduler, guild, [LayoutChange("create", "role", spec) for spec in layout.roles])
+
+    async def create_roles_internal(self, guild, semester, class_count):
+        scheduler = ProvisioningScheduler.from_settings()
+        self.plan_roles(scheduler, guild, semester, class_count)
+        results = await scheduler.run()
+        # 作成したもののIDを期の構成の記録に追加する
+        values = {key: result.value for key, result in results.items() if result.ok}
+        await self.bot.season_registry.record(guild, build_season_layout(semester, class_count), values, merge=True)
+        raise_for_failures(results)
 
     @app_commands.command(name="sakuraria_create_roles", description="指定した学期のロールを作成します")
     @app_commands.describe(
         semester="学期（数字）",
         class_count="クラス数"
     )
-    @is_admin_channel()
-    @has_staff_role()
-    @is_administrator()
+    @is_season_admin()
     async def create_roles(self, interaction: discord.Interaction, semester: int, class_count: int):
         try:
             await interaction.response.send_message('ロールを作成中です...')
@@ -57,9 +51,7 @@ class Roles(commands.Cog):
             await interaction.followup.send(format_error_message(e))
 
     @app_commands.command(name="sakuraria_create_first_roll", description="職員とOBのロールを作成します")
-    @is_admin_channel()
-    @has_staff_role()
-    @is_administrator()
+    @is_season_admin()
     async def create_first_roll(self, interaction: discord.Interaction):
         try:
             await interaction.response.send_message('ロールを作成中です...')
@@ -1,91 +1,242 @@
+import time
+
 import discord
 from discord import app_commands
 from discord.ext import commands
 
-from utils.checks import is_admin_channel, has_staff_role, is_administrator
-from utils.helpers import format_error_message, get_category_by_name
-from config.settings import REACTION_ROLE_CHANNELS
+from utils.checks import is_season_admin
+from utils.helpers import format_error_message, object_target, send_long_message
+from utils.jobs import JobContext
+from utils.provisioning import ProvisioningScheduler, raise_for_failures
+from utils.season_layout import build_season_layout, describe_changes, diff_season_layout, schedule_changes
+from utils.reaction_index import reaction_role_semester_kind
+from utils.season_registry import is_archived, season_channel_ids, season_role_ids
+from utils.teardown import describe_teardown_failures, run_teardown, target_key
+from config.settings import NEW_SEASON_SETTINGS, REACTION_ROLE_CHANNELS
 
 class Seasons(commands.Cog):
     def __init__(self, bot: commands.Bot):
         self.bot = bot
 
+    async def cog_load(self):
+        self.bot.job_manager.register("new_season", "期の作成", self.run_new_season_job)
+        self.bot.job_manager.register("delete_season", "期の削除", self.run_delete_season_job)
+
+    def diff_season(self, guild, semester, class_count):
+        """期の構成とサーバーを比べ、不足・相違している部分と不足しているリアクションロールメッセージを返す
+
+        差分の算出はキャッシュだけで行うため、APIは呼ばない。
+        """
+        layout = build_season_layout(semester, class_count)
+        season = self.bot.season_registry.get(guild.id, semester)
+        changes = diff_season_layout(guild, layout, archived=bool(season) and is_archived(season))
+        reaction_roles_cog = self.bot.get_cog("ReactionRoles")
+        missing_reaction_kinds = []
+        if reaction_roles_cog:
+            missing_reaction_kinds = [
+                kind for kind in ("staff", "student")
+                if reaction_roles_cog.find_reaction_role_message(guild.id, semester, kind) is None
+            ]
+        return changes, missing_reaction_kinds
+
+    async def report_season_diff(self, interaction: discord.Interaction, semester: int, class_count: int):
+        """差分を一覧表示する"""
+        changes, missing_reaction_kinds = self.diff_season(interaction.guild, semester, class_count)
+        if not changes and not missing_reaction_kinds:
+            await interaction.followup.send(f'✅ {semester}期の構成に不足・相違はありません。')
+            return
+        reaction_labels = {"staff": "職員用", "student": "クラス選択用"}
+        lines = [describe_changes(changes)] if changes else []
+        lines += [f"＋ 🎯 リアクションロール {reaction_labels[kind]}" for kind in missing_reaction_kinds]
+        count = len(changes) + len(missing_reaction_kinds)
+        header = f'📋 {semester}期の不足・相違（{count}件、＋は作成・～は修正）：'
+        await send_long_message(interaction, header, "\n".join(lines), f"season_{semester}_diff.txt")
+
+    async def run_new_season_job(self, ctx: JobContext):
+        """期の作成ジョブ（不足・相違している部分だけを作成・修正するため、中断しても続きから再開できる）"""
+        guild = ctx.guild
+        semester = ctx.params["semester"]
+        class_count = ctx.params["class_count"]
+        ctx.set_total(2)
+        # この実行で作成したものの記録（失敗したときに取り消すため、再開しても引き継げるよう保存する）
+        undo = ctx.state.setdefault("undo", [])
+
+        # 1〜3. ロール・カテゴリ・チャンネルを、依存関係を守りながら並行に作成する
+        async def provision():
+            changes, _ = self.diff_season(guild, semester, class_count)
+            ctx.state["changes"] = ctx.state.get("changes", 0) + len(changes)
+            created_keys = {change.key for change in changes if change.action == "create"}
+            results = {}
+            if changes:
+                finished = 0
+                def on_result(result):
+                    nonlocal finished
+                    finished += 1
+                    if result.ok and result.key in created_keys:
+                        undo.append({**object_target(result.value), "key": result.key})
+                    ctx.progress(f"ロール・カテゴリ・チャンネル: {finished}/{len(changes)}")
+                scheduler = ProvisioningScheduler.from_settings()
+                schedule_changes(scheduler, guild, changes)
+                results = await scheduler.run(on_result)
+            # 作成したもののIDを期の構成として記録する（失敗があっても作成できた分は記録する）
+            values = {key: result.value for key, result in results.items() if result.ok}
+            await self.bot.season_registry.record(guild, build_season_layout(semester, class_count), values)
+            await ctx.manager.save(ctx.job)
+            raise_for_failures(results)
+
+        # 4. リアクションロールの作成
+        async def reaction_roles():
+            reaction_roles_cog = self.bot.get_cog("ReactionRoles")
+            if not reaction_roles_cog:
+                raise Exception('リアクションロールの作成に失敗しました。')
+            _, missing_reaction_kinds = self.diff_season(guild, semester, class_count)
+            if not missing_reaction_kinds:
+                return
+            try:
+                await reaction_roles_cog.create_reaction_roles_internal(guild, semester, class_count, kinds=missing_reaction_kinds)
+            finally:
+                # 片方だけ作成できた場合も、作成できたメッセージを記録する
+                for kind in missing_reaction_kinds:
+                    message_id = reaction_roles_cog.find_reaction_role_message(guild.id, semester, kind)
+                    channel = guild.get_channel(reaction_roles_cog.reaction_roles[message_id].get("channel_id") or 0) if message_id else None
+                    if channel:
+                        undo.append(object_target(channel.get_partial_message(message_id)))
+                await ctx.manager.save(ctx.job)
+
+        try:
+            await ctx.step("provision", provision)
+            await ctx.step("reaction_roles", reaction_roles)
+        except Exception as e:
+            if not undo or not ctx.params.get("rollback", NEW_SEASON_SETTINGS["rollback_on_failure"]):
+                raise
+            raise Exception(await self.rollback_new_season(ctx, e))
+
+        elapsed = time.time() - ctx.job["created_at"]
+        return (
+            f'✅ {semester}期の設定が完了しました（{ctx.state.get("changes", 0)}件の作成・修正、{elapsed:.1f}秒）：\n'
+            f'👥 ロール\n'
+            f'  └ {semester}期生\n'
+            f'  └ {semester}期職員\n'
+            f'  └ {class_count}クラス × 2ロール（生徒・職員）\n'
+            f'📁 カテゴリ\n'
+            f'  └ 👨‍🏫 {semester}期職員\n'
+            f'  └ 👨‍🎓 {semester}期生徒\n'
+            f'💬 チャンネル\n'
+            f'  └ 期全体連絡チャンネル\n'
+            f'  └ {class_count}クラス × 3チャンネル（雑談・写真・連絡）\n'
+            f'  └ {class_count}個の教員用チャンネル\n'
+            f'🎯 リアクションロール\n'
+            f'  └ 職員用のリアクションロール\n'
+            f'  └ クラス選択用のリアクションロール'
+        )
+
+    async def rollback_new_season(self, ctx: JobContext, error: Exception) -> str:
+        """期の作成で作成したものを、作成と逆の順（中身から親の順）に並行に削除し、結果の説明を返す"""
+        guild = ctx.guild
+        semester = ctx.params["semester"]
+        targets = list(reversed(ctx.state["undo"]))
+        ctx.progress(f"⏪ 失敗したため、作成した{len(targets)}件を削除して元に戻しています...")
+        started = time.perf_counter()
+        results = await run_teardown(guild, targets)
+        deleted = [target for target in targets if results[target_key(target)].ok]
+
+        # 削除できたものを索引・期の構成の記録から消す
+        reaction_roles_cog = self.bot.get_cog("ReactionRoles")
+        if reaction_roles_cog:
+            await reaction_roles_cog.forget_reaction_role_messages([target["id"] for target in deleted if target["type"] == "message"])
+        removed_keys = {target["key"]: None for target in deleted if target.get("key")}
+        if removed_keys:
+            season = await self.bot.season_registry.record(guild, build_season_layout(semester, ctx.params["class_count"]), removed_keys)
+            if not any([season["roles"], season["categories"], season["channels"], season["classes"], season["reaction_messages"]]):
+                await self.bot.season_registry.remove(guild.id, semester)
+        ctx.state["undo"] = [target for target in ctx.state["undo"] if target not in deleted]
+        await ctx.manager.save(ctx.job)
+
+        elapsed = time.perf_counter() - started
+        message = f"{error}\n⏪ 作成した{len(deleted)}/{len(targets)}件を削除して元に戻しました（{elapsed:.1f}秒）。"
+        failures = describe_teardown_failures(targets, results)
+        if failures:
+            message += "\n⚠️ 元に戻せなかったものがあります。`/sakuraria_delete_season` で削除してください：\n" + "\n".join(failures)
+        return message
+
+    async def run_delete_season_job(self, ctx: JobContext):
+        """期の削除ジョブ（子から親の順に並行に削除し、削除済みの対象は再開時に飛ばす）"""
+        targets = ctx.params["targets"]
+        ctx.set_total(len(targets))
+        results = await run_teardown(ctx.guild, targets, step=ctx.step)
+
+        reaction_roles_cog = self.bot.get_cog("ReactionRoles")
+        if reaction_roles_cog:
+            # 既に削除されていて削除イベントが届かない場合も設定を消す
+            await reaction_roles_cog.forget_reaction_role_messages([
+                target["id"] for target in targets
+                if target["type"] == "message" and results[target_key(target)].ok
+            ])
+
+        failures = describe_teardown_failures(targets, results)
+        if failures:
+            return f"⚠️ 削除が完了しました（{len(failures)}件失敗）：\n" + "\n".join(failures)
+        for semester in range(ctx.params["start_semester"], ctx.params["end_semester"] + 1):
+            await self.bot.season_registry.remove(ctx.guild.id, semester)
+        return "✅ 削除が完了しました。"
+
     @app_commands.command(name="sakuraria_new_season", description="新しい期のカテゴリとチャンネルを作成します")
     @app_commands.describe(
         semester="学期（数字）",
-        class_count="クラス数"
+        class_count="クラス数",
+        mode="実行モード（省略時は新規作成）",
+        on_failure="途中で失敗したときの扱い（省略時は設定の既定値）"
     )
-    @is_admin_channel()
-    @has_staff_role()
-    @is_administrator()
-    async def new_season(self, interaction: discord.Interaction, semester: int, class_count: int):
+    @app_commands.choices(mode=[
+        app_commands.Choice(name="新規作成", value="create"),
+        app_commands.Choice(name="差分の確認のみ", value="plan"),
+        app_commands.Choice(name="不足・相違している部分だけ作成・修正", value="reconcile")
+    ])
+    @app_commands.choices(on_failure=[
+        app_commands.Choice(name="作成したものを削除して元に戻す", value="rollback"),
+        app_commands.Choice(name="作成したものを残す", value="keep")
+    ])
+    @is_season_admin()
+    async def new_season(self, interaction: discord.Interaction, semester: int, class_count: int, mode: str = "create", on_failure: str = None):
         try:
-            await interaction.response.send_message('新しい期の設定を開始します...')
-            
-            # 1. ロールの作成
-            try:
-                roles_cog = self.bot.get_cog("Roles")
-                if roles_cog:
-                    await roles_cog.create_roles_internal(interaction.guild, semester, class_count)
-                else:
-                    await interaction.followup.send('❌ ロールの作成に失敗しました。')
-                    return
-            except Exception as e:
-                await interaction.followup.send(f'❌ ロールの作成に失敗しました: {e}')
+            if mode == "plan":
+                await interaction.response.send_message(f'{semester}期の構成を確認しています...')
+                await self.report_season_diff(interaction, semester, class_count)
                 return
 
-            # 2. カテゴリの作成
-            try:
-                categories_cog = self.bot.get_cog("Categories")
-                if categories_cog:
-                    await categories_cog.create_categories_internal(interaction.guild, semester)
-                else:
-                    await interaction.followup.send('❌ カテゴリの作成に失敗しました。')
-                    return
-            except Exception as e:
-                await interaction.followup.send(f'❌ カテゴリの作成に失敗しました: {e}')
-                return
-
-            # 3. チャンネルの作成
-            try:
-                channels_cog = self.bot.get_cog("Channels")
-                if channels_cog:
-                    await channels_cog.create_channels_internal(interaction.guild, semester, class_count)
-                else:
-                    await interaction.followup.send('❌ チャンネルの作成に失敗しました。')
-                    return
-            except Exception as e:
-                await interaction.followup.send(f'❌ チャンネルの作成に失敗しました: {e}')
-                return
+            await interaction.response.send_message('新しい期の設定を開始します...')
 
-            # 4. リアクションロールの作成
-            try:
-                reaction_roles_cog = self.bot.get_cog("ReactionRoles")
-                if reaction_roles_cog:
-                    await reaction_roles_cog.create_reaction_roles_internal(interaction.guild, semester, class_count)
-                else:
-                    await interaction.followup.send('❌ リアクションロールの作成に失敗しました。')
-                    return
-            except Exception as e:
-                await interaction.followup.send(f'❌ リアクションロールの作成に失敗しました: {e}')
-                return
+            if mode == "create":
+                # 同じ期のロールやカテゴリが既に存在しないか確認する
+                scheduler = ProvisioningScheduler.from_settings()
+                steps = [
+                    ("Roles", "ロール", lambda cog: cog.plan_roles(scheduler, interaction.guild, semester, class_count)),
+                    ("Categories", "カテゴリ", lambda cog: cog.plan_categories(scheduler, interaction.guild, semester)),
+                    ("Channels", "チャンネル", lambda cog: cog.plan_channels(scheduler, interaction.guild, semester, class_count))
+                ]
+                for cog_name, label, plan in steps:
+                    try:
+                        cog = self.bot.get_cog(cog_name)
+                        if cog:
+                            plan(cog)
+                        else:
+                            await interaction.followup.send(f'❌ {label}の作成に失敗しました。')
+                            return
+                    except Exception as e:
+                        await interaction.followup.send(f'❌ {label}の作成に失敗しました: {e}')
+                        return
 
+            # 作成はバックグラウンドジョブで行う（インタラクションの有効期限や再起動に左右されない）
+            job = await self.bot.job_manager.start(
+                "new_season", interaction.guild, interaction.channel,
+                {
+                    "semester": semester,
+                    "class_count": class_count,
+                    "rollback": NEW_SEASON_SETTINGS["rollback_on_failure"] if on_failure is None else on_failure == "rollback"
+                }
+            )
             await interaction.followup.send(
-                f'✅ {semester}期の設定が完了しました：\n'
-                f'👥 ロール\n'
-                f'  └ {semester}期生\n'
-                f'  └ {semester}期職員\n'
-                f'  └ {class_count}クラス × 2ロール（生徒・職員）\n'
-                f'📁 カテゴリ\n'
-                f'  └ 👨‍🏫 {semester}期職員\n'
-                f'  └ 👨‍🎓 {semester}期生徒\n'
-                f'💬 チャンネル\n'
-                f'  └ 期全体連絡チャンネル\n'
-                f'  └ {class_count}クラス × 3チャンネル（雑談・写真・連絡）\n'
-                f'  └ {class_count}個の教員用チャンネル\n'
-                f'🎯 リアクションロール\n'
-                f'  └ 職員用のリアクションロール\n'
-                f'  └ クラス選択用のリアクションロール'
+                f'⏳ ジョブ `{job["job_id"]}` として実行しています。進捗はジョブのメッセージまたは `/job_status` で確認できます。'
             )
 
         except Exception as e:
@@ -96,9 +247,7 @@ class Seasons(commands.Cog):
         start_semester="開始学期（数字）",
         end_semester="終了学期（数字、省略可）"
     )
-    @is_admin_channel()
-    @has_staff_role()
-    @is_administrator()
+    @is_season_admin()
     async def delete_season(self, interaction: discord.Interaction, start_semester: int, end_semester: int = None):
         try:
             await interaction.response.send_message('削除対象の確認中...')
@@ -112,54 +261,56 @@ class Seasons(commands.Cog):
             # end_semesterが指定されていない場合は、start_semesterのみを処理
             end_semester = end_semester if end_semester is not None else start_semester
             
-            # リアクションロールメッセージの検索
-            for channel_type, channel_name in REACTION_ROLE_CHANNELS.items():
-                channel = next((ch for ch in interaction.guild.text_channels if channel_name in ch.name), None)
-                if channel:
-                    try:
-                        # チャンネルのメッセージを取得（最大100件）
-                        async for message in channel.history(limit=100):
-                            # メッセージの内容に学期番号が含まれているか確認
-                            for semester in range(start_semester, end_semester + 1):
-                                if f"{semester}期" in message.content:
-                                    reaction_messages_to_delete.append(message)
-                                    break
-                    except Exception as e:
-                        await interaction.followup.send(f"❌ チャンネル {channel.name} のメッセージ取得に失敗しました: {e}")
-            
+            registry = self.bot.season_registry
+            reaction_roles_cog = self.bot.get_cog("ReactionRoles")
             for semester in range(start_semester, end_semester + 1):
+                # 記録されている期の構成から削除対象を集める（記録がない期は名前から探して記録する）
+                season = await registry.topology(interaction.guild, semester)
+
+                # リアクションロールメッセージの確認（履歴は読まず、記録されているIDのメッセージだけを対象にする）
+                message_channels = {}
+                if season:
+                    for recorded in season["reaction_messages"].values():
+                        message_channels[recorded["message_id"]] = recorded["channel_id"]
+                if reaction_roles_cog:
+                    for message_id, data in reaction_roles_cog.reaction_role_messages(interaction.guild, semester):
+                        channel_id = data.get("channel_id")
+                        if not channel_id:
+                            # チャンネルIDが記録されていない旧形式の設定は、種類ごとのチャンネルにあるものとする
+                            _, kind = reaction_role_semester_kind(data)
+                            channel = next((ch for ch in interaction.guild.text_channels if REACTION_ROLE_CHANNELS[kind] in ch.name), None) if kind in REACTION_ROLE_CHANNELS else None
+                            channel_id = channel.id if channel else None
+                        message_channels.setdefault(message_id, channel_id)
+                for message_id, channel_id in message_channels.items():
+                    channel = interaction.guild.get_channel(channel_id) if channel_id else None
+                    if channel:
+                        reaction_messages_to_delete.append(channel.get_partial_message(message_id))
+
+                if not season:
+                    continue
+
                 # カテゴリの確認
-                teacher_category = get_category_by_name(interaction.guild, f"👨‍🏫 {semester}期職員")
-                student_category = get_category_by_name(interaction.guild, f"👨‍🎓 {semester}期生徒")
-                if teacher_category:
-                    categories_to_delete.append(teacher_category)
-                if student_category:
-                    categories_to_delete.append(student_category)
+                for category_id in season["categories"].values():
+                    category = interaction.guild.get_channel(category_id)
+                    if category:
+                        categories_to_delete.append(category)
                 
-                # チャンネルの確認
-                for channel in interaction.guild.text_channels:
-                    if str(semester) in channel.name:
+                # チャンネルの確認（期のチャンネルと、期のカテゴリに後から追加されたチャンネル）
+                for channel_id in season_channel_ids(season):
+                    channel = interaction.guild.get_channel(channel_id)
+                    if channel:
                         channels_to_delete.append(channel)
+                for category in categories_to_delete:
+                    channels_to_delete.extend(channel for channel in category.channels if channel not in channels_to_delete)
                 
                 # ロールの確認
-                semester_student_role = discord.utils.get(interaction.guild.roles, name=f"{semester}期生")
-                semester_teacher_role = discord.utils.get(interaction.guild.roles, name=f"{semester}期職員")
-                if semester_student_role:
-                    roles_to_delete.append(semester_student_role)
-                if semester_teacher_role:
-                    roles_to_delete.append(semester_teacher_role)
-                
-                # クラスごとのロールの確認
-                for i in range(1, 10):  # 最大9クラスまで確認
-                    student_role = discord.utils.get(interaction.guild.roles, name=f"{semester}-{i}生徒")
-                    teacher_role = discord.utils.get(interaction.guild.roles, name=f"{semester}-{i}職員")
-                    if student_role:
-                        roles_to_delete.append(student_role)
-                    if teacher_role:
-                        roles_to_delete.append(teacher_role)
+                for role_id in season_role_ids(season):
+                    role = interaction.guild.get_role(role_id)
+                    if role:
+                        roles_to_delete.append(role)
             
             # 削除対象の表示
-            if not categories_to_delete and not channels_to_delete and not roles_to_delete:
+            if not categories_to_delete and not channels_to_delete and not roles_to_delete and not reaction_messages_to_delete:
                 await interaction.followup.send(f'❌ {start_semester}期から{end_semester}期の削除対象が見つかりませんでした。')
                 return
             
@@ -189,6 +340,7 @@ class Seasons(commands.Cog):
             confirm_message += "\n⚠️ この操作は取り消せません。実行してよろしいですか？"
             
             # 確認ボタンの作成
+            job_manager = self.bot.job_manager
             class ConfirmView(discord.ui.View):
                 def __init__(self):
                     super().__init__(timeout=60)
@@ -201,35 +353,18 @@ class Seasons(commands.Cog):
                     
                     await button_interaction.response.send_message("削除を開始します...")
                     
-                    # カテゴリの削除
-                    for category in categories_to_delete:
-                        try:
-                            await category.delete()
-                        except Exception as e:
-                            await button_interaction.followup.send(f"❌ カテゴリ {category.name} の削除に失敗しました: {e}")
-                    
-                    # チャンネルの削除
-                    for channel in channels_to_delete:
-                        try:
-                            await channel.delete()
-                        except Exception as e:
-                            await button_interaction.followup.send(f"❌ チャンネル {channel.name} の削除に失敗しました: {e}")
-                    
-                    # ロールの削除
-                    for role in roles_to_delete:
-                        try:
-                            await role.delete()
-                        except Exception as e:
-                            await button_interaction.followup.send(f"❌ ロール {role.name} の削除に失敗しました: {e}")
-                    
-                    # リアクションロールメッセージの削除
-                    for message in reaction_messages_to_delete:
-                        try:
-                            await message.delete()
-                        except Exception as e:
-                            await button_interaction.followup.send(f"❌ リアクションロールメッセージの削除に失敗しました: {e}")
-                    
-                    await button_interaction.followup.send("✅ 削除が完了しました。")
+                    # 削除はバックグラウンドジョブで行う（中断しても続きから再開できる）
+                    targets = [
+                        object_target(obj)
+                        for obj in categories_to_delete + channels_to_delete + roles_to_delete + reaction_messages_to_delete
+                    ]
+                    job = await job_manager.start(
+                        "delete_season", interaction.guild, button_interaction.channel,
+                        {"start_semester": start_semester, "end_semester": end_semester, "targets": targets}
+                    )
+                    await button_interaction.followup.send(
+                        f'⏳ ジョブ `{job["job_id"]}` として実行しています。進捗はジョブのメッセージまたは `/job_status` で確認できます。'
+                    )
                     self.stop()
                 
                 @discord.ui.button(label="キャンセル", style=discord.ButtonStyle.secondary)
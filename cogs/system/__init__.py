@@ -0,0 +1,12 @@
+from .jobs import setup as setup_jobs
+from .name_index import setup as setup_name_index
+from .authz import setup as setup_authz
+from .runtime import setup as setup_runtime
+from .metrics import setup as setup_metrics
+
+async def setup(bot):
+    await setup_jobs(bot)
+    await setup_name_index(bot)
+    await setup_authz(bot)
+    await setup_runtime(bot)
+    await setup_metrics(bot)
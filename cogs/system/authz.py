@@ -0,0 +1,59 @@
+import discord
+from discord import app_commands
+from discord.ext import commands
+
+from utils.authz import authorizer
+from utils.checks import is_administrator
+from utils.helpers import format_error_message
+
+class Authz(commands.Cog):
+    """ロール・チャンネルの変更に合わせてコマンドの実行条件のキャッシュを捨てる"""
+
+    def __init__(self, bot: commands.Bot):
+        self.bot = bot
+
+    @commands.Cog.listener()
+    async def on_guild_role_create(self, role: discord.Role):
+        authorizer.invalidate(role.guild.id)
+
+    @commands.Cog.listener()
+    async def on_guild_role_delete(self, role: discord.Role):
+        authorizer.invalidate(role.guild.id)
+
+    @commands.Cog.listener()
+    async def on_guild_role_update(self, before: discord.Role, after: discord.Role):
+        if before.name != after.name:
+            authorizer.invalidate(after.guild.id)
+
+    @commands.Cog.listener()
+    async def on_guild_channel_create(self, channel: discord.abc.GuildChannel):
+        authorizer.invalidate(channel.guild.id)
+
+    @commands.Cog.listener()
+    async def on_guild_channel_delete(self, channel: discord.abc.GuildChannel):
+        authorizer.invalidate(channel.guild.id)
+
+    @commands.Cog.listener()
+    async def on_guild_channel_update(self, before: discord.abc.GuildChannel, after: discord.abc.GuildChannel):
+        if before.name != after.name:
+            authorizer.invalidate(after.guild.id)
+
+    @commands.Cog.listener()
+    async def on_guild_available(self, guild: discord.Guild):
+        authorizer.invalidate(guild.id)
+
+    @app_commands.command(name="auth_stats", description="コマンドの実行条件ごとの通過・拒否の回数を表示します")
+    @is_administrator()
+    async def auth_stats(self, interaction: discord.Interaction):
+        try:
+            stats = authorizer.stats()
+            if not stats:
+                await interaction.response.send_message('ℹ️ まだ判定は行われていません。', ephemeral=True)
+                return
+            lines = [f"- `{name}`: 通過 {counter['passed']}回 / 拒否 {counter['denied']}回" for name, counter in sorted(stats.items())]
+            await interaction.response.send_message("📊 実行条件の判定回数\n" + "\n".join(lines), ephemeral=True)
+        except Exception as e:
+            await interaction.response.send_message(format_error_message(e), ephemeral=True)
+
+async def setup(bot: commands.Bot):
+    await bot.add_cog(Authz(bot))
@@ -0,0 +1,56 @@
+import datetime
+
+import discord
+from discord import app_commands
+from discord.ext import commands
+
+from utils.checks import is_administrator
+from utils.helpers import format_error_message
+
+class Jobs(commands.Cog):
+    def __init__(self, bot: commands.Bot):
+        self.bot = bot
+
+    @commands.Cog.listener()
+    async def on_ready(self):
+        # 再起動などで中断されたジョブを続きから実行する（再接続時は何もしない）
+        await self.bot.job_manager.resume_all()
+        # 反映されていないチャンネル名の変更の予約を続きから反映する
+        await self.bot.rename_queue.start()
+
+    @app_commands.command(name="job_status", description="バックグラウンドジョブの進捗を表示します")
+    @app_commands.describe(
+        job_id="ジョブID（省略時は最近のジョブを一覧表示）"
+    )
+    @is_administrator()
+    async def job_status(self, interaction: discord.Interaction, job_id: str = None):
+        try:
+            manager = self.bot.job_manager
+            if job_id is not None:
+                job = await manager.get_job(interaction.guild.id, job_id)
+                if not job:
+                    await interaction.response.send_message(f'❌ ジョブ `{job_id}` が見つかりません。', ephemeral=True)
+                    return
+                detail = f"エラー: {job['error']}" if job["error"] else None
+                updated_at = datetime.datetime.fromtimestamp(job["updated_at"])
+                await interaction.response.send_message(
+                    f"{manager.format_status(job, detail)}\n"
+                    f"最終更新: {discord.utils.format_dt(updated_at, 'R')}（実行回数: {job['attempts']}）",
+                    ephemeral=True
+                )
+                return
+
+            jobs = await manager.list_jobs(interaction.guild.id)
+            if not jobs:
+                await interaction.response.send_message('ℹ️ ジョブはまだありません。', ephemeral=True)
+                return
+            lines = []
+            for job in jobs:
+                updated_at = datetime.datetime.fromtimestamp(job["updated_at"])
+                lines.append(f"{manager.format_status(job)}　{discord.utils.format_dt(updated_at, 'R')}")
+            await interaction.response.send_message("📋 最近のジョブ\n" + "\n".join(lines), ephemeral=True)
+        except Exception as e:
+            await interaction.response.send_message(format_error_message(e), ephemeral=True)
+
+async def setup(bot: commands.Bot):
+    await bot.add_cog(Jobs(bot))
@@ -0,0 +1,63 @@
+import logging
+import math
+
+import discord
+from aiohttp import web
+from discord import app_commands
+from discord.ext import commands
+
+from config.settings import METRICS_SETTINGS
+from utils.metrics import Gauge, RateLimitLogFilter, instrument_http, metrics_enabled, observe_command, registry
+
+class Metrics(commands.Cog):
+    """メトリクスを計測し、Prometheus のテキスト形式で HTTP から取得できるようにする"""
+
+    def __init__(self, bot: commands.Bot):
+        self.bot = bot
+        self.runner = None
+        self.restore_http = None
+        self.log_filter = RateLimitLogFilter()
+        registry.register(Gauge(
+            "discord_gateway_latency_seconds", "ゲートウェイのハートビートの遅延",
+            function=lambda: self.bot.latency if math.isfinite(self.bot.latency) else None
+        ))
+        registry.register(Gauge(
+            "sakuraria_role_buffer_pending", "リアクションロールでロールの反映を待っているメンバーの数",
+            function=self.role_buffer_pending
+        ))
+
+    async def cog_load(self):
+        self.restore_http = instrument_http(self.bot.http)
+        logging.getLogger("discord.http").addFilter(self.log_filter)
+        app = web.Application()
+        app.router.add_get("/metrics", self.handle_metrics)
+        self.runner = web.AppRunner(app, access_log=None)
+        await self.runner.setup()
+        await web.TCPSite(self.runner, METRICS_SETTINGS["host"], METRICS_SETTINGS["port"]).start()
+        print(f"メトリクスを公開しました: http://{METRICS_SETTINGS['host']}:{METRICS_SETTINGS['port']}/metrics")
+
+    async def cog_unload(self):
+        if self.restore_http:
+            self.restore_http()
+        logging.getLogger("discord.http").removeFilter(self.log_filter)
+        if self.runner:
+            await self.runner.cleanup()
+
+    async def handle_metrics(self, request: web.Request) -> web.Response:
+        return web.Response(
+            body=registry.render().encode("utf-8"),
+            headers={"Content-Type": "text/plain; version=0.0.4; charset=utf-8"}
+        )
+
+    def role_buffer_pending(self):
+        cog = self.bot.get_cog("ReactionRoles")
+        return cog.role_buffer.pending_count if cog else None
+
+    @commands.Cog.listener()
+    async def on_app_command_completion(self, interaction: discord.Interaction, command: app_commands.Command):
+        observe_command(interaction, command, "ok")
+
+async def setup(bot: commands.Bot):
+    # 無効な場合はCogを読み込まず、計測のための処理を組み込まない
+    if metrics_enabled():
+        await bot.add_cog(Metrics(bot))
@@ -0,0 +1,48 @@
+import discord
+from discord.ext import commands
+
+from utils.name_index import name_index
+
+class NameIndexSync(commands.Cog):
+    """ロール・チャンネルのイベントに合わせて名前の索引を更新する"""
+
+    def __init__(self, bot: commands.Bot):
+        self.bot = bot
+
+    @commands.Cog.listener()
+    async def on_guild_role_create(self, role: discord.Role):
+        name_index.role_saved(role)
+
+    @commands.Cog.listener()
+    async def on_guild_role_delete(self, role: discord.Role):
+        name_index.removed(role)
+
+    @commands.Cog.listener()
+    async def on_guild_role_update(self, before: discord.Role, after: discord.Role):
+        if before.name != after.name:
+            name_index.role_saved(after)
+
+    @commands.Cog.listener()
+    async def on_guild_channel_create(self, channel: discord.abc.GuildChannel):
+        name_index.channel_saved(channel)
+
+    @commands.Cog.listener()
+    async def on_guild_channel_delete(self, channel: discord.abc.GuildChannel):
+        name_index.removed(channel)
+
+    @commands.Cog.listener()
+    async def on_guild_channel_update(self, before: discord.abc.GuildChannel, after: discord.abc.GuildChannel):
+        if before.name != after.name:
+            name_index.channel_saved(after)
+
+    @commands.Cog.listener()
+    async def on_guild_available(self, guild: discord.Guild):
+        # 再接続でキャッシュが作り直された場合に備えて索引も作り直す
+        name_index.invalidate(guild.id)
+
+    @commands.Cog.listener()
+    async def on_guild_remove(self, guild: discord.Guild):
+        name_index.invalidate(guild.id)
+
+async def setup(bot: commands.Bot):
+    await bot.add_cog(NameIndexSync(bot))
@@ -0,0 +1,82 @@
+import asyncio
+
+import discord
+from discord.ext import commands
+
+from config.settings import RUNTIME_PROFILE, RUNTIME_PROFILES, RUNTIME_REPORT_SETTINGS
+from utils.runtime_profile import GatewayStats, format_bytes, memory_usage_mb
+
+class RuntimeReport(commands.Cog):
+    """起動時に実行プロファイルごとのメモリ使用量とゲートウェイの受信量を報告する"""
+
+    def __init__(self, bot: commands.Bot):
+        self.bot = bot
+        self.stats = GatewayStats() if RUNTIME_REPORT_SETTINGS["gateway_stats"] else None
+        self.reported = False
+        self.sample_task = None
+
+    def cog_unload(self):
+        if self.sample_task:
+            self.sample_task.cancel()
+
+    @commands.Cog.listener()
+    async def on_socket_raw_receive(self, message):
+        if self.stats:
+            self.stats.received(message)
+
+    @commands.Cog.listener()
+    async def on_socket_event_type(self, event_type: str):
+        if self.stats:
+            self.stats.event(event_type)
+
+    @commands.Cog.listener()
+    async def on_ready(self):
+        # 再接続のたびに on_ready が呼ばれるため、報告は最初の1回だけ
+        if self.reported:
+            return
+        self.reported = True
+        print(self.format_report("起動時"))
+        if self.stats and RUNTIME_REPORT_SETTINGS["sample_seconds"] > 0:
+            self.sample_task = asyncio.create_task(self.report_steady_state())
+
+    async def report_steady_state(self):
+        """起動後の一定時間の受信量（プレゼンスの更新などの定常的な受信）を報告する"""
+        before = self.stats.snapshot()
+        await asyncio.sleep(RUNTIME_REPORT_SETTINGS["sample_seconds"])
+        after = self.stats.snapshot()
+        seconds = after["time"] - before["time"]
+        events = after["events"] - before["events"]
+        lines = [
+            f"[{RUNTIME_PROFILE}] 定常時（{seconds:.0f}秒間）のゲートウェイ受信量: "
+            f"{format_bytes((after['bytes'] - before['bytes']) / seconds)}/秒, "
+            f"{(after['messages'] - before['messages']) / seconds:.1f}件/秒"
+        ]
+        lines += self.format_events(events)
+        lines.append(self.format_memory())
+        print("\n".join(lines))
+
+    def format_report(self, label: str) -> str:
+        intents = self.bot.intents
+        enabled = [name for name, value in intents if value]
+        members = sum(len(guild.members) for guild in self.bot.guilds)
+        lines = [
+            f"[{RUNTIME_PROFILE}] {label}の実行プロファイル",
+            f"- インテント: {', '.join(enabled)}",
+            f"- メッセージキャッシュ: {RUNTIME_PROFILES[RUNTIME_PROFILE]['max_messages'] or '無効'}",
+            f"- キャッシュ済みメンバー: {members}人（{len(self.bot.guilds)}サーバー）",
+            self.format_memory()
+        ]
+        if self.stats:
+            lines.append(f"- ゲートウェイ受信量: {format_bytes(self.stats.bytes)}（{self.stats.messages}件）")
+            lines += self.format_events(self.stats.events)
+        return "\n".join(lines)
+
+    def format_memory(self) -> str:
+        memory = memory_usage_mb()
+        return f"- メモリ使用量: {memory:.1f}MB" if memory is not None else "- メモリ使用量: 取得できません"
+
+    def format_events(self, events) -> list:
+        return [f"  - {event_type}: {count}件" for event_type, count in events.most_common(RUNTIME_REPORT_SETTINGS["top_events"])]
+
+async def setup(bot: commands.Bot):
+    await bot.add_cog(RuntimeReport(bot))
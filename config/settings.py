@@ -23,9 +23,166 @@ REACTION_ROLE_CHANNELS = {
     "student": "総合受付"      # 生徒用リアクションロールのチャンネル名
 }
 
+# 状態の保存先の設定
+STATE_STORE_SETTINGS = {
+    "backend": os.getenv('STATE_STORE_BACKEND', 'sqlite'),  # sqlite または json
+    "path": "sakuraria_state.db",                          # SQLiteのデータベースファイル
+    "legacy_json_path": "reaction_roles.json"              # 旧形式のJSONファイル（初回起動時に移行する）
+}
+
+# リアクションロールによるロール更新の設定
+ROLE_UPDATE_SETTINGS = {
+    "debounce_seconds": 0.5,  # この時間内の変更を1回のロール更新にまとめる
+    "confirm_ttl": 5.0,       # 反映した変更をキャッシュに重ねて使う最長の時間（秒、メンバーの更新イベントが届けばそこで終わる）
+    "shard_count": 4,         # ロール更新のキューの数（サーバーごとにどれか1つに割り当てる）
+    "workers_per_shard": 2    # キュー1つあたりのワーカー数（1サーバーあたりのロール更新の同時実行数）
+}
+
+# クラス・担当クラスの選び方の設定
+ROLE_PICKER_SETTINGS = {
+    # reaction: 数字の絵文字のリアクションで選ぶ（9クラスまで）
+    # select: 選択メニューで選ぶ（リアクションを付ける必要がなく、選択を1回のロール更新で反映する。125クラスまで）
+    "mode": os.getenv('ROLE_PICKER_MODE', 'reaction')
+}
+
+# 接続後に、停止・再接続中に付け外しされたリアクションをロールへ反映する設定
+REACTION_RECONCILE_SETTINGS = {
+    "enabled": os.getenv('REACTION_RECONCILE', '1') != '0',
+    "start_delay": 10.0,       # 接続してから反映を始めるまでの時間（秒）
+    "message_interval": 1.0,   # メッセージ1件を確認するごとの待機時間（秒）
+    # 前回の確認時にリアクションしていて、停止中に外したメンバーからロールを外す
+    # （リアクションしたことのないメンバーのロール（手動で付けたものなど）は外さない）
+    "remove_unreacted": os.getenv('REACTION_RECONCILE_REMOVE', '0') == '1'
+}
+
+# 管理用チャンネルへのロール変更記録の設定
+AUDIT_FEED_SETTINGS = {
+    "flush_interval": 10.0,   # 記録をまとめて送信する間隔（秒）
+    "max_entries": 50,        # この件数がたまったら間隔を待たずに送信する
+    "min_send_interval": 2.0  # 同じチャンネルへの送信の最小間隔（秒）
+}
+
+# ロール・カテゴリ・チャンネルをまとめて作成するときの設定
+PROVISIONING_SETTINGS = {
+    # APIの経路（レート制限の単位）ごとの同時実行数
+    # ロールは作成順に並び順が決まるため1件ずつ作成する
+    "route_concurrency": {
+        "roles": 1,
+        "channels": 3
+    },
+    "default_concurrency": 2
+}
+
+# 期・イベントの削除の設定
+TEARDOWN_SETTINGS = {
+    # APIの経路（レート制限の単位）ごとの同時実行数
+    "route_concurrency": {
+        "messages": 3,
+        "channels": 5,
+        "roles": 2
+    },
+    "default_concurrency": 2
+}
+
+# 期の作成の設定
+NEW_SEASON_SETTINGS = {
+    # 途中で失敗したときに、その実行で作成したロール・カテゴリ・チャンネル・メッセージを削除して元に戻す
+    # （コマンドの「失敗時」で実行ごとに変更できる）
+    "rollback_on_failure": os.getenv('NEW_SEASON_ROLLBACK', 'true').lower() != 'false'
+}
+
+# 多数のメンバーへのロール付与（OB移行など）の設定
+BULK_ROLE_SETTINGS = {
+    "concurrency": 5,      # 同時に実行するロール付与の数（429を受けると自動で減らす）
+    "max_retries": 3,      # 429・5xxで失敗したときの再試行回数
+    "base_delay": 1.0      # 再試行までの待機時間の基準（秒、回数ごとに倍になる）
+}
+
+# チャンネル名の変更の予約の設定（チャンネル名の変更はチャンネルごとに10分間に2回までに制限されている）
+RENAME_QUEUE_SETTINGS = {
+    "per_channel_limit": 2,    # チャンネルごとに、この時間内に変更できる回数
+    "window_seconds": 600.0,   # 上の回数を数える時間（秒）
+    "concurrency": 3,          # 同時に変更するチャンネルの数（チャンネルごとに枠が別のため並行に変更できる）
+    "max_attempts": 5          # 5xxで失敗したときに試す回数
+}
+
+# OB移行でチャンネルをアーカイブカテゴリへまとめて移す設定
+ARCHIVE_SETTINGS = {
+    "category_name": "📙 {semester}期アーカイブ",          # 生徒用のチャンネルの移動先。入りきらない場合は2つ目以降に番号を付ける
+    "staff_category_name": "📙 {semester}期職員アーカイブ",  # 教員用チャンネルの移動先（期職員だけが閲覧できる）
+    "max_channels_per_category": 50,                     # カテゴリに入れられるチャンネル数の上限（Discordの制限）
+    "rename": True                               # 移動したチャンネルの名前も📗から📙に変更する（予約して順に反映）
+}
+
+# バックグラウンドジョブの設定
+JOB_SETTINGS = {
+    "progress_interval": 3.0  # 進捗メッセージを編集する最小間隔（秒）
+}
+
+# スラッシュコマンドの同期の設定
+COMMAND_SYNC_SETTINGS = {
+    # 開発用サーバーのID。設定するとそのサーバーにだけ同期する（すぐに反映される）
+    "dev_guild_id": int(os.getenv('DEV_GUILD_ID')) if os.getenv('DEV_GUILD_ID') else None,
+    # コマンドの定義が変わっていなくても同期する
+    "force": os.getenv('FORCE_COMMAND_SYNC', '0') == '1'
+}
+
+# メトリクス（Prometheus形式）の設定
+METRICS_SETTINGS = {
+    "enabled": os.getenv('METRICS_ENABLED', '0') == '1',  # 無効な場合は計測のための処理を一切組み込まない
+    "host": os.getenv('METRICS_HOST', '127.0.0.1'),
+    "port": int(os.getenv('METRICS_PORT', '9108'))
+}
+
+# 実行プロファイル（使うインテントとキャッシュの範囲）
+# full: 従来どおりすべてのメンバー・プレゼンス・メッセージ内容を受信してキャッシュする
+# lean: 使っていないインテントを無効にし、メンバーは参加時とコマンドで必要になったときだけキャッシュする
+#       （!hello などのプレフィックスコマンドはBotへのメンションでのみ動作する）
+RUNTIME_PROFILES = {
+    "full": {
+        "intents": {
+            "members": True,
+            "presences": True,
+            "message_content": True
+        },
+        "member_cache": "intents",        # インテントで可能な範囲すべてをキャッシュする
+        "max_messages": 1000,             # メッセージキャッシュの件数（None で無効）
+        "chunk_guilds_at_startup": True   # 起動時に全メンバーを読み込む
+    },
+    "lean": {
+        "intents": {
+            "members": True,               # メンバーの読み込み・ロール変更の反映に必要
+            "presences": False,
+            "message_content": False,
+            "typing": False,
+            "voice_states": False,
+            "invites": False,
+            "emojis_and_stickers": False,
+            "integrations": False,
+            "webhooks": False,
+            "guild_scheduled_events": False
+        },
+        "member_cache": ["joined"],        # 参加したメンバーと読み込んだメンバーだけをキャッシュする
+        "max_messages": None,              # リアクション・削除はrawイベントで処理するためメッセージキャッシュは不要
+        "chunk_guilds_at_startup": False   # OB移行などで必要になったときにサーバーごとに読み込む
+    }
+}
+RUNTIME_PROFILE = os.getenv('RUNTIME_PROFILE', 'full')
+if RUNTIME_PROFILE not in RUNTIME_PROFILES:
+    raise ValueError(f"RUNTIME_PROFILE must be one of: {', '.join(RUNTIME_PROFILES)}")
+
+# 起動時のメモリ・ゲートウェイ受信量の報告の設定
+RUNTIME_REPORT_SETTINGS = {
+    "gateway_stats": os.getenv('GATEWAY_STATS', '0') == '1',  # ゲートウェイの受信量を数える（受信ごとの処理が増えるため計測時だけ有効にする）
+    "sample_seconds": 60.0,                                    # 起動後、定常時の受信量を測る時間（秒）
+    "top_events": 5                                            # 報告するイベントの種類の数
+}
+
 # イベントコマンドの設定
 EVENT_SETTINGS = {
     "admin_channel": "デバッグルーム",  # イベントコマンドを実行できるチャンネル名
     "admin_role": "イベント管理者",    # イベントコマンドを実行できるロール名
-    "role_assignment_channel_prefix": "ロール付与-"  # ロール付与コマンドを実行できるチャンネルのプレフィックス
+    "role_assignment_channel_prefix": "ロール付与-",  # ロール付与コマンドを実行できるチャンネルのプレフィックス
+    "roster_max_bytes": 1024 * 1024,  # ロール付与コマンドに添付できるメンバー一覧のファイルの最大サイズ
+    "template_max_bytes": 256 * 1024  # イベントの一括作成に使うテンプレートの最大サイズ
 } 
\ No newline at end of file
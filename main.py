@@ -1,45 +1,77 @@
 import discord
+from discord import app_commands
 from discord.ext import commands
 import traceback
 import sys
 
-from config.settings import DISCORD_TOKEN, COMMAND_PREFIX
-from utils.helpers import load_reaction_roles
+from config.settings import (
+    DISCORD_TOKEN, COMMAND_PREFIX, COMMAND_SYNC_SETTINGS, RUNTIME_PROFILE, RUNTIME_PROFILES, RUNTIME_REPORT_SETTINGS
+)
+from utils.command_sync import sync_commands
+from utils.jobs import JobManager
+from utils.metrics import MetricsCommandTree, metrics_enabled
+from utils.rename_queue import RenameQueue
+from utils.runtime_profile import client_options
+from utils.season_registry import SeasonRegistry
+from utils.startup import StartupTimer
+from utils.state_store import create_state_store
 
-# Botの設定
-intents = discord.Intents.default()
-intents.message_content = True  # メッセージの内容を読み取るために必要
-intents.members = True         # メンバー情報を取得するために必要
-intents.presences = True       # プレゼンス情報を取得するために必要
+# Botの設定（使うインテントとキャッシュの範囲は実行プロファイルで切り替える）
+# メッセージ内容を受信しないプロファイルでもメンションではコマンドを使えるようにする
+# メトリクスが有効な場合はスラッシュコマンドの処理時間を計測するコマンドツリーを使う
+bot = commands.Bot(
+    command_prefix=commands.when_mentioned_or(COMMAND_PREFIX),
+    tree_cls=MetricsCommandTree if metrics_enabled() else app_commands.CommandTree,
+    **client_options(RUNTIME_PROFILES[RUNTIME_PROFILE], RUNTIME_REPORT_SETTINGS["gateway_stats"])
+)
+# 状態の保存先（リアクションロールの設定など）
+bot.state_store = create_state_store()
+# 再起動をまたいで続きから実行できるバックグラウンドジョブ
+bot.job_manager = JobManager(bot, bot.state_store)
+# 期ごとのロール・チャンネルなどのIDの記録
+bot.season_registry = SeasonRegistry(bot.state_store)
+# レート制限の範囲で順に反映するチャンネル名の変更の予約
+bot.rename_queue = RenameQueue(bot, bot.state_store)
 
-bot = commands.Bot(command_prefix=COMMAND_PREFIX, intents=intents)
+# 起動の各段階にかかった時間
+startup_timer = StartupTimer()
+commands_synced = False
 
 # Botが起動したときの処理
 @bot.event
 async def on_ready():
+    global commands_synced
     print(f'{bot.user} としてログインしました')
+    # 再接続のたびに on_ready が呼ばれるため、同期は最初の1回だけ行う
+    if commands_synced:
+        return
+    commands_synced = True
+    startup_timer.end()
     try:
-        # リアクションロールの設定を読み込む
-        reaction_roles = await load_reaction_roles(bot)
-        # リアクションロールの設定をCogに渡す
-        reaction_roles_cog = bot.get_cog("ReactionRoles")
-        if reaction_roles_cog:
-            reaction_roles_cog.reaction_roles = reaction_roles
-        
         # 読み込まれているCogを確認
         print("\n読み込まれているCog:")
         for cog_name in bot.cogs:
             print(f"- {cog_name}")
         
-        # スラッシュコマンドを同期
-        print("\nスラッシュコマンドを同期しています...")
-        synced = await bot.tree.sync()
-        print(f"スラッシュコマンドを同期しました: {len(synced)}個")
-        print("\n同期されたコマンド:")
-        for cmd in synced:
-            print(f"- /{cmd.name}")
+        # スラッシュコマンドを同期（前回の同期からコマンドの定義が変わっていなければ飛ばす）
+        print("\nスラッシュコマンドを確認しています...")
+        with startup_timer.phase("コマンドの同期"):
+            result = await sync_commands(
+                bot.tree, bot.state_store,
+                guild_id=COMMAND_SYNC_SETTINGS["dev_guild_id"],
+                force=COMMAND_SYNC_SETTINGS["force"]
+            )
+        target = f"サーバー {COMMAND_SYNC_SETTINGS['dev_guild_id']}" if COMMAND_SYNC_SETTINGS["dev_guild_id"] else "全体"
+        if result["skipped"]:
+            print(f"コマンドの定義が前回の同期から変わっていないため、同期を省略しました（{target}: {len(result['commands'])}個）")
+        else:
+            print(f"スラッシュコマンドを同期しました（{target}）: {len(result['commands'])}個")
+            print("\n同期されたコマンド:")
+            for name in result["commands"]:
+                print(f"- /{name}")
     except Exception as e:
         print(f"エラーが発生しました: {e}")
+    print(f"\n起動にかかった時間:\n{startup_timer.summary()}")
 
 # コマンドの例
 @bot.command()
@@ -48,31 +80,46 @@ async def hello(ctx):
 
 # Botの起動
 async def main():
-    async with bot:
-        try:
-            # 拡張機能を読み込む
-            print("拡張機能を読み込んでいます...")
-            # sakuraria系のコマンドを読み込む
-            await bot.load_extension('cogs.sakuraria.roles')
-            await bot.load_extension('cogs.sakuraria.categories')
-            await bot.load_extension('cogs.sakuraria.channels')
-            await bot.load_extension('cogs.sakuraria.reaction_roles')
-            await bot.load_extension('cogs.sakuraria.seasons')
-            # イベント系のコマンドを読み込む
-            await bot.load_extension('cogs.events')
-            print("拡張機能の読み込みが完了しました")
+    try:
+        async with bot:
+            try:
+                # 期の構成の記録を読み込む（Cogの読み込みより前に必要）
+                startup_timer.begin("拡張機能の読み込み")
+                await bot.season_registry.load()
+                # 拡張機能を読み込む
+                print("拡張機能を読み込んでいます...")
+                # システム系のコマンドを読み込む
+                # （名前の索引はロール・チャンネルのイベントで他のCogより先に更新する必要があるため最初に読み込む）
+                await bot.load_extension('cogs.system')
+                # sakuraria系のコマンドを読み込む
+                await bot.load_extension('cogs.sakuraria.roles')
+                await bot.load_extension('cogs.sakuraria.categories')
+                await bot.load_extension('cogs.sakuraria.channels')
+                await bot.load_extension('cogs.sakuraria.reaction_roles')
+                await bot.load_extension('cogs.sakuraria.seasons')
+                # イベント系のコマンドを読み込む
+                await bot.load_extension('cogs.events')
+                print("拡張機能の読み込みが完了しました")
             
-            # Botを起動
-            await bot.start(DISCORD_TOKEN)
-        except Exception as e:
-            error_type = type(e).__name__
-            error_msg = str(e)
-            tb = traceback.format_exc()
-            print(f"エラーが発生しました:")
-            print(f"エラーの種類: {error_type}")
-            print(f"エラーメッセージ: {error_msg}")
-            print(f"トレースバック:\n{tb}")
-            sys.exit(1)
+                # Botを起動（ログインとゲートウェイへの接続を分けて時間を計る）
+                with startup_timer.phase("ログイン"):
+                    await bot.login(DISCORD_TOKEN)
+                # on_ready が呼ばれるまで（サーバー情報のキャッシュの準備）
+                startup_timer.begin("キャッシュの準備")
+                await bot.connect()
+            except Exception as e:
+                error_type = type(e).__name__
+                error_msg = str(e)
+                tb = traceback.format_exc()
+                print(f"エラーが発生しました:")
+                print(f"エラーの種類: {error_type}")
+                print(f"エラーメッセージ: {error_msg}")
+                print(f"トレースバック:\n{tb}")
+                sys.exit(1)
+    finally:
+        # Botの終了後に状態の保存先を閉じる（チャンネル名の変更の予約は保存済みのため止めるだけ）
+        await bot.rename_queue.close()
+        await bot.state_store.close()
 
 if __name__ == "__main__":
     import asyncio
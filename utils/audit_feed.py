@@ -0,0 +1,109 @@
+import asyncio
+import io
+import time
+import traceback
+from typing import Dict, List, NamedTuple, Optional
+
+import discord
+
+# 埋め込みの説明文の上限（これを超える場合はテキストファイルで送る）
+EMBED_DESCRIPTION_LIMIT = 4096
+
+
+class AuditFlushPolicy(NamedTuple):
+    """記録をまとめて送信するタイミングの設定"""
+    flush_interval: float = 10.0   # 一定間隔ごとに送信する（秒）
+    max_entries: int = 50          # この件数がたまったら間隔を待たずに送信する
+    min_send_interval: float = 2.0  # 同じチャンネルへの送信の最小間隔（秒）
+
+
+class AuditFeed:
+    """管理用チャンネルへのロール変更の記録をためて、まとめて送信する
+
+    1件ごとに送信するとチャンネルの送信枠を使い切ってしまうため、
+    一定間隔または一定件数ごとに1つの埋め込み（長い場合はテキストファイル）にまとめる。
+    """
+
+    def __init__(self, bot, policy: AuditFlushPolicy = AuditFlushPolicy(), title: str = "ロール変更の記録"):
+        self.bot = bot
+        self.policy = policy
+        self.title = title
+        self._buffers: Dict[int, List[str]] = {}
+        self._locks: Dict[int, asyncio.Lock] = {}
+        self._last_sent: Dict[int, float] = {}
+        self._task: Optional[asyncio.Task] = None
+        self._urgent: Dict[int, asyncio.Task] = {}
+        self._closing = asyncio.Event()
+
+    def start(self) -> None:
+        """定期送信を開始する"""
+        if self._task is None:
+            self._task = asyncio.create_task(self._run())
+
+    async def close(self) -> None:
+        """定期送信を止め、たまっている記録をすべて送信する"""
+        self._closing.set()
+        if self._task:
+            await self._task
+            self._task = None
+        await asyncio.gather(*self._urgent.values(), return_exceptions=True)
+        await self.flush(force=True)
+
+    def log(self, channel_id: Optional[int], line: str) -> None:
+        """記録を1件追加する"""
+        if not channel_id:
+            return
+        buffer = self._buffers.setdefault(channel_id, [])
+        buffer.append(line)
+        if len(buffer) >= self.policy.max_entries and channel_id not in self._urgent:
+            self._urgent[channel_id] = asyncio.create_task(self._flush_urgent(channel_id))
+
+    async def flush(self, force: bool = False) -> None:
+        """すべてのチャンネルのたまっている記録を送信する"""
+        await asyncio.gather(
+            *(self._flush_channel(channel_id, force) for channel_id in list(self._buffers)),
+            return_exceptions=True
+        )
+
+    async def _run(self) -> None:
+        while not self._closing.is_set():
+            try:
+                await asyncio.wait_for(self._closing.wait(), timeout=self.policy.flush_interval)
+            except asyncio.TimeoutError:
+                await self.flush()
+
+    async def _flush_urgent(self, channel_id: int) -> None:
+        try:
+            await self._flush_channel(channel_id)
+        finally:
+            self._urgent.pop(channel_id, None)
+
+    async def _flush_channel(self, channel_id: int, force: bool = False) -> None:
+        lock = self._locks.setdefault(channel_id, asyncio.Lock())
+        async with lock:
+            # 送信間隔が短すぎる場合は次の送信まで待つ
+            if not force:
+                wait = self._last_sent.get(channel_id, 0) + self.policy.min_send_interval - time.monotonic()
+                if wait > 0:
+                    await asyncio.sleep(wait)
+            lines = self._buffers.pop(channel_id, None)
+            if not lines:
+                return
+            channel = self.bot.get_channel(channel_id)
+            if not channel:
+                return
+            try:
+                await self._send(channel, lines)
+            except Exception:
+                print(f"管理用チャンネルへの記録の送信に失敗しました:\n{traceback.format_exc()}")
+            self._last_sent[channel_id] = time.monotonic()
+
+    async def _send(self, channel: discord.abc.Messageable, lines: List[str]) -> None:
+        title = f"🎯 {self.title}（{len(lines)}件）"
+        text = "\n".join(lines)
+        if len(text) <= EMBED_DESCRIPTION_LIMIT:
+            embed = discord.Embed(title=title, description=text, color=discord.Color.blue())
+            await channel.send(embed=embed)
+        else:
+            file = discord.File(io.BytesIO(text.encode("utf-8")), filename="role_changes.txt")
+            await channel.send(content=title, file=file)
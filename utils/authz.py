@@ -0,0 +1,111 @@
+from typing import Any, Callable, Dict, FrozenSet, NamedTuple, Optional
+
+import discord
+
+
+class Check(NamedTuple):
+    """コマンドの実行条件1つ
+
+    compile はサーバーのロール・チャンネルから判定に使うID集合などを作る関数（サーバーごとに1回だけ実行する）。
+    test はその結果とインタラクションから可否を判定する関数。cost の小さいものから順に判定する。
+    """
+    name: str
+    cost: int
+    compile: Optional[Callable[[discord.Guild], Any]]
+    test: Callable[[Any, discord.Interaction], bool]
+    message: str
+
+
+def channel_check(name: str, matches: Callable[[str], bool], message: str) -> Check:
+    """チャンネル名の条件を、該当するチャンネルIDの集合に変換して判定する条件を作る
+
+    スレッドは親チャンネルが条件を満たすか、スレッド自体の名前が条件を満たせば通す。
+    """
+    def compile(guild: discord.Guild) -> FrozenSet[int]:
+        return frozenset(
+            channel.id for channel in guild.channels
+            if not isinstance(channel, discord.CategoryChannel) and matches(channel.name)
+        )
+
+    def test(channel_ids: FrozenSet[int], interaction: discord.Interaction) -> bool:
+        if interaction.channel_id in channel_ids:
+            return True
+        channel = interaction.channel
+        # スレッドはキャッシュの集合に含めず、親チャンネルのIDと名前で判定する
+        return isinstance(channel, discord.Thread) and (channel.parent_id in channel_ids or matches(channel.name))
+    return Check(name, 0, compile, test, message)
+
+
+def role_check(name: str, matches: Callable[[str], bool], message: str) -> Check:
+    """ロール名の条件を、該当するロールIDの集合に変換して判定する条件を作る"""
+    def compile(guild: discord.Guild) -> FrozenSet[int]:
+        return frozenset(role.id for role in guild.roles if matches(role.name))
+
+    def test(role_ids: FrozenSet[int], interaction: discord.Interaction) -> bool:
+        # Member.get_role はメンバーのロールIDの二分探索なので、ロール数が増えてもほぼ一定時間
+        return any(interaction.user.get_role(role_id) for role_id in role_ids)
+    return Check(name, 2, compile, test, message)
+
+
+# サーバーの管理者権限（インタラクションに含まれる権限を使うため、ロールを走査しない）
+ADMINISTRATOR = Check(
+    "administrator", 1, None,
+    lambda _, interaction: interaction.permissions.administrator,
+    'このコマンドは管理者権限が必要です。'
+)
+
+
+class Authorizer:
+    """コマンドの実行条件をサーバーごとにID集合へ変換してキャッシュし、判定する
+
+    キャッシュはロール・チャンネルの作成・削除・名前の変更のたびにサーバー単位で捨てる。
+    """
+
+    def __init__(self):
+        self._compiled: Dict[int, Dict[str, Any]] = {}
+        self._counters: Dict[str, Dict[str, int]] = {}
+
+    def first_failure(self, interaction: discord.Interaction, checks) -> Optional[Check]:
+        """条件を順に判定し、最初に満たさなかった条件を返す（すべて満たせば None）"""
+        guild = interaction.guild
+        compiled = self._compiled.setdefault(guild.id, {}) if guild else None
+        for check in checks:
+            if check.compile is None:
+                value = None
+            elif guild is None:
+                value = frozenset()
+            elif check.name in compiled:
+                value = compiled[check.name]
+            else:
+                value = compiled[check.name] = check.compile(guild)
+            passed = check.test(value, interaction)
+            counter = self._counters.setdefault(check.name, {"passed": 0, "denied": 0})
+            counter["passed" if passed else "denied"] += 1
+            if not passed:
+                return check
+        return None
+
+    def invalidate(self, guild_id: int) -> None:
+        """サーバーのキャッシュを捨てる（次の判定時に作り直す）"""
+        self._compiled.pop(guild_id, None)
+
+    def stats(self) -> Dict[str, Dict[str, int]]:
+        """条件ごとの通過・拒否の回数"""
+        return {name: dict(counter) for name, counter in self._counters.items()}
+
+
+# Bot全体で共有する判定器
+authorizer = Authorizer()
+
+
+def authorize(*checks: Check):
+    """複数の実行条件をまとめて1つのチェックとして判定するデコレータ（軽い条件から順に判定する）"""
+    ordered = sorted(checks, key=lambda check: check.cost)
+
+    async def predicate(interaction: discord.Interaction) -> bool:
+        failed = authorizer.first_failure(interaction, ordered)
+        if failed:
+            await interaction.response.send_message(failed.message, ephemeral=True)
+            return False
+        return True
+    return discord.app_commands.check(predicate)
@@ -0,0 +1,118 @@
+import asyncio
+import random
+import time
+from typing import Callable, List, NamedTuple, Optional
+
+import discord
+
+from config.settings import BULK_ROLE_SETTINGS
+
+
+class BulkRoleResult(NamedTuple):
+    """メンバー1人分のロール付与の結果"""
+    member: discord.Member
+    ok: bool
+    error: Optional[Exception]
+    attempts: int
+
+
+def _retry_after(error: Exception) -> Optional[float]:
+    """再試行すべきエラーなら待機時間（不明な場合は0）を返し、そうでなければ None を返す"""
+    if isinstance(error, discord.RateLimited):
+        return error.retry_after
+    if isinstance(error, discord.HTTPException) and (error.status == 429 or error.status >= 500):
+        retry_after = error.response.headers.get("Retry-After") if error.response is not None else None
+        try:
+            return float(retry_after) if retry_after is not None else 0.0
+        except ValueError:
+            return 0.0
+    return None
+
+
+class BulkRoleAssigner:
+    """多数のメンバーへのロール付与を、同時実行数を制限したワーカーで並行に行う
+
+    429（レート制限）を受けたときは全ワーカーを Retry-After の間止め、同時実行数を半分に減らす。
+    429や5xxで失敗したメンバーは指数バックオフで再試行する。
+    """
+
+    def __init__(
+        self,
+        concurrency: int = BULK_ROLE_SETTINGS["concurrency"],
+        max_retries: int = BULK_ROLE_SETTINGS["max_retries"],
+        base_delay: float = BULK_ROLE_SETTINGS["base_delay"]
+    ):
+        self.concurrency = max(1, concurrency)
+        self.max_retries = max_retries
+        self.base_delay = base_delay
+        self._limit = self.concurrency
+        self._resume_at = 0.0
+
+    async def add_role(
+        self,
+        members: List[discord.Member],
+        role: discord.Role,
+        reason: Optional[str] = None,
+        on_result: Optional[Callable[[BulkRoleResult], None]] = None
+    ) -> List[BulkRoleResult]:
+        """メンバー全員にロールを付与する（既に持っているメンバーも呼び出し側で除いておく）"""
+        return await self._run(members, lambda member: member.add_roles(role, reason=reason), on_result)
+
+    async def remove_role(
+        self,
+        members: List[discord.Member],
+        role: discord.Role,
+        reason: Optional[str] = None,
+        on_result: Optional[Callable[[BulkRoleResult], None]] = None
+    ) -> List[BulkRoleResult]:
+        """メンバー全員からロールを削除する"""
+        return await self._run(members, lambda member: member.remove_roles(role, reason=reason), on_result)
+
+    async def _run(self, members, operation, on_result) -> List[BulkRoleResult]:
+        self._limit = self.concurrency
+        self._resume_at = 0.0
+        queue = asyncio.Queue()
+        for member in members:
+            queue.put_nowait(member)
+        results: List[BulkRoleResult] = []
+
+        async def worker(index: int):
+            # 同時実行数が減らされたら、番号の大きいワーカーから抜ける
+            while index < self._limit:
+                try:
+                    member = queue.get_nowait()
+                except asyncio.QueueEmpty:
+                    return
+                result = await self._apply(member, operation)
+                results.append(result)
+                if on_result:
+                    on_result(result)
+
+        await asyncio.gather(*(worker(index) for index in range(min(self.concurrency, len(members)))))
+        return results
+
+    async def _apply(self, member, operation) -> BulkRoleResult:
+        attempts = 0
+        while True:
+            await self._wait_for_rate_limit()
+            attempts += 1
+            try:
+                await operation(member)
+                return BulkRoleResult(member, True, None, attempts)
+            except Exception as e:
+                retry_after = _retry_after(e)
+                if retry_after is None or attempts > self.max_retries:
+                    return BulkRoleResult(member, False, e, attempts)
+                if retry_after > 0:
+                    # レート制限：全ワーカーを止めて同時実行数を減らす
+                    self._resume_at = max(self._resume_at, time.monotonic() + retry_after)
+                    self._limit = max(1, self._limit // 2)
+                    print(f"ロール付与がレート制限を受けました。同時実行数を{self._limit}に減らします（{retry_after:.2f}秒待機）")
+                else:
+                    await asyncio.sleep(self.base_delay * 2 ** (attempts - 1) * (1 + random.random()))
+
+    async def _wait_for_rate_limit(self) -> None:
+        wait = self._resume_at - time.monotonic()
+        if wait > 0:
+            await asyncio.sleep(wait)
+
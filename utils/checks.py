@@ -1,39 +1,33 @@
 import discord
+from utils.authz import ADMINISTRATOR, authorize, channel_check, role_check
 from config.settings import ADMIN_CHANNEL_NAME, STAFF_ROLE_NAME
 
+# 管理botチャンネル
+ADMIN_CHANNEL = channel_check(
+    "admin_channel",
+    lambda name: name.startswith(ADMIN_CHANNEL_NAME),
+    f'このコマンドは「{ADMIN_CHANNEL_NAME}」チャンネルでのみ使用できます。'
+)
+
+# 職員ロール
+STAFF_ROLE = role_check(
+    "staff_role",
+    lambda name: name == STAFF_ROLE_NAME,
+    f'このコマンドは「{STAFF_ROLE_NAME}」ロールを持つユーザーのみが使用できます。'
+)
+
 def is_admin_channel():
     """管理botチャンネルでのみコマンドを使用可能にするデコレータ"""
-    async def predicate(interaction: discord.Interaction) -> bool:
-        if not interaction.channel.name.startswith(ADMIN_CHANNEL_NAME):
-            await interaction.response.send_message(
-                f'このコマンドは「{ADMIN_CHANNEL_NAME}」チャンネルでのみ使用できます。',
-                ephemeral=True
-            )
-            return False
-        return True
-    return discord.app_commands.check(predicate)
+    return authorize(ADMIN_CHANNEL)
 
 def has_staff_role():
     """職員ロールを持つユーザーのみコマンドを使用可能にするデコレータ"""
-    async def predicate(interaction: discord.Interaction) -> bool:
-        staff_role = discord.utils.get(interaction.guild.roles, name=STAFF_ROLE_NAME)
-        if not staff_role or staff_role not in interaction.user.roles:
-            await interaction.response.send_message(
-                f'このコマンドは「{STAFF_ROLE_NAME}」ロールを持つユーザーのみが使用できます。',
-                ephemeral=True
-            )
-            return False
-        return True
-    return discord.app_commands.check(predicate)
+    return authorize(STAFF_ROLE)
 
 def is_administrator():
     """管理者権限を持つユーザーのみコマンドを使用可能にするデコレータ"""
-    async def predicate(interaction: discord.Interaction) -> bool:
-        if not interaction.user.guild_permissions.administrator:
-            await interaction.response.send_message(
-                'このコマンドは管理者権限が必要です。',
-                ephemeral=True
-            )
-            return False
-        return True
-    return discord.app_commands.check(predicate) 
\ No newline at end of file
+    return authorize(ADMINISTRATOR)
+
+def is_season_admin():
+    """管理botチャンネル・職員ロール・管理者権限をまとめて確認するデコレータ"""
+    return authorize(ADMIN_CHANNEL, STAFF_ROLE, ADMINISTRATOR)
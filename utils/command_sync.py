@@ -0,0 +1,48 @@
+import hashlib
+import json
+import time
+from typing import Dict, Optional
+
+import discord
+from discord import app_commands
+
+
+def sync_key(guild_id: Optional[int] = None) -> str:
+    """同期結果を保存するキー（全体への同期とサーバーごとの同期を区別する）"""
+    return f"command_sync:guild:{guild_id}" if guild_id else "command_sync:global"
+
+
+def command_tree_hash(tree: app_commands.CommandTree, guild: Optional[discord.abc.Snowflake] = None) -> str:
+    """同期するコマンドの定義から、順序によらない安定したハッシュを求める"""
+    payload = sorted(
+        (command.to_dict(tree) for command in tree.get_commands(guild=guild)),
+        key=lambda data: (data.get("type", 1), data["name"])
+    )
+    serialized = json.dumps(payload, sort_keys=True, ensure_ascii=False, separators=(",", ":"))
+    return hashlib.sha256(serialized.encode("utf-8")).hexdigest()
+
+
+async def sync_commands(tree: app_commands.CommandTree, store, guild_id: Optional[int] = None, force: bool = False) -> Dict:
+    """コマンドの定義が前回の同期から変わっている場合だけ同期する
+
+    guild_id を指定すると、全体のコマンドをそのサーバーにコピーしてサーバー単位で同期する（開発用。すぐに反映される）。
+    同期した場合も飛ばした場合も、結果（ハッシュ・同期したコマンド・日時）を返す。
+    """
+    guild = discord.Object(id=guild_id) if guild_id else None
+    if guild:
+        tree.copy_global_to(guild=guild)
+    key = sync_key(guild_id)
+    digest = command_tree_hash(tree, guild)
+    previous = await store.load_meta(key)
+    if not force and previous and previous.get("hash") == digest and previous.get("ok"):
+        return {**previous, "skipped": True}
+
+    try:
+        synced = await tree.sync(guild=guild)
+    except Exception as e:
+        # 失敗した結果も保存して、次回の起動で必ず同期し直す
+        await store.save_meta(key, {"hash": digest, "ok": False, "error": str(e), "synced_at": time.time(), "commands": []})
+        raise
+    result = {"hash": digest, "ok": True, "synced_at": time.time(), "commands": sorted(command.name for command in synced)}
+    await store.save_meta(key, result)
+    return {**result, "skipped": False}
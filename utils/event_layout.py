@@ -0,0 +1,282 @@
+import json
+from typing import Any, Dict, List, NamedTuple, Optional, Set
+
+import discord
+
+from utils.helpers import get_category_by_name, get_role_by_name
+from utils.provisioning import ProvisioningScheduler
+from utils.season_layout import DEFAULT_ROLE_KEY, OverwriteSpec, resolve_overwrites
+
+try:
+    import yaml
+except ImportError:  # YAML のテンプレートを使わない場合は不要
+    yaml = None
+
+# テンプレートの名前の中でイベント名に置き換える文字列
+EVENT_PLACEHOLDER = "{event}"
+CHANNEL_TYPES = ("text", "forum")
+
+
+class EventChannelSpec(NamedTuple):
+    name: str
+    type: str                    # "text" または "forum"
+    overwrites: OverwriteSpec
+    position: int
+    topic: Optional[str] = None
+    guide: bool = False          # ロール付与コマンドの説明を投稿する
+
+
+class EventLayout(NamedTuple):
+    """1つのイベントに必要なロール・カテゴリ・チャンネルの構成"""
+    name: str
+    role_name: str
+    color: discord.Color
+    hoist: bool
+    overwrites: OverwriteSpec    # カテゴリの権限の上書き設定
+    channels: List[EventChannelSpec]
+
+
+def build_event_layout(
+    event_name: str,
+    color: Optional[discord.Color] = None,
+    overwrites: Optional[OverwriteSpec] = None,
+    extra_channels: Optional[List[Dict]] = None
+) -> EventLayout:
+    """イベントの構成を作る（既定のログ用フォーラム・ロール付与チャンネルに、追加のチャンネルを後ろに並べる）"""
+    role_name = f"🎯 {event_name}"
+    category_overwrites = {
+        DEFAULT_ROLE_KEY: {"view_channel": False},
+        role_name: {"view_channel": True}
+    }
+    category_overwrites.update(overwrites or {})
+    channels = [
+        EventChannelSpec(f"ログ-{event_name}", "forum", {}, 0, topic=f"{event_name}のログを記録するフォーラムです。"),
+        EventChannelSpec(f"ロール付与-{event_name}", "text", {}, 1, guide=True)
+    ]
+    for extra in extra_channels or []:
+        channels.append(EventChannelSpec(
+            name=extra["name"],
+            type=extra.get("type", "text"),
+            overwrites=extra.get("overwrites", {}),
+            position=len(channels),
+            topic=extra.get("topic")
+        ))
+    return EventLayout(event_name, role_name, color or discord.Color.purple(), True, category_overwrites, channels)
+
+
+def parse_event_template(data: bytes, filename: str = "") -> List[EventLayout]:
+    """YAML / JSON のテンプレートからイベントの構成の一覧を作る
+
+    テンプレートはイベントの一覧、または events（イベントの一覧）と defaults（全イベント共通の設定）を持つ辞書。
+    各イベントは名前だけの文字列か、name・color・overwrites・channels を持つ辞書で指定する。
+    名前・トピックの中の {event} はイベント名に置き換える。
+    """
+    text = data.decode("utf-8-sig")
+    if filename.lower().endswith((".yaml", ".yml")):
+        if yaml is None:
+            raise Exception("YAMLのテンプレートを読み込むには PyYAML が必要です（pip install pyyaml）。JSONのテンプレートは追加のパッケージなしで使えます。")
+        try:
+            template = yaml.safe_load(text)
+        except yaml.YAMLError as e:
+            raise Exception(f"テンプレートを読み込めませんでした: {e}")
+    else:
+        try:
+            template = json.loads(text)
+        except ValueError as e:
+            raise Exception(f"テンプレートを読み込めませんでした: {e}")
+
+    if isinstance(template, list):
+        template = {"events": template}
+    if not isinstance(template, dict) or not isinstance(template.get("events"), list) or not template["events"]:
+        raise Exception("テンプレートにイベントの一覧（events）がありません。")
+    defaults = template.get("defaults") or {}
+
+    layouts = []
+    for entry in template["events"]:
+        if isinstance(entry, str):
+            entry = {"name": entry}
+        if not isinstance(entry, dict) or not str(entry.get("name", "")).strip():
+            raise Exception(f"イベントの指定が正しくありません: {entry}")
+        event_name = str(entry["name"]).strip()
+        color = entry.get("color", defaults.get("color"))
+        overwrites = {**(defaults.get("overwrites") or {}), **(entry.get("overwrites") or {})}
+        channels = [*(defaults.get("channels") or []), *(entry.get("channels") or [])]
+        layouts.append(build_event_layout(
+            event_name,
+            color=_parse_color(color, event_name),
+            overwrites={_fill(role_name, event_name): permissions for role_name, permissions in overwrites.items()},
+            extra_channels=[_parse_channel(channel, event_name) for channel in channels]
+        ))
+
+    names = [layout.name for layout in layouts]
+    duplicates = sorted({name for name in names if names.count(name) > 1})
+    if duplicates:
+        raise Exception(f"イベント名が重複しています: {', '.join(duplicates)}")
+    return layouts
+
+
+def _fill(value: str, event_name: str) -> str:
+    return str(value).replace(EVENT_PLACEHOLDER, event_name)
+
+
+def _parse_color(value: Any, event_name: str) -> Optional[discord.Color]:
+    if value is None:
+        return None
+    if isinstance(value, int):
+        return discord.Color(value)
+    try:
+        return discord.Color.from_str(str(value))
+    except ValueError:
+        raise Exception(f"{event_name}の色の指定が正しくありません: {value}")
+
+
+def _parse_channel(channel: Any, event_name: str) -> Dict:
+    if isinstance(channel, str):
+        channel = {"name": channel}
+    if not isinstance(channel, dict) or not channel.get("name"):
+        raise Exception(f"{event_name}のチャンネルの指定が正しくありません: {channel}")
+    channel_type = channel.get("type", "text")
+    if channel_type not in CHANNEL_TYPES:
+        raise Exception(f"{event_name}のチャンネルの種類が正しくありません（text / forum）: {channel_type}")
+    return {
+        "name": _fill(channel["name"], event_name),
+        "type": channel_type,
+        "topic": _fill(channel["topic"], event_name) if channel.get("topic") else None,
+        "overwrites": {_fill(role_name, event_name): permissions for role_name, permissions in (channel.get("overwrites") or {}).items()}
+    }
+
+
+def find_existing_event(guild: discord.Guild, layout: EventLayout) -> Optional[str]:
+    """イベントのロール・カテゴリが既にあれば、その説明を返す（APIは呼ばない）"""
+    if get_role_by_name(guild, layout.role_name):
+        return f"ロール「{layout.role_name}」が既に存在します。"
+    if get_category_by_name(guild, layout.name):
+        return f"カテゴリ「{layout.name}」が既に存在します。"
+    return None
+
+
+def event_key(layout: EventLayout, part: str) -> str:
+    return f"event:{layout.name}:{part}"
+
+
+def overwrite_role_names(layout: EventLayout) -> Set[str]:
+    """カテゴリ・チャンネルの権限の上書きに指定されているロール名"""
+    names = set(layout.overwrites)
+    for spec in layout.channels:
+        names.update(spec.overwrites)
+    names.discard(DEFAULT_ROLE_KEY)
+    return names
+
+
+def schedule_events(scheduler: ProvisioningScheduler, guild: discord.Guild, layouts: List[EventLayout]) -> Dict[str, List[str]]:
+    """複数のイベントの作成をスケジューラーに登録する（ロール → カテゴリ → チャンネル → 説明の投稿の依存関係つき）
+
+    全イベントのロールを先に登録するため、後ろに並んだイベントのロールを権限の上書きに使うこともできる。
+    経路ごとの同時実行数を共有しながら並行に作成され、あるイベントの作成に失敗しても他のイベントは止まらない。
+    権限の上書きに指定したロールがサーバーにも作成するイベントにもないイベントは登録せず、
+    イベント名 → 見つからないロール名の一覧 を返す。
+    """
+    pending = list(layouts)
+    missing: Dict[str, List[str]] = {}
+    while True:
+        # 登録しないイベントのロールを使うイベントも登録しないため、変わらなくなるまで繰り返す
+        available = {layout.role_name for layout in pending}
+        valid = []
+        for layout in pending:
+            names = sorted(
+                name for name in overwrite_role_names(layout)
+                if name not in available and f"role:{name}" not in scheduler and not get_role_by_name(guild, name)
+            )
+            if names:
+                missing[layout.name] = names
+            else:
+                valid.append(layout)
+        if len(valid) == len(pending):
+            break
+        pending = valid
+
+    for layout in pending:
+        _schedule_role(scheduler, guild, layout)
+    for layout in pending:
+        _schedule_channels(scheduler, guild, layout)
+    return missing
+
+
+def schedule_event(scheduler: ProvisioningScheduler, guild: discord.Guild, layout: EventLayout) -> None:
+    """イベント1つ分の作成をスケジューラーに登録する"""
+    missing = schedule_events(scheduler, guild, [layout])
+    if missing:
+        raise Exception(f"権限の上書きに指定したロールが見つかりません: {', '.join(missing[layout.name])}")
+
+
+def _schedule_role(scheduler: ProvisioningScheduler, guild: discord.Guild, layout: EventLayout) -> None:
+    async def create_role(values):
+        return await guild.create_role(name=layout.role_name, color=layout.color, hoist=layout.hoist)
+    scheduler.add(f"role:{layout.role_name}", "roles", create_role)
+
+
+def _schedule_channels(scheduler: ProvisioningScheduler, guild: discord.Guild, layout: EventLayout) -> None:
+    category_key = event_key(layout, "category")
+
+    def role_dependencies(overwrites: OverwriteSpec) -> List[str]:
+        # 同時に作成するイベントのロールを権限に使う場合は、その作成を待つ
+        return scheduler.registered(*(f"role:{role_name}" for role_name in overwrites if role_name != DEFAULT_ROLE_KEY))
+
+    async def create_category(values):
+        return await guild.create_category(name=layout.name, overwrites=resolve_overwrites(guild, layout.overwrites, values))
+    scheduler.add(category_key, "channels", create_category, depends_on=role_dependencies(layout.overwrites))
+
+    for spec in layout.channels:
+        channel_key = event_key(layout, f"channel:{spec.position}")
+        scheduler.add(
+            channel_key, "channels", _channel_factory(guild, layout, spec, category_key),
+            depends_on=[category_key, *role_dependencies(spec.overwrites)]
+        )
+        if spec.guide:
+            async def post_guide(values, channel_key=channel_key):
+                return await values[channel_key].send(embed=role_guide_embed(layout.name))
+            scheduler.add(event_key(layout, "guide"), "messages", post_guide, depends_on=[channel_key])
+
+
+def _channel_factory(guild: discord.Guild, layout: EventLayout, spec: EventChannelSpec, category_key: str):
+    async def create(values):
+        category = values[category_key]
+        fields = {"name": spec.name, "category": category, "position": spec.position}
+        if spec.overwrites:
+            # チャンネル独自の設定はカテゴリの設定に上書きする
+            fields["overwrites"] = {**category.overwrites, **resolve_overwrites(guild, spec.overwrites, values)}
+        if spec.type == "forum":
+            return await guild.create_forum(topic=spec.topic, **fields)
+        if spec.topic:
+            fields["topic"] = spec.topic
+        return await guild.create_text_channel(**fields)
+    return create
+
+
+def role_guide_embed(event_name: str) -> discord.Embed:
+    """ロール付与チャンネルに投稿する説明"""
+    embed = discord.Embed(
+        title="🎯 イベントロールの付与方法",
+        description=f"このチャンネルで以下のコマンドを使用して、`{event_name}`のメンバーを管理できます：",
+        color=discord.Color.blue()
+    )
+    embed.add_field(
+        name="コマンド",
+        value=f"`/add_role [ユーザー名]`\n`/remove_role [ユーザー名]`",
+        inline=False
+    )
+    embed.add_field(
+        name="説明",
+        value=f"`/add_role` - 指定したユーザーに`{event_name}`ロールを付与します。\n`/remove_role` - 指定したユーザーから`{event_name}`ロールを削除します。",
+        inline=False
+    )
+    return embed
+
+
+def event_keys(layout: EventLayout) -> List[str]:
+    """イベント1つ分の処理のキーを返す（スケジューラーの結果をイベントごとに分けるのに使う）"""
+    keys = [f"role:{layout.role_name}", event_key(layout, "category")]
+    keys += [event_key(layout, f"channel:{spec.position}") for spec in layout.channels]
+    if any(spec.guide for spec in layout.channels):
+        keys.append(event_key(layout, "guide"))
+    return keys
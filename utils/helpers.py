@@ -1,51 +1,38 @@
-import json
-import os
+import io
+import time
 import traceback
 from typing import Dict, List, Optional, Tuple, Union
 
 import discord
 
-def save_reaction_roles(reaction_roles: Dict) -> None:
-    """リアクションロールの設定をJSONファイルに保存する"""
-    serializable_roles = {}
-    for message_id, data in reaction_roles.items():
-        serializable_roles[str(message_id)] = {
-            "roles": [role.id for role in data["roles"]],
-            "emojis": data["emojis"]
-        }
-    
-    with open('reaction_roles.json', 'w', encoding='utf-8') as f:
-        json.dump(serializable_roles, f, ensure_ascii=False, indent=4)
+from utils.name_index import name_index
 
-async def load_reaction_roles(bot) -> Dict:
-    """リアクションロールの設定をJSONファイルから読み込む"""
-    reaction_roles = {}
-    if not os.path.exists('reaction_roles.json'):
-        print("リアクションロールの設定ファイルが見つかりません。")
-        return reaction_roles
-    
-    with open('reaction_roles.json', 'r', encoding='utf-8') as f:
-        serializable_roles = json.load(f)
-    
-    loaded_count = 0
-    for message_id, data in serializable_roles.items():
-        roles = []
-        for guild in bot.guilds:
-            for role_id in data["roles"]:
-                role = guild.get_role(role_id)
-                if role:
-                    roles.append(role)
-        
-        if roles:
-            reaction_roles[int(message_id)] = {
-                "roles": roles,
-                "emojis": data["emojis"]
-            }
-            loaded_count += 1
-    
-    print(f"リアクションロールの設定を読み込みました: {loaded_count}件")
+async def load_reaction_roles(store) -> Dict:
+    """リアクションロールの設定をストアから読み込む
+
+    ロールはここでは解決せず、IDのまま保持してリアクションが届いたときに解決する。
+    """
+    started = time.perf_counter()
+    reaction_roles = await store.load_reaction_roles()
+    elapsed = (time.perf_counter() - started) * 1000
+    if not reaction_roles:
+        print("リアクションロールの設定が見つかりません。")
+    else:
+        print(f"リアクションロールの設定を読み込みました: {len(reaction_roles)}件（{elapsed:.1f}ms）")
     return reaction_roles
 
+# メッセージ1件に収める本文の上限（Discordの上限2000文字より少し余裕を持たせる）
+MESSAGE_TEXT_LIMIT = 1900
+
+async def send_long_message(interaction: discord.Interaction, header: str, body: str, filename: str) -> None:
+    """本文が長い場合はテキストファイルとして添付してフォローアップを送る"""
+    text = f"{header}\n{body}" if body else header
+    if len(text) <= MESSAGE_TEXT_LIMIT:
+        await interaction.followup.send(text)
+        return
+    file = discord.File(io.BytesIO(body.encode("utf-8")), filename=filename)
+    await interaction.followup.send(header, file=file)
+
 def format_error_message(error: Exception) -> str:
     """エラーメッセージをフォーマットする"""
     error_type = type(error).__name__
@@ -60,9 +47,48 @@ def format_error_message(error: Exception) -> str:
 
 def get_category_by_name(guild: discord.Guild, name: str) -> Optional[discord.CategoryChannel]:
     """カテゴリを名前で取得する（絵文字の結合/分解に対応）"""
-    category = discord.utils.get(guild.categories, name=name)
-    if not category:
-        # 絵文字が分解されている可能性がある場合の代替名
-        alt_name = name.replace("👨‍", "👨").replace("👨‍", "👨")
-        category = discord.utils.get(guild.categories, name=alt_name)
-    return category 
\ No newline at end of file
+    return name_index.category(guild, name)
+
+def get_role_by_name(guild: discord.Guild, name: str) -> Optional[discord.Role]:
+    """ロールを名前で取得する（絵文字の結合/分解に対応）"""
+    return name_index.role(guild, name)
+
+def get_text_channel_by_name(guild: discord.Guild, name: str) -> Optional[discord.TextChannel]:
+    """テキストチャンネルを名前で取得する（絵文字の結合/分解に対応）"""
+    return name_index.text_channel(guild, name)
+
+# 削除対象の種類と表示名
+OBJECT_LABELS = {
+    "category": "カテゴリ",
+    "channel": "チャンネル",
+    "role": "ロール",
+    "message": "リアクションロールメッセージ"
+}
+
+def object_target(obj) -> Dict:
+    """ロール・チャンネル・メッセージを、保存できる削除対象の情報に変換する"""
+    if isinstance(obj, discord.Role):
+        return {"type": "role", "id": obj.id, "name": obj.name}
+    if isinstance(obj, discord.CategoryChannel):
+        return {"type": "category", "id": obj.id, "name": obj.name}
+    if isinstance(obj, (discord.Message, discord.PartialMessage)):
+        return {"type": "message", "id": obj.id, "channel_id": obj.channel.id, "name": f"{obj.channel.name}のメッセージ"}
+    return {"type": "channel", "id": obj.id, "name": obj.name, "parent_id": obj.category_id}
+
+async def delete_object_target(guild: discord.Guild, target: Dict) -> bool:
+    """削除対象をIDで取得して削除する（既に存在しない場合は何もせず False を返す）"""
+    if target["type"] == "role":
+        obj = guild.get_role(target["id"])
+    elif target["type"] == "message":
+        channel = guild.get_channel(target["channel_id"])
+        obj = channel.get_partial_message(target["id"]) if channel else None
+    else:
+        obj = guild.get_channel(target["id"])
+    if obj is None:
+        return False
+    try:
+        await obj.delete()
+    except discord.NotFound:
+        # キャッシュに残っていても既に削除されている
+        return False
+    return True
@@ -0,0 +1,188 @@
+import asyncio
+import secrets
+import time
+import traceback
+from typing import Any, Awaitable, Callable, Dict, List, Optional
+
+import discord
+
+from config.settings import JOB_SETTINGS
+from utils.progress import ProgressReporter
+
+STATUS_RUNNING = "running"
+STATUS_COMPLETED = "completed"
+STATUS_FAILED = "failed"
+
+STATUS_LABELS = {
+    STATUS_RUNNING: "⏳ 実行中",
+    STATUS_COMPLETED: "✅ 完了",
+    STATUS_FAILED: "❌ 失敗"
+}
+
+
+class JobContext:
+    """ジョブの処理に渡される実行環境
+
+    step() で実行した手順は完了するたびに保存され、再開時には飛ばされる。
+    """
+
+    def __init__(self, manager: "JobManager", job: Dict, guild: discord.Guild, reporter: ProgressReporter):
+        self.manager = manager
+        self.job = job
+        self.guild = guild
+        self.reporter = reporter
+        self._completed = set(job["completed_steps"])
+
+    @property
+    def params(self) -> Dict:
+        return self.job["params"]
+
+    @property
+    def state(self) -> Dict:
+        """ジョブごとに保存される作業用の値（失敗の記録など）"""
+        return self.job["state"]
+
+    @property
+    def resumed(self) -> bool:
+        return self.job["attempts"] > 1
+
+    def set_total(self, total: int) -> None:
+        """手順の総数を設定する（進捗表示に使う）"""
+        self.job["total_steps"] = total
+
+    def is_done(self, name: str) -> bool:
+        return name in self._completed
+
+    async def step(self, name: str, func: Callable[[], Awaitable[Any]]) -> None:
+        """手順を1つ実行し、完了を保存する（完了済みなら何もしない）"""
+        if name in self._completed:
+            return
+        await func()
+        self._completed.add(name)
+        self.job["completed_steps"].append(name)
+        await self.manager.save(self.job)
+        self.progress()
+
+    def progress(self, detail: Optional[str] = None) -> None:
+        """進捗メッセージを更新する（一定間隔より短い更新はまとめられる）"""
+        self.reporter.update(self.manager.format_status(self.job, detail))
+
+
+JobHandler = Callable[[JobContext], Awaitable[Optional[str]]]
+
+
+class JobManager:
+    """再起動をまたいで続きから実行できるバックグラウンドジョブを管理する
+
+    ジョブの状態は手順が終わるたびにストアへ保存し、起動時に未完了のジョブを再開する。
+    進捗はコマンドを実行したチャンネルに送った1つのメッセージを編集して表示するため、
+    インタラクションの有効期限（15分）に左右されない。
+    """
+
+    def __init__(self, bot, store, progress_interval: float = JOB_SETTINGS["progress_interval"]):
+        self.bot = bot
+        self.store = store
+        self.progress_interval = progress_interval
+        self._handlers: Dict[str, JobHandler] = {}
+        self._labels: Dict[str, str] = {}
+        self._tasks: Dict[str, asyncio.Task] = {}
+        self._resumed = False
+
+    def register(self, kind: str, label: str, handler: JobHandler) -> None:
+        """ジョブの種類と処理を登録する"""
+        self._handlers[kind] = handler
+        self._labels[kind] = label
+
+    async def save(self, job: Dict) -> None:
+        job["updated_at"] = time.time()
+        await self.store.save_job(job)
+
+    async def start(self, kind: str, guild: discord.Guild, channel: discord.abc.Messageable, params: Dict) -> Dict:
+        """ジョブを開始する（進捗メッセージを送信して、処理はバックグラウンドで実行する）"""
+        now = time.time()
+        job = {
+            "job_id": secrets.token_hex(4),
+            "kind": kind,
+            "guild_id": guild.id,
+            "params": params,
+            "state": {},
+            "status": STATUS_RUNNING,
+            "completed_steps": [],
+            "total_steps": 0,
+            "attempts": 0,
+            "channel_id": getattr(channel, "id", None),
+            "message_id": None,
+            "error": None,
+            "created_at": now,
+            "updated_at": now
+        }
+        message = await channel.send(self.format_status(job))
+        job["message_id"] = message.id
+        await self.save(job)
+        self._spawn(job, guild)
+        return job
+
+    async def resume_all(self) -> int:
+        """未完了のジョブを再開する（プロセスにつき1回だけ）"""
+        if self._resumed:
+            return 0
+        self._resumed = True
+        resumed = 0
+        for job in await self.store.load_jobs(status=STATUS_RUNNING):
+            guild = self.bot.get_guild(job["guild_id"])
+            if not guild or job["kind"] not in self._handlers or job["job_id"] in self._tasks:
+                continue
+            self._spawn(job, guild)
+            resumed += 1
+        if resumed:
+            print(f"未完了のジョブを再開しました: {resumed}件")
+        return resumed
+
+    async def list_jobs(self, guild_id: int, limit: int = 10) -> List[Dict]:
+        """サーバーの最近のジョブを新しい順に返す"""
+        return await self.store.load_jobs(guild_id=guild_id, limit=limit)
+
+    async def get_job(self, guild_id: int, job_id: str) -> Optional[Dict]:
+        """サーバーのジョブをIDで取得する"""
+        job = await self.store.load_job(job_id)
+        return job if job and job["guild_id"] == guild_id else None
+
+    def format_status(self, job: Dict, detail: Optional[str] = None) -> str:
+        """ジョブの状態を表示用の文字列にする"""
+        label = self._labels.get(job["kind"], job["kind"])
+        status = STATUS_LABELS.get(job["status"], job["status"])
+        text = f"{status} ジョブ `{job['job_id']}`：{label}"
+        if job["total_steps"]:
+            text += f"（{len(job['completed_steps'])}/{job['total_steps']}）"
+        if detail:
+            text += f"\n{detail}"
+        return text
+
+    def _spawn(self, job: Dict, guild: discord.Guild) -> None:
+        self._tasks[job["job_id"]] = asyncio.create_task(self._run(job, guild))
+
+    def _status_message(self, job: Dict) -> Optional[discord.PartialMessage]:
+        channel = self.bot.get_channel(job["channel_id"]) if job["channel_id"] else None
+        if not channel or not job["message_id"]:
+            return None
+        return channel.get_partial_message(job["message_id"])
+
+    async def _run(self, job: Dict, guild: discord.Guild) -> None:
+        reporter = ProgressReporter(self._status_message(job), self.progress_interval)
+        context = JobContext(self, job, guild, reporter)
+        job["attempts"] += 1
+        try:
+            if context.resumed:
+                context.progress("🔁 中断されたジョブを再開しました")
+            result = await self._handlers[job["kind"]](context)
+            job["status"] = STATUS_COMPLETED
+            await self.save(job)
+            await reporter.finish(self.format_status(job, result))
+        except Exception as e:
+            job["status"] = STATUS_FAILED
+            job["error"] = f"{type(e).__name__}: {e}"
+            await self.save(job)
+            print(f"ジョブ {job['job_id']} が失敗しました:\n{traceback.format_exc()}")
+            await reporter.finish(self.format_status(job, f"エラー: {job['error']}"))
+        finally:
+            self._tasks.pop(job["job_id"], None)
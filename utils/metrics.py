@@ -0,0 +1,250 @@
+import abc
+import bisect
+import contextvars
+import functools
+import logging
+import math
+import time
+from typing import Callable, Dict, List, Optional, Sequence, Tuple
+
+import discord
+from discord import app_commands
+
+from config.settings import METRICS_SETTINGS
+
+LabelValues = Tuple[str, ...]
+
+# 既定のヒストグラムの区切り（秒）
+DEFAULT_BUCKETS = (0.005, 0.01, 0.025, 0.05, 0.1, 0.25, 0.5, 1.0, 2.5, 5.0, 10.0, 30.0, 60.0)
+
+
+def _format_labels(names: Sequence[str], values: LabelValues, extra: str = "") -> str:
+    pairs = [f'{name}="{_escape(value)}"' for name, value in zip(names, values)]
+    if extra:
+        pairs.append(extra)
+    return "{" + ",".join(pairs) + "}" if pairs else ""
+
+
+def _escape(value: str) -> str:
+    return str(value).replace("\\", "\\\\").replace("\n", "\\n").replace('"', '\\"')
+
+
+def _format_value(value: float) -> str:
+    if value == math.inf:
+        return "+Inf"
+    return repr(float(value)) if not float(value).is_integer() else str(int(value))
+
+
+class Metric(abc.ABC):
+    """ラベルごとに値を持つメトリクスの基底クラス"""
+    kind = "untyped"
+
+    def __init__(self, name: str, description: str, labels: Sequence[str] = ()):
+        self.name = name
+        self.description = description
+        self.labels = tuple(labels)
+
+    def render(self) -> List[str]:
+        return [f"# HELP {self.name} {self.description}", f"# TYPE {self.name} {self.kind}"] + self._samples()
+
+    @abc.abstractmethod
+    def _samples(self) -> List[str]:
+        ...
+
+
+class Counter(Metric):
+    """増えるだけの値"""
+    kind = "counter"
+
+    def __init__(self, name: str, description: str, labels: Sequence[str] = ()):
+        super().__init__(name, description, labels)
+        self._values: Dict[LabelValues, float] = {}
+
+    def inc(self, *label_values: str, amount: float = 1.0) -> None:
+        self._values[label_values] = self._values.get(label_values, 0.0) + amount
+
+    def _samples(self) -> List[str]:
+        return [f"{self.name}{_format_labels(self.labels, key)} {_format_value(value)}" for key, value in sorted(self._values.items())]
+
+
+class Gauge(Metric):
+    """増減する値（function を渡すと、出力するたびにその戻り値を使う）"""
+    kind = "gauge"
+
+    def __init__(self, name: str, description: str, labels: Sequence[str] = (), function: Optional[Callable[[], float]] = None):
+        super().__init__(name, description, labels)
+        self._values: Dict[LabelValues, float] = {}
+        self.function = function
+
+    def inc(self, *label_values: str, amount: float = 1.0) -> None:
+        self._values[label_values] = self._values.get(label_values, 0.0) + amount
+
+    def dec(self, *label_values: str, amount: float = 1.0) -> None:
+        self.inc(*label_values, amount=-amount)
+
+    def _samples(self) -> List[str]:
+        if self.function is not None:
+            value = self.function()
+            return [f"{self.name} {_format_value(value)}"] if value is not None and not math.isnan(value) else []
+        return [f"{self.name}{_format_labels(self.labels, key)} {_format_value(value)}" for key, value in sorted(self._values.items())]
+
+
+class Histogram(Metric):
+    """値の分布（区切りごとの件数・合計・件数）"""
+    kind = "histogram"
+
+    def __init__(self, name: str, description: str, labels: Sequence[str] = (), buckets: Sequence[float] = DEFAULT_BUCKETS):
+        super().__init__(name, description, labels)
+        self.buckets = tuple(sorted(buckets))
+        # ラベルごとに [区切りごとの件数..., 区切りを超えた件数], 合計
+        self._values: Dict[LabelValues, Tuple[List[int], List[float]]] = {}
+
+    def observe(self, value: float, *label_values: str) -> None:
+        entry = self._values.get(label_values)
+        if entry is None:
+            entry = self._values[label_values] = ([0] * (len(self.buckets) + 1), [0.0])
+        entry[0][bisect.bisect_left(self.buckets, value)] += 1
+        entry[1][0] += value
+
+    def _samples(self) -> List[str]:
+        lines = []
+        for key, (counts, total) in sorted(self._values.items()):
+            cumulative = 0
+            for bound, count in zip(self.buckets + (math.inf,), counts):
+                cumulative += count
+                le = 'le="' + _format_value(bound) + '"'
+                lines.append(f"{self.name}_bucket{_format_labels(self.labels, key, le)} {cumulative}")
+            lines.append(f"{self.name}_sum{_format_labels(self.labels, key)} {_format_value(total[0])}")
+            lines.append(f"{self.name}_count{_format_labels(self.labels, key)} {cumulative}")
+        return lines
+
+
+class MetricsRegistry:
+    """メトリクスをまとめて Prometheus のテキスト形式で出力する"""
+
+    def __init__(self):
+        self._metrics: Dict[str, Metric] = {}
+
+    def register(self, metric: Metric) -> Metric:
+        self._metrics[metric.name] = metric
+        return metric
+
+    def render(self) -> str:
+        lines = []
+        for metric in self._metrics.values():
+            lines += metric.render()
+        return "\n".join(lines) + "\n"
+
+
+# Bot全体で共有するメトリクス
+registry = MetricsRegistry()
+app_command_duration = registry.register(Histogram(
+    "sakuraria_app_command_duration_seconds", "スラッシュコマンドの処理時間", ("command", "status")
+))
+rest_duration = registry.register(Histogram(
+    "discord_rest_request_duration_seconds", "REST APIの呼び出し時間（429による待機を含む）", ("method", "route", "status")
+))
+rest_ratelimited = registry.register(Counter(
+    "discord_rest_ratelimited_total", "REST APIが429を受けた回数", ("method", "route")
+))
+rest_retry_after = registry.register(Counter(
+    "discord_rest_retry_after_seconds_total", "REST APIが429で待機した時間の合計", ("method", "route")
+))
+event_duration = registry.register(Histogram(
+    "sakuraria_event_handler_duration_seconds", "イベントハンドラの処理時間", ("event",)
+))
+events_in_progress = registry.register(Gauge(
+    "sakuraria_event_handlers_in_progress", "処理中のイベントハンドラの数（イベントの滞留）", ("event",)
+))
+
+
+def metrics_enabled() -> bool:
+    return METRICS_SETTINGS["enabled"]
+
+
+def instrument_event(func):
+    """イベントハンドラの処理時間と処理中の数を記録する（無効な場合は関数をそのまま返す）"""
+    if not metrics_enabled():
+        return func
+    event = func.__name__
+
+    @functools.wraps(func)
+    async def wrapper(*args, **kwargs):
+        events_in_progress.inc(event)
+        started = time.perf_counter()
+        try:
+            return await func(*args, **kwargs)
+        finally:
+            event_duration.observe(time.perf_counter() - started, event)
+            events_in_progress.dec(event)
+    return wrapper
+
+
+class MetricsCommandTree(app_commands.CommandTree):
+    """スラッシュコマンドの処理時間を記録するコマンドツリー"""
+
+    async def interaction_check(self, interaction: discord.Interaction) -> bool:
+        interaction.extras["metrics_started"] = time.perf_counter()
+        return True
+
+    async def on_error(self, interaction: discord.Interaction, error: app_commands.AppCommandError) -> None:
+        status = "denied" if isinstance(error, app_commands.CheckFailure) else "error"
+        observe_command(interaction, interaction.command, status)
+        await super().on_error(interaction, error)
+
+
+def observe_command(interaction: discord.Interaction, command, status: str) -> None:
+    """スラッシュコマンドの処理時間を記録する"""
+    started = interaction.extras.get("metrics_started")
+    if started is None or command is None:
+        return
+    app_command_duration.observe(time.perf_counter() - started, command.qualified_name, status)
+
+
+# REST API の呼び出し中の経路（429のログを経路ごとに数えるため）
+_current_route: contextvars.ContextVar[Optional[Tuple[str, str]]] = contextvars.ContextVar("current_route", default=None)
+
+
+def instrument_http(http) -> Callable[[], None]:
+    """REST API の呼び出しを計測するように HTTPClient.request を包む（元に戻す関数を返す）"""
+    original = http.request
+
+    @functools.wraps(original)
+    async def request(route, **kwargs):
+        labels = (route.method, route.path)
+        token = _current_route.set(labels)
+        started = time.perf_counter()
+        status = "ok"
+        try:
+            return await original(route, **kwargs)
+        except discord.HTTPException as e:
+            status = str(e.status)
+            raise
+        except discord.RateLimited:
+            status = "429"
+            raise
+        except Exception:
+            status = "error"
+            raise
+        finally:
+            rest_duration.observe(time.perf_counter() - started, *labels, status)
+            _current_route.reset(token)
+
+    http.request = request
+
+    def restore():
+        http.request = original
+    return restore
+
+
+class RateLimitLogFilter(logging.Filter):
+    """discord.http の「429を受けた」ログから、経路ごとの429の回数と待機時間を数える"""
+
+    def filter(self, record: logging.LogRecord) -> bool:
+        if isinstance(record.msg, str) and record.msg.startswith("We are being rate limited.") and len(record.args or ()) >= 3:
+            labels = _current_route.get() or (str(record.args[0]), "unknown")
+            rest_ratelimited.inc(*labels)
+            # 待機時間が長すぎて待たずにエラーにした場合は待機時間に含めない
+            if "Retrying in" in record.msg:
+                rest_retry_after.inc(*labels, amount=float(record.args[2]))
+        return True
@@ -0,0 +1,123 @@
+import unicodedata
+from typing import Dict, List, Optional, Tuple
+
+import discord
+
+# 名前の比較で無視する文字（ゼロ幅接合子・異体字セレクタ・ゼロ幅スペース）
+# 絵文字の結合/分解の違い（👨‍🏫 と 👨🏫 など）を同じ名前として扱うため
+_IGNORED_CHARACTERS = dict.fromkeys(map(ord, "\u200d\ufe0f\ufe0e\u200b"), None)
+
+ROLE = "role"
+CATEGORY = "category"
+TEXT_CHANNEL = "text"
+
+
+def normalize_name(name: str) -> str:
+    """名前を比較用に正規化する（NFC正規化と、ゼロ幅文字・異体字セレクタの除去）"""
+    return unicodedata.normalize("NFC", name).translate(_IGNORED_CHARACTERS)
+
+
+def channel_kind(channel) -> Optional[str]:
+    """チャンネルの索引上の種類を返す（カテゴリ・テキストチャンネル以外は索引に含めない）"""
+    if isinstance(channel, discord.CategoryChannel):
+        return CATEGORY
+    if isinstance(channel, discord.TextChannel):
+        return TEXT_CHANNEL
+    return None
+
+
+class GuildNameIndex:
+    """サーバー1つ分の (種類, 正規化した名前) → ID の索引"""
+
+    def __init__(self, guild: discord.Guild):
+        self._ids: Dict[Tuple[str, str], List[int]] = {}
+        self._keys: Dict[int, Tuple[str, str]] = {}
+        # 同名のものがある場合は discord.utils.get と同じく一覧で先に来るものを優先する
+        for role in guild.roles:
+            self.add(ROLE, role.id, role.name)
+        for category in guild.categories:
+            self.add(CATEGORY, category.id, category.name)
+        for channel in guild.text_channels:
+            self.add(TEXT_CHANNEL, channel.id, channel.name)
+
+    def add(self, kind: str, object_id: int, name: str) -> None:
+        self.remove(object_id)
+        key = (kind, normalize_name(name))
+        self._ids.setdefault(key, []).append(object_id)
+        self._keys[object_id] = key
+
+    def remove(self, object_id: int) -> None:
+        key = self._keys.pop(object_id, None)
+        if key is None:
+            return
+        ids = self._ids.get(key, [])
+        if object_id in ids:
+            ids.remove(object_id)
+        if not ids:
+            self._ids.pop(key, None)
+
+    def ids(self, kind: str, name: str) -> List[int]:
+        return list(self._ids.get((kind, normalize_name(name)), ()))
+
+
+class NameIndex:
+    """ロール・カテゴリ・テキストチャンネルを名前から O(1) で引くための索引
+
+    サーバーごとに最初の検索時に作成し、以降はロール・チャンネルのイベントで差分だけを更新する。
+    """
+
+    def __init__(self):
+        self._guilds: Dict[int, GuildNameIndex] = {}
+
+    def _index(self, guild: discord.Guild) -> GuildNameIndex:
+        index = self._guilds.get(guild.id)
+        if index is None:
+            index = self._guilds[guild.id] = GuildNameIndex(guild)
+        return index
+
+    def _find(self, guild: discord.Guild, kind: str, name: str, getter):
+        index = self._index(guild)
+        key = normalize_name(name)
+        for object_id in index.ids(kind, name):
+            obj = getter(object_id)
+            if obj is not None and normalize_name(obj.name) == key:
+                return obj
+            # イベントを取りこぼして古くなった項目は捨てる
+            index.remove(object_id)
+        return None
+
+    def role(self, guild: discord.Guild, name: str) -> Optional[discord.Role]:
+        """ロールを名前で取得する"""
+        return self._find(guild, ROLE, name, guild.get_role)
+
+    def category(self, guild: discord.Guild, name: str) -> Optional[discord.CategoryChannel]:
+        """カテゴリを名前で取得する"""
+        return self._find(guild, CATEGORY, name, guild.get_channel)
+
+    def text_channel(self, guild: discord.Guild, name: str) -> Optional[discord.TextChannel]:
+        """テキストチャンネルを名前で取得する"""
+        return self._find(guild, TEXT_CHANNEL, name, guild.get_channel)
+
+    def role_saved(self, role: discord.Role) -> None:
+        """ロールの作成・名前の変更を反映する"""
+        if role.guild.id in self._guilds:
+            self._guilds[role.guild.id].add(ROLE, role.id, role.name)
+
+    def channel_saved(self, channel: discord.abc.GuildChannel) -> None:
+        """チャンネルの作成・名前の変更を反映する"""
+        kind = channel_kind(channel)
+        if kind and channel.guild.id in self._guilds:
+            self._guilds[channel.guild.id].add(kind, channel.id, channel.name)
+
+    def removed(self, obj) -> None:
+        """ロール・チャンネルの削除を反映する"""
+        if obj.guild.id in self._guilds:
+            self._guilds[obj.guild.id].remove(obj.id)
+
+    def invalidate(self, guild_id: int) -> None:
+        """サーバーの索引を捨てる（次の検索時に作り直す）"""
+        self._guilds.pop(guild_id, None)
+
+
+# Bot全体で共有する索引
+name_index = NameIndex()
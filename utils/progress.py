@@ -0,0 +1,59 @@
+import asyncio
+import time
+import traceback
+from typing import Optional
+
+import discord
+
+# Discordのメッセージ本文の上限
+MESSAGE_LENGTH_LIMIT = 2000
+
+
+class ProgressReporter:
+    """1つのメッセージを編集して進捗を表示する
+
+    編集は一定間隔以上あけて行い、その間に届いた更新は最新のものだけを反映する。
+    """
+
+    def __init__(self, message: Optional[discord.PartialMessage], interval: float = 3.0):
+        self.message = message
+        self.interval = interval
+        self._text: Optional[str] = None
+        self._last_edit = 0.0
+        self._task: Optional[asyncio.Task] = None
+
+    def update(self, text: str) -> None:
+        """表示する内容を更新する（実際の編集は間隔をあけて行う）"""
+        self._text = text
+        if self.message and self._task is None:
+            self._task = asyncio.create_task(self._edit_later())
+
+    async def finish(self, text: str) -> None:
+        """最終結果を直ちに表示する"""
+        if self._task:
+            self._task.cancel()
+            self._task = None
+        self._text = None
+        await self._edit(text)
+
+    async def _edit_later(self) -> None:
+        try:
+            wait = self._last_edit + self.interval - time.monotonic()
+            if wait > 0:
+                await asyncio.sleep(wait)
+        finally:
+            self._task = None
+        text, self._text = self._text, None
+        if text is not None:
+            await self._edit(text)
+
+    async def _edit(self, text: str) -> None:
+        if not self.message:
+            return
+        if len(text) > MESSAGE_LENGTH_LIMIT:
+            text = text[:MESSAGE_LENGTH_LIMIT - 1] + "…"
+        self._last_edit = time.monotonic()
+        try:
+            await self.message.edit(content=text)
+        except discord.HTTPException:
+            print(f"進捗メッセージの更新に失敗しました:\n{traceback.format_exc()}")
@@ -0,0 +1,136 @@
+import asyncio
+import time
+from typing import Any, Awaitable, Callable, Dict, Iterable, List, NamedTuple, Optional
+
+from config.settings import PROVISIONING_SETTINGS
+
+# 作成処理：依存先の作成結果（キー → 作成したオブジェクト）を受け取って実行する
+Factory = Callable[[Dict[str, Any]], Awaitable[Any]]
+
+
+class ProvisionResult(NamedTuple):
+    """1件分の実行結果"""
+    key: str
+    ok: bool
+    value: Any
+    error: Optional[BaseException]
+    elapsed: float
+
+
+class _Item(NamedTuple):
+    key: str
+    route: str
+    factory: Factory
+    depends_on: List[str]
+
+
+class DependencyFailedError(Exception):
+    """依存先の処理に失敗したため実行しなかったことを表す"""
+
+
+class ProvisioningScheduler:
+    """サーバーへの変更をまとめて受け取り、依存関係を守りながら並行に実行する
+
+    ロール作成・チャンネル作成などの API の経路（レート制限の単位）ごとに同時実行数を制限し、
+    経路の異なる処理は並行して進める。例えばロール → カテゴリ → チャンネルの順序は保ちつつ、
+    あるクラスのロールができた時点でそのクラスのチャンネル作成を始められる。
+    """
+
+    def __init__(self, route_limits: Optional[Dict[str, int]] = None, default_limit: int = 2):
+        self.route_limits = route_limits or {}
+        self.default_limit = default_limit
+        self._items: Dict[str, _Item] = {}
+
+    @classmethod
+    def from_settings(cls, settings: Dict = PROVISIONING_SETTINGS) -> "ProvisioningScheduler":
+        """設定ファイルの同時実行数で作成する"""
+        return cls(settings["route_concurrency"], settings["default_concurrency"])
+
+    def __contains__(self, key: str) -> bool:
+        return key in self._items
+
+    def __len__(self) -> int:
+        return len(self._items)
+
+    def registered(self, *keys: str) -> List[str]:
+        """指定したキーのうち登録済みのものを返す（依存先の指定に使う）"""
+        return [key for key in keys if key in self._items]
+
+    def add(self, key: str, route: str, factory: Factory, depends_on: Iterable[str] = ()) -> None:
+        """実行する処理を1件追加する"""
+        if key in self._items:
+            raise ValueError(f"同じキーの処理が既に登録されています: {key}")
+        self._items[key] = _Item(key, route, factory, list(depends_on))
+
+    async def run(self, on_result: Optional[Callable[[ProvisionResult], None]] = None) -> Dict[str, ProvisionResult]:
+        """登録された処理をすべて実行し、キーごとの結果を返す（on_result は1件終わるごとに呼ばれる）"""
+        self._validate()
+
+        semaphores = {
+            route: asyncio.Semaphore(self.route_limits.get(route, self.default_limit))
+            for route in {item.route for item in self._items.values()}
+        }
+        results: Dict[str, ProvisionResult] = {}
+        values: Dict[str, Any] = {}
+        tasks: Dict[str, asyncio.Task] = {}
+
+        async def execute(item: _Item) -> None:
+            # 依存先がすべて終わるまで待つ
+            for dependency in item.depends_on:
+                await asyncio.shield(tasks[dependency])
+            failed = [dependency for dependency in item.depends_on if not results[dependency].ok]
+            if failed:
+                error = DependencyFailedError(f"依存先の処理に失敗しました: {', '.join(failed)}")
+                results[item.key] = ProvisionResult(item.key, False, None, error, 0.0)
+            else:
+                async with semaphores[item.route]:
+                    started = time.perf_counter()
+                    try:
+                        value = await item.factory(values)
+                    except Exception as e:
+                        results[item.key] = ProvisionResult(item.key, False, None, e, time.perf_counter() - started)
+                    else:
+                        values[item.key] = value
+                        results[item.key] = ProvisionResult(item.key, True, value, None, time.perf_counter() - started)
+            if on_result:
+                on_result(results[item.key])
+
+        for item in self._items.values():
+            tasks[item.key] = asyncio.ensure_future(execute(item))
+        await asyncio.gather(*tasks.values())
+        return {key: results[key] for key in self._items}
+
+    def _validate(self) -> None:
+        # 未登録の依存先や循環があると永遠に待ち続けるため、実行前に確認する
+        state: Dict[str, int] = {}
+
+        def visit(key: str) -> None:
+            if state.get(key) == 2:
+                return
+            if state.get(key) == 1:
+                raise ValueError(f"処理の依存関係が循環しています: {key}")
+            state[key] = 1
+            for dependency in self._items[key].depends_on:
+                if dependency not in self._items:
+                    raise ValueError(f"{key} の依存先 {dependency} が登録されていません。")
+                visit(dependency)
+            state[key] = 2
+
+        for key in self._items:
+            visit(key)
+
+
+def summarize_failures(results: Dict[str, ProvisionResult]) -> List[str]:
+    """失敗した処理を「キー: 理由」の形で一覧にする（依存先の失敗による未実行は除く）"""
+    return [
+        f"{result.key}: {result.error}"
+        for result in results.values()
+        if not result.ok and not isinstance(result.error, DependencyFailedError)
+    ]
+
+
+def raise_for_failures(results: Dict[str, ProvisionResult]) -> None:
+    """失敗した処理があれば、まとめて1つの例外にして送出する"""
+    failures = summarize_failures(results)
+    if failures:
+        raise Exception("以下の作成に失敗しました：\n" + "\n".join(f"- {failure}" for failure in failures))
@@ -0,0 +1,215 @@
+from typing import Dict, List, NamedTuple, Optional, Set, Tuple
+
+import discord
+
+from utils.helpers import get_role_by_name
+from config.settings import UNASSIGNED_ROLE_NAME
+
+# 管理用ログチャンネルを探すときの目印
+LOG_CHANNEL_KEYWORD = "管理bot"
+
+
+class ReactionTarget(NamedTuple):
+    """リアクション1つに対応する付与先ロールの情報"""
+    guild_id: int
+    role_id: int
+    role_name: str
+    parent_role_id: Optional[int]
+
+
+class GuildTargets(NamedTuple):
+    """サーバー単位で共通の付与先（ロール未付与ロールとログチャンネル）"""
+    unassigned_role_id: Optional[int]
+    log_channel_id: Optional[int]
+
+
+def parent_role_name(role_name: str) -> Optional[str]:
+    """クラスロール名から親ロール（期生・期職員）の名前を求める"""
+    semester = role_name.split("-")[0]
+    if role_name.endswith("生徒"):
+        return f"{semester}期生"
+    if role_name.endswith("職員"):
+        return f"{semester}期職員"
+    return None
+
+
+def reaction_role_semester_kind(data: Dict) -> Tuple[Optional[int], Optional[str]]:
+    """リアクションロールの設定から学期と種類（staff / student）を求める
+
+    学期が記録されていない旧形式の設定はロール名（例: 3-1生徒）から求める。
+    """
+    if "semester" in data:
+        return data["semester"], data.get("kind")
+    for role_name in data["emojis"]:
+        semester = role_name.split("-")[0]
+        if semester.isdigit():
+            return int(semester), "student" if role_name.endswith("生徒") else "staff"
+    return None, None
+
+
+class ReactionRoleIndex:
+    """(メッセージID, 絵文字) から付与先ロールを O(1) で引くための索引
+
+    設定はロールIDのまま保持し、サーバーごとに最初のリアクションが届いたときに
+    そのサーバーの分だけ索引を作る。以降は登録時やロール・チャンネルの変更時にだけ組み直し、
+    リアクションのたびにロール一覧やチャンネル一覧を走査しないようにする。
+    """
+
+    def __init__(self, registry=None):
+        # 期の構成の記録（クラスロールの親ロールをIDで引くのに使う）
+        self.registry = registry
+        self._targets: Dict[Tuple[int, str], ReactionTarget] = {}
+        self._sources: Dict[int, Dict] = {}
+        self._message_keys: Dict[int, List[Tuple[int, str]]] = {}
+        self._guild_messages: Dict[Optional[int], Set[int]] = {}
+        # (サーバーID, 学期) とチャンネルIDからメッセージを引くための索引
+        self._semester_messages: Dict[Tuple[Optional[int], Optional[int]], Set[int]] = {}
+        self._channel_messages: Dict[int, Set[int]] = {}
+        self._guilds: Dict[int, GuildTargets] = {}
+
+    def resolve(self, message_id: int, emoji: str) -> Optional[ReactionTarget]:
+        """メッセージIDと絵文字に対応する付与先を返す"""
+        return self._targets.get((message_id, emoji))
+
+    def guild_targets(self, guild_id: int) -> GuildTargets:
+        """サーバー共通の付与先を返す"""
+        return self._guilds.get(guild_id, GuildTargets(None, None))
+
+    def is_built(self, guild_id: int) -> bool:
+        """サーバーの索引が作成済みかどうか"""
+        return guild_id in self._guilds
+
+    def __contains__(self, message_id: int) -> bool:
+        return message_id in self._sources
+
+    def semester_messages(self, guild_id: int, semester: int) -> List[int]:
+        """サーバー・学期のリアクションロールメッセージのIDを返す"""
+        return list(self._semester_messages.get((guild_id, semester), ()))
+
+    def channel_messages(self, channel_id: int) -> List[int]:
+        """チャンネルのリアクションロールメッセージのIDを返す（チャンネルIDが記録されているものだけ）"""
+        return list(self._channel_messages.get(channel_id, ()))
+
+    def load(self, reaction_roles: Dict[int, Dict]) -> None:
+        """保存されている設定を読み込む（索引はサーバーごとに必要になったときに作る）"""
+        self._targets.clear()
+        self._sources.clear()
+        self._message_keys.clear()
+        self._guild_messages.clear()
+        self._semester_messages.clear()
+        self._channel_messages.clear()
+        self._guilds.clear()
+        for message_id, data in reaction_roles.items():
+            self._add_source(message_id, data)
+
+    def build_guild(self, guild: discord.Guild) -> List[int]:
+        """サーバー1つ分の索引を作成する
+
+        サーバーIDが記録されていない旧形式の設定のうち、このサーバーのロールを指すものは
+        このサーバーのものとして扱い、そのメッセージIDを返す。
+        """
+        adopted = []
+        for message_id in list(self._guild_messages.get(None, ())):
+            data = self._sources[message_id]
+            if any(guild.get_role(role_id) for role_id in data["roles"]):
+                self._remove_source(message_id)
+                data["guild_id"] = guild.id
+                self._add_source(message_id, data)
+                adopted.append(message_id)
+        for message_id in self._guild_messages.get(guild.id, ()):
+            self._index_message(guild, message_id)
+        self._guilds[guild.id] = self._build_guild_targets(guild)
+        return adopted
+
+    def register(self, guild: discord.Guild, message_id: int, data: Dict) -> None:
+        """メッセージ1件分の設定を登録する"""
+        self.unregister(message_id)
+        self._add_source(message_id, data)
+        if self.is_built(guild.id):
+            self._index_message(guild, message_id)
+
+    def unregister(self, message_id: int) -> None:
+        """メッセージ1件分の設定を削除する"""
+        self._remove_source(message_id)
+        self._drop_targets(message_id)
+
+    def refresh_roles(self, guild: discord.Guild) -> None:
+        """ロールの作成・更新・削除に合わせて該当サーバーの索引を組み直す"""
+        if not self.is_built(guild.id):
+            return
+        for message_id in self._guild_messages.get(guild.id, ()):
+            self._index_message(guild, message_id)
+        self._guilds[guild.id] = self._build_guild_targets(guild)
+
+    def refresh_channels(self, guild: discord.Guild) -> None:
+        """チャンネルの作成・更新・削除に合わせてログチャンネルを引き直す"""
+        if self.is_built(guild.id):
+            self._guilds[guild.id] = self._build_guild_targets(guild)
+
+    def _add_source(self, message_id: int, data: Dict) -> None:
+        self._sources[message_id] = data
+        guild_id = data.get("guild_id")
+        self._guild_messages.setdefault(guild_id, set()).add(message_id)
+        semester, _ = reaction_role_semester_kind(data)
+        self._semester_messages.setdefault((guild_id, semester), set()).add(message_id)
+        if data.get("channel_id"):
+            self._channel_messages.setdefault(data["channel_id"], set()).add(message_id)
+
+    def _remove_source(self, message_id: int) -> None:
+        data = self._sources.pop(message_id, None)
+        if data is None:
+            return
+        guild_id = data.get("guild_id")
+        semester, _ = reaction_role_semester_kind(data)
+        for index, key in (
+            (self._guild_messages, guild_id),
+            (self._semester_messages, (guild_id, semester)),
+            (self._channel_messages, data.get("channel_id"))
+        ):
+            messages = index.get(key)
+            if messages is not None:
+                messages.discard(message_id)
+                if not messages:
+                    del index[key]
+
+    def _drop_targets(self, message_id: int) -> None:
+        for key in self._message_keys.pop(message_id, []):
+            self._targets.pop(key, None)
+
+    def _index_message(self, guild: discord.Guild, message_id: int) -> None:
+        self._drop_targets(message_id)
+        data = self._sources[message_id]
+        keys = self._message_keys.setdefault(message_id, [])
+        roles_by_name = {}
+        for role_id in data["roles"]:
+            role = guild.get_role(role_id)
+            if role:
+                roles_by_name[role.name] = role
+        for role_name, emoji in data["emojis"].items():
+            role = roles_by_name.get(role_name)
+            if not role:
+                continue
+            self._targets[(message_id, emoji)] = ReactionTarget(
+                guild_id=guild.id,
+                role_id=role.id,
+                role_name=role.name,
+                parent_role_id=self._parent_role_id(guild, role)
+            )
+            keys.append((message_id, emoji))
+
+    def _parent_role_id(self, guild: discord.Guild, role: discord.Role) -> Optional[int]:
+        # 記録されている期のロールならIDで引き、記録がなければロール名から求める
+        parent_role_id = self.registry.parent_role_id(role.id) if self.registry else None
+        if parent_role_id and guild.get_role(parent_role_id):
+            return parent_role_id
+        parent_name = parent_role_name(role.name)
+        parent_role = get_role_by_name(guild, parent_name) if parent_name else None
+        return parent_role.id if parent_role else None
+
+    def _build_guild_targets(self, guild: discord.Guild) -> GuildTargets:
+        unassigned_role = get_role_by_name(guild, UNASSIGNED_ROLE_NAME)
+        log_channel = next((channel for channel in guild.text_channels if LOG_CHANNEL_KEYWORD in channel.name), None)
+        return GuildTargets(
+            unassigned_role_id=unassigned_role.id if unassigned_role else None,
+            log_channel_id=log_channel.id if log_channel else None
+        )
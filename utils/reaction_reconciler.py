@@ -0,0 +1,267 @@
+import asyncio
+import time
+import traceback
+from typing import Dict, Optional, Set, Tuple
+
+import discord
+
+from config.settings import REACTION_RECONCILE_SETTINGS
+from utils.reaction_index import reaction_role_semester_kind
+from utils.runtime_profile import ensure_members_loaded
+
+# 進捗（メッセージごとの最終確認時刻と、そのときリアクションしていたユーザー）を保存するキー
+CHECKPOINT_KEY = "reaction_reconcile"
+
+# ロールID → メッセージID → リアクションしているユーザーID
+KnownReactors = Dict[int, Dict[int, Set[int]]]
+
+
+def _checkpoint_entry(value) -> Dict:
+    # 確認時刻だけを保存していた形式も読めるようにする
+    if isinstance(value, (int, float)):
+        return {"checked_at": float(value), "reactors": {}}
+    return value
+
+
+class ReactionReconciler:
+    """Botが停止・再接続している間に付け外しされたリアクションを、接続後にロールへ反映する
+
+    登録済みのメッセージごとにリアクションしたユーザーをページ単位で取得し、
+    ロールを持っているメンバーの集合と比較して、差分だけをロール更新のバッファに予約する。
+    ロールを外すのは、前回の確認時にはリアクションしていて、同じロールのどのメッセージにもリアクションしていない
+    メンバーだけ（remove_unreacted が有効な場合）。手動やコマンドで付けたロールは外さない。
+    処理はバックグラウンドで1メッセージずつ進め、メッセージごとに確認した時刻を保存する。
+    次の実行では長く確認していないメッセージから処理するため、途中で再起動しても後ろのメッセージが取り残されない。
+    """
+
+    def __init__(self, cog, settings: Dict = REACTION_RECONCILE_SETTINGS):
+        self.cog = cog
+        self.bot = cog.bot
+        self.start_delay = settings["start_delay"]
+        self.message_interval = settings["message_interval"]
+        self.remove_unreacted = settings["remove_unreacted"]
+        self._task: Optional[asyncio.Task] = None
+        # 実行中に届いたリアクションのイベント（メッセージID → ユーザーID）。取得した一覧より新しいため反映の対象から外す
+        self._touched: Optional[Dict[int, Set[int]]] = None
+
+    def start(self) -> None:
+        """反映を開始する（実行中なら最初からやり直す）"""
+        if self._task and not self._task.done():
+            self._task.cancel()
+        touched: Dict[int, Set[int]] = {}
+        self._touched = touched
+        self._task = asyncio.create_task(self._run(touched))
+
+    def note_event(self, message_id: int, user_id: int) -> None:
+        """リアクションのイベントを受け取ったことを記録する"""
+        if self._touched is not None:
+            self._touched.setdefault(message_id, set()).add(user_id)
+
+    async def close(self) -> None:
+        """実行中の反映を止める（確認済みのメッセージは保存されている）"""
+        if self._task:
+            self._task.cancel()
+            await asyncio.gather(self._task, return_exceptions=True)
+            self._task = None
+
+    async def _run(self, touched: Dict[int, Set[int]]) -> None:
+        try:
+            # 起動直後のコマンドの同期やジョブの再開と競合しないよう少し待つ
+            await asyncio.sleep(self.start_delay)
+            await self.reconcile_all(touched)
+        except asyncio.CancelledError:
+            raise
+        except Exception:
+            print(f"リアクションの取りこぼしの反映に失敗しました:\n{traceback.format_exc()}")
+        finally:
+            if self._touched is touched:
+                self._touched = None
+
+    async def reconcile_all(self, touched: Dict[int, Set[int]]) -> None:
+        """登録済みのメッセージをすべて確認する
+
+        付与はメッセージごとに予約し、外す処理は全メッセージのリアクションを取得し終えてからまとめて予約する
+        （同じロールを付ける後ろのメッセージにリアクションしているユーザーから外さないため）。
+        """
+        store = self.bot.state_store
+        # サーバーIDが未記録の旧形式の設定もサーバーに割り当てておく
+        for guild in self.bot.guilds:
+            self.cog.get_guild_for_event(guild.id)
+
+        saved = await store.load_meta(CHECKPOINT_KEY) or {}
+        checkpoint = {key: _checkpoint_entry(value) for key, value in saved.items() if int(key) in self.cog.reaction_roles}
+        # 同じロールを付ける別のメッセージでのリアクションを知るため、前回の確認結果をロールごとにまとめる（確認したものから置き換える）
+        known: KnownReactors = {}
+        for key, entry in checkpoint.items():
+            for role_id, user_ids in entry["reactors"].items():
+                known.setdefault(int(role_id), {})[int(key)] = set(user_ids)
+        message_ids = sorted(
+            self.cog.reaction_roles,
+            key=lambda message_id: checkpoint.get(str(message_id), {}).get("checked_at", 0.0)
+        )
+
+        started = time.perf_counter()
+        checked = added = removed = 0
+        removals = []
+        for message_id in message_ids:
+            data = self.cog.reaction_roles.get(message_id)
+            # 選択メニューのメッセージはリアクションを使わないため対象外
+            if data is None or data.get("mode") == "select":
+                continue
+            result = await self.reconcile_message(message_id, data, touched.get(message_id, set()), known)
+            if result is not None:
+                reactors, message_added, candidates = result
+                checked += 1
+                added += message_added
+                if any(candidates.values()):
+                    removals.append((message_id, data, reactors, candidates))
+                # 外す候補は反映するまで前回リアクションしていたものとして残す（途中で止まっても次回に外せる）
+                checkpoint[str(message_id)] = {
+                    "checked_at": time.time(),
+                    "reactors": {
+                        str(role_id): sorted(user_ids | candidates.get(role_id, set()))
+                        for role_id, user_ids in reactors.items()
+                    }
+                }
+                await store.save_meta(CHECKPOINT_KEY, checkpoint)
+            await asyncio.sleep(self.message_interval)
+
+        if removals:
+            skip = set().union(*touched.values())
+            for message_id, data, reactors, candidates in removals:
+                removed += self.remove_unreacted_roles(message_id, data, candidates, known, skip)
+                checkpoint[str(message_id)]["reactors"] = {str(role_id): sorted(user_ids) for role_id, user_ids in reactors.items()}
+            await store.save_meta(CHECKPOINT_KEY, checkpoint)
+
+        if added or removed:
+            print(
+                f"リアクションの取りこぼしを反映しました: {checked}件のメッセージ、"
+                f"付与{added}件・削除{removed}件（{time.perf_counter() - started:.1f}秒）"
+            )
+
+    async def reconcile_message(
+        self, message_id: int, data: Dict, skip: Set[int], known: KnownReactors
+    ) -> Optional[Tuple[Dict[int, Set[int]], int, Dict[int, Set[int]]]]:
+        """メッセージ1件のリアクションとロールを比べて付与を予約する
+
+        (ロールごとのリアクションしたユーザー, 付与数, ロールごとの外す候補) を返す（確認できなければ None）。
+        外す候補は、前回の確認時にはリアクションしていて今はしていない、ロールを持っているユーザー。
+        known には確認したメッセージのリアクションを書き込む。
+        """
+        guild = self.bot.get_guild(data["guild_id"]) if data.get("guild_id") else None
+        channel = guild.get_channel(data["channel_id"]) if guild and data.get("channel_id") else None
+        if channel is None:
+            return None
+        try:
+            message = await channel.fetch_message(message_id)
+        except discord.NotFound:
+            await self.cog.forget_reaction_role_messages([message_id])
+            return None
+        except discord.Forbidden:
+            print(f"リアクションロールメッセージを取得する権限がありません: {message_id}")
+            return None
+
+        targets = self._targets(message_id, data, guild)
+        if not targets:
+            return {}, 0, {}
+
+        # リアクションしたユーザーを絵文字ごとに取得する（100人ずつのページ単位）
+        reactors: Dict[int, Set[int]] = {target.role_id: set() for target in targets.values()}
+        for reaction in message.reactions:
+            target = targets.get(str(reaction.emoji))
+            if target is None or reaction.count - int(reaction.me) <= 0:
+                continue
+            async for user in reaction.users(limit=None):
+                reactors[target.role_id].add(user.id)
+        for users in reactors.values():
+            users.discard(self.bot.user.id)
+
+        # 前回このメッセージを確認したときにリアクションしていたユーザー
+        previous = {role_id: messages[message_id] for role_id, messages in known.items() if message_id in messages}
+        for role_id, user_ids in reactors.items():
+            known.setdefault(role_id, {})[message_id] = user_ids
+
+        # ロールを持っているメンバーと比べる（メンバーごとに API を呼ばず、集合の差だけを求める）
+        await ensure_members_loaded(guild)
+        holders = {role_id: {member.id for member in guild.get_role(role_id).members} for role_id in reactors}
+        to_add = {role_id: reactors[role_id] - holders[role_id] - skip for role_id in reactors}
+        candidates = {}
+        if self.remove_unreacted:
+            # リアクションしたことのないメンバーのロール（手動やコマンドで付けたもの）は対象にしない
+            candidates = {
+                role_id: (previous.get(role_id, set()) & holders[role_id]) - reactors[role_id] - skip
+                for role_id in reactors
+            }
+
+        buffer = self.cog.role_buffer
+        unassigned_role_id = self.cog.index.guild_targets(guild.id).unassigned_role_id
+        parents = {target.role_id: target.parent_role_id for target in targets.values()}
+        added = 0
+        for role_id, user_ids in to_add.items():
+            for user_id in user_ids:
+                member = guild.get_member(user_id)
+                if member is None:
+                    continue
+                buffer.add(member, role_id, parents[role_id])
+                buffer.remove(member, unassigned_role_id)
+                added += 1
+
+        if added:
+            self._log(guild, data, f"付与{added}件")
+        return reactors, added, candidates
+
+    def remove_unreacted_roles(self, message_id: int, data: Dict, candidates: Dict[int, Set[int]], known: KnownReactors, skip: Set[int]) -> int:
+        """外す候補のうち、同じロールのどのメッセージにもリアクションしていないユーザーからロールを外す。外した数を返す"""
+        guild = self.bot.get_guild(data["guild_id"])
+        targets = self._targets(message_id, data, guild) if guild else {}
+        if not targets:
+            return 0
+        buffer = self.cog.role_buffer
+        registry = self.bot.season_registry
+        unassigned_role_id = self.cog.index.guild_targets(guild.id).unassigned_role_id
+        parents = {target.role_id: target.parent_role_id for target in targets.values()}
+        removed = 0
+        for role_id, user_ids in candidates.items():
+            if role_id not in parents:
+                continue
+            for user_id in user_ids - self._reacting(known, role_id) - skip:
+                member = guild.get_member(user_id)
+                if member is None or not member.get_role(role_id):
+                    continue
+                # 別のロールにリアクションしていれば（他のメッセージも含む）、同じ期のロールは残しロール未付与にはしない
+                remaining = [
+                    other for other in known
+                    if other != role_id and guild.get_role(other) and user_id in self._reacting(known, other)
+                ]
+                buffer.remove(member, role_id)
+                if parents[role_id] not in {parents.get(other) or registry.parent_role_id(other) for other in remaining}:
+                    buffer.remove(member, parents[role_id])
+                if not remaining:
+                    buffer.add(member, unassigned_role_id)
+                removed += 1
+
+        if removed:
+            self._log(guild, data, f"削除{removed}件")
+        return removed
+
+    def _targets(self, message_id: int, data: Dict, guild: discord.Guild) -> Dict:
+        # 絵文字ごとの付与先（ロールが削除されているものは除く）
+        targets = {}
+        for emoji in data["emojis"].values():
+            target = self.cog.index.resolve(message_id, emoji)
+            if target and guild.get_role(target.role_id):
+                targets[emoji] = target
+        return targets
+
+    def _log(self, guild: discord.Guild, data: Dict, detail: str) -> None:
+        semester, kind = reaction_role_semester_kind(data)
+        label = "生徒" if kind == "student" else "職員"
+        self.cog.audit_feed.log(
+            self.cog.index.guild_targets(guild.id).log_channel_id,
+            f"停止中に付け外しされた{semester}期の{label}のリアクションを反映しました（{detail}）。"
+        )
+
+    @staticmethod
+    def _reacting(known: KnownReactors, role_id: int) -> Set[int]:
+        """いずれかのメッセージでそのロールにリアクションしているユーザー"""
+        return set().union(*known.get(role_id, {}).values())
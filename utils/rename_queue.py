@@ -0,0 +1,165 @@
+import asyncio
+import time
+import traceback
+from typing import Dict, Iterable, List, Optional, Tuple
+
+import discord
+
+from config.settings import RENAME_QUEUE_SETTINGS
+
+# キューを保存するキー
+STORE_KEY = "rename_queue"
+
+
+def _retry_after(error: discord.HTTPException) -> float:
+    retry_after = error.response.headers.get("Retry-After") if error.response is not None else None
+    try:
+        return float(retry_after) if retry_after is not None else 0.0
+    except ValueError:
+        return 0.0
+
+
+class RenameQueue:
+    """チャンネル名の変更を保存しておき、チャンネルごとのレート制限の範囲で順に反映するキュー
+
+    チャンネル名の変更はチャンネルごとに10分間に2回までに制限されているため、その場で待ちながら変更すると
+    コマンドが途中で止まってしまう。変更はストアに保存してバックグラウンドで反映し、枠を使い切った
+    チャンネルは枠が空く時刻まで後回しにする。再起動しても保存されている続きから反映する。
+    """
+
+    def __init__(self, bot, store, settings: Dict = RENAME_QUEUE_SETTINGS):
+        self.bot = bot
+        self.store = store
+        self.per_channel_limit = settings["per_channel_limit"]
+        self.window = settings["window_seconds"]
+        self.concurrency = max(1, settings["concurrency"])
+        self.max_attempts = settings["max_attempts"]
+        # チャンネルID → 変更の予約（同じチャンネルへの予約は新しいもので置き換える）
+        self._entries: Dict[str, Dict] = {}
+        # チャンネルID → このBotが名前を変更した時刻（レート制限の枠の計算に使う）
+        self._history: Dict[str, List[float]] = {}
+        self._loaded = False
+        self._wake = asyncio.Event()
+        self._task: Optional[asyncio.Task] = None
+
+    async def load(self) -> None:
+        """保存されている予約を読み込む"""
+        if self._loaded:
+            return
+        saved = await self.store.load_meta(STORE_KEY) or {}
+        self._entries.update(saved.get("entries", {}))
+        self._history.update(saved.get("history", {}))
+        self._loaded = True
+
+    async def start(self) -> None:
+        """保存されている予約を読み込んで反映を始める（実行中なら何もしない）"""
+        await self.load()
+        if self._task is None or self._task.done():
+            self._task = asyncio.create_task(self._run())
+            if self._entries:
+                print(f"チャンネル名の変更の予約を再開しました: {len(self._entries)}件")
+
+    async def close(self) -> None:
+        """反映を止める（残っている予約は保存されている）"""
+        if self._task:
+            self._task.cancel()
+            await asyncio.gather(self._task, return_exceptions=True)
+            self._task = None
+
+    async def enqueue(self, guild_id: int, renames: Iterable[Tuple[int, str]]) -> int:
+        """チャンネル名の変更を予約する（(チャンネルID, 新しい名前) の一覧）。予約した件数を返す"""
+        await self.load()
+        count = 0
+        for channel_id, name in renames:
+            self._entries[str(channel_id)] = {
+                "guild_id": guild_id,
+                "channel_id": channel_id,
+                "name": name,
+                "not_before": 0.0,
+                "attempts": 0
+            }
+            count += 1
+        if count:
+            await self._save()
+            self._wake.set()
+        return count
+
+    def pending(self, guild_id: Optional[int] = None) -> int:
+        """反映を待っている変更の数"""
+        return sum(1 for entry in self._entries.values() if guild_id is None or entry["guild_id"] == guild_id)
+
+    async def _run(self) -> None:
+        semaphore = asyncio.Semaphore(self.concurrency)
+
+        async def rename(entry: Dict) -> None:
+            async with semaphore:
+                await self._rename(entry)
+
+        while True:
+            self._wake.clear()
+            now = time.time()
+            due = [entry for entry in self._entries.values() if entry["not_before"] <= now]
+            if due:
+                # 枠の空いているチャンネルはそれぞれ別の枠なので並行に変更する
+                await asyncio.gather(*(rename(entry) for entry in due))
+                await self._save()
+                continue
+            # 次に枠が空く時刻か、新しい予約が届くまで待つ
+            timeout = min((entry["not_before"] - now for entry in self._entries.values()), default=None)
+            try:
+                await asyncio.wait_for(self._wake.wait(), timeout)
+            except asyncio.TimeoutError:
+                pass
+
+    async def _rename(self, entry: Dict) -> None:
+        key = str(entry["channel_id"])
+        channel = self.bot.get_channel(entry["channel_id"])
+        if channel is None or channel.name == entry["name"]:
+            # 削除されたチャンネルや、既に変更済みのチャンネルは何もしない
+            self._finish(key, entry)
+            return
+
+        now = time.time()
+        recent = [at for at in self._history.get(key, []) if now - at < self.window]
+        self._history[key] = recent
+        if len(recent) >= self.per_channel_limit:
+            entry["not_before"] = recent[0] + self.window
+            return
+
+        try:
+            await channel.edit(name=entry["name"], reason="チャンネル名の変更の予約")
+        except discord.RateLimited as e:
+            entry["not_before"] = time.time() + e.retry_after
+            return
+        except discord.HTTPException as e:
+            entry["attempts"] += 1
+            if e.status == 429:
+                entry["not_before"] = time.time() + max(_retry_after(e), 1.0)
+                return
+            if e.status >= 500 and entry["attempts"] < self.max_attempts:
+                entry["not_before"] = time.time() + 2 ** entry["attempts"]
+                return
+            print(f"チャンネル名を変更できませんでした（{channel.name} → {entry['name']}）: {e}")
+            self._finish(key, entry)
+            return
+        except Exception:
+            print(f"チャンネル名の変更に失敗しました:\n{traceback.format_exc()}")
+            self._finish(key, entry)
+            return
+
+        self._history.setdefault(key, []).append(time.time())
+        self._finish(key, entry)
+
+    def _finish(self, key: str, entry: Dict) -> None:
+        # 処理中に同じチャンネルへの新しい予約が入っていれば残す
+        if self._entries.get(key) is entry:
+            del self._entries[key]
+
+    async def _save(self) -> None:
+        now = time.time()
+        history = {
+            key: times for key, times in ((key, [at for at in times if now - at < self.window]) for key, times in self._history.items())
+            if times
+        }
+        self._history = history
+        await self.store.save_meta(STORE_KEY, {"entries": self._entries, "history": history})
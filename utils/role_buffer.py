@@ -0,0 +1,202 @@
+import asyncio
+import time
+import traceback
+from typing import Dict, FrozenSet, Iterable, List, Optional, Set, Tuple
+
+import discord
+
+from utils.runtime_profile import get_or_fetch_member
+
+MemberKey = Tuple[int, int]
+
+
+class MemberRoleBuffer:
+    """メンバーごとのロールの追加・削除をまとめて1回の member.edit で反映するバッファ
+
+    短い待機時間の間に届いた変更は最後の指定だけが残るため、
+    リアクションを付けてすぐ外したような場合は API を呼ばずに済む。
+
+    反映はサーバーごとに割り当てたシャードの決まった数のワーカーが行う。
+    待機中のメンバーはシャードのキューに1回だけ並び、同じメンバーを2つのワーカーが同時に処理することはない。
+    そのためイベントが集中しても、キューの長さはメンバー数まで、API の同時呼び出しはワーカー数までに収まる。
+    """
+
+    def __init__(self, delay: float = 0.5, confirm_ttl: float = 5.0, shard_count: int = 4, workers_per_shard: int = 2):
+        self.delay = delay
+        # 自分で反映したロール構成をゲートウェイの更新が届くまで優先して使う時間
+        self.confirm_ttl = confirm_ttl
+        self.shard_count = max(1, shard_count)
+        self.workers_per_shard = max(1, workers_per_shard)
+        self._pending: Dict[MemberKey, Dict[int, bool]] = {}
+        self._members: Dict[MemberKey, discord.Member] = {}
+        self._guilds: Dict[int, discord.Guild] = {}
+        # 待機時間の経過待ち（タスクではなくタイマーで待つ）
+        self._timers: Dict[MemberKey, asyncio.TimerHandle] = {}
+        self._queued: Set[MemberKey] = set()
+        self._active: Set[MemberKey] = set()
+        self._rerun: Set[MemberKey] = set()
+        self._shards: List[asyncio.Queue] = []
+        self._workers: List[asyncio.Task] = []
+        # 反映したがゲートウェイの更新がまだ届いていない変更（追加したロール, 削除したロール, 反映した時刻）
+        self._confirmed: Dict[MemberKey, Tuple[FrozenSet[int], FrozenSet[int], float]] = {}
+
+    def add(self, member: discord.Member, *role_ids: Optional[int]) -> None:
+        """ロールの追加を予約する"""
+        self._queue(member.guild, member.id, member, role_ids, True)
+
+    def remove(self, member: discord.Member, *role_ids: Optional[int]) -> None:
+        """ロールの削除を予約する"""
+        self._queue(member.guild, member.id, member, role_ids, False)
+
+    def add_by_id(self, guild: discord.Guild, user_id: int, *role_ids: Optional[int]) -> None:
+        """メンバーがキャッシュにない場合のロールの追加の予約（反映時にメンバーを取得する）"""
+        self._queue(guild, user_id, guild.get_member(user_id), role_ids, True)
+
+    def remove_by_id(self, guild: discord.Guild, user_id: int, *role_ids: Optional[int]) -> None:
+        """メンバーがキャッシュにない場合のロールの削除の予約（反映時にメンバーを取得する）"""
+        self._queue(guild, user_id, guild.get_member(user_id), role_ids, False)
+
+    def note_member_update(self, member: discord.Member) -> None:
+        """メンバーの更新イベントを受け取る（反映した変更がキャッシュに届いていれば、以後はキャッシュを使う）"""
+        key = (member.guild.id, member.id)
+        confirmed = self._confirmed.get(key)
+        if confirmed is None:
+            return
+        added, removed, _ = confirmed
+        role_ids = {role.id for role in member.roles}
+        if added <= role_ids and not (removed & role_ids):
+            del self._confirmed[key]
+
+    @property
+    def pending_count(self) -> int:
+        """反映を待っているメンバーの数"""
+        return len(self._pending)
+
+    async def flush_all(self) -> None:
+        """予約されている変更を、待機時間を待たずにすべて反映する（同時実行数はワーカー数のまま）"""
+        while self._pending or self._active:
+            for key, timer in list(self._timers.items()):
+                timer.cancel()
+                self._ready(key)
+            await asyncio.gather(*(shard.join() for shard in self._shards))
+            if self._pending or self._active:
+                # 処理中に届いた変更の分を続けて反映する
+                await asyncio.sleep(0.01)
+
+    async def close(self) -> None:
+        """予約されている変更を反映してワーカーを止める"""
+        await self.flush_all()
+        for worker in self._workers:
+            worker.cancel()
+        await asyncio.gather(*self._workers, return_exceptions=True)
+        self._workers.clear()
+        self._shards.clear()
+
+    def _queue(self, guild: discord.Guild, user_id: int, member: Optional[discord.Member], role_ids: Iterable[Optional[int]], add: bool) -> None:
+        # イベントの順序を保つため、変更はここで（await の前に）記録する
+        key = (guild.id, user_id)
+        changes = self._pending.setdefault(key, {})
+        for role_id in role_ids:
+            if role_id:
+                # 同じロールへの以前の指定は新しい指定で置き換わる
+                changes.pop(role_id, None)
+                changes[role_id] = add
+        if member is not None:
+            self._members[key] = member
+        self._guilds[guild.id] = guild
+        if key not in self._timers and key not in self._queued:
+            self._timers[key] = asyncio.get_running_loop().call_later(self.delay, self._ready, key)
+
+    def _shard(self, guild_id: int) -> asyncio.Queue:
+        if not self._workers:
+            self._shards = [asyncio.Queue() for _ in range(self.shard_count)]
+            self._workers = [
+                asyncio.create_task(self._worker(shard))
+                for shard in self._shards
+                for _ in range(self.workers_per_shard)
+            ]
+        return self._shards[guild_id % self.shard_count]
+
+    def _ready(self, key: MemberKey) -> None:
+        self._timers.pop(key, None)
+        if key in self._queued:
+            return
+        self._queued.add(key)
+        self._shard(key[0]).put_nowait(key)
+
+    async def _worker(self, shard: asyncio.Queue) -> None:
+        while True:
+            key = await shard.get()
+            try:
+                self._queued.discard(key)
+                if key in self._active:
+                    # 同じメンバーを処理中のワーカーが終わったら、もう一度並べる
+                    self._rerun.add(key)
+                    continue
+                await self._process(key)
+            finally:
+                shard.task_done()
+
+    async def _process(self, key: MemberKey) -> None:
+        self._active.add(key)
+        try:
+            await self._flush(key)
+        except Exception:
+            print(f"ロールの一括更新に失敗しました:\n{traceback.format_exc()}")
+        finally:
+            self._active.discard(key)
+            if key in self._rerun or (key in self._pending and key not in self._timers and key not in self._queued):
+                self._rerun.discard(key)
+                if key in self._pending:
+                    self._ready(key)
+
+    async def _flush(self, key: MemberKey) -> None:
+        changes = self._pending.pop(key, None)
+        member = self._members.pop(key, None)
+        if not changes:
+            return
+        if member is None:
+            # キャッシュにないメンバー（リアクションの削除など）はここで取得する
+            guild = self._guilds.get(key[0])
+            member = await get_or_fetch_member(guild, key[1]) if guild else None
+            if member is None:
+                return
+
+        current = self._current_roles(key, member)
+        desired = set(current)
+        for role_id, add in changes.items():
+            if add:
+                desired.add(role_id)
+            else:
+                desired.discard(role_id)
+
+        # 追加と削除が打ち消し合った場合は何もしない
+        if desired == current:
+            return
+
+        await member.edit(roles=[discord.Object(id=role_id) for role_id in desired])
+        # キャッシュとの差分だけを覚えておく（他の管理者・Botによる変更はキャッシュから引き継ぐため、上書きしない）
+        cached = self._cached_roles(member)
+        self._confirmed[key] = (frozenset(desired - cached), frozenset(cached - desired), time.monotonic())
+        self._prune(key[0])
+
+    def _cached_roles(self, member: discord.Member) -> set:
+        return {role.id for role in member.roles if not role.is_default()}
+
+    def _current_roles(self, key: MemberKey, member: discord.Member) -> set:
+        current = self._cached_roles(member)
+        confirmed = self._confirmed.get(key)
+        if confirmed:
+            added, removed, confirmed_at = confirmed
+            if time.monotonic() - confirmed_at < self.confirm_ttl:
+                return (current | added) - removed
+            del self._confirmed[key]
+        return current
+
+    def _prune(self, guild_id: int) -> None:
+        # ゲートウェイの更新が届かないまま期限が切れた記録と、待機中の変更がなくなったサーバーを消す
+        now = time.monotonic()
+        for key in [key for key, confirmed in self._confirmed.items() if now - confirmed[2] >= self.confirm_ttl]:
+            del self._confirmed[key]
+        if not any(key[0] == guild_id for key in self._pending):
+            self._guilds.pop(guild_id, None)
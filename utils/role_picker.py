@@ -0,0 +1,56 @@
+from typing import Dict, List
+
+import discord
+
+# 選択メニュー1つあたりの選択肢の上限と、1メッセージに置ける選択メニューの数（Discordの制限）
+OPTIONS_PER_SELECT = 25
+MAX_SELECTS = 5
+
+
+class RolePickerSelect(discord.ui.DynamicItem[discord.ui.Select], template=r"sakuraria:role_picker:(?P<page>\d+)"):
+    """リアクションの代わりにロールを選ぶ選択メニュー
+
+    custom_id が固定のため、再起動後もメッセージに残っている選択メニューの操作を受け取れる。
+    選択肢の値はリアクションロールの設定の絵文字の代わりに記録され、索引から付与先のロールを引く。
+    """
+
+    def __init__(self, item: discord.ui.Select, page: int):
+        super().__init__(item)
+        self.page = page
+
+    @classmethod
+    async def from_custom_id(cls, interaction: discord.Interaction, item: discord.ui.Select, match):
+        return cls(item, int(match["page"]))
+
+    async def callback(self, interaction: discord.Interaction) -> None:
+        cog = interaction.client.get_cog("ReactionRoles")
+        if cog is None:
+            await interaction.response.send_message("❌ 現在ロールを選択できません。", ephemeral=True)
+            return
+        await cog.apply_role_picker_choice(
+            interaction,
+            values=interaction.data.get("values", []),
+            scope=[option.value for option in self.item.options]
+        )
+
+
+def build_role_picker_view(role_values: Dict[str, str], multiple: bool) -> discord.ui.View:
+    """ロール名 → 選択肢の値 の対応から、選択メニューを並べたビューを作る（1つ25件ずつ）"""
+    items = list(role_values.items())
+    pages: List[List] = [items[i:i + OPTIONS_PER_SELECT] for i in range(0, len(items), OPTIONS_PER_SELECT)]
+    if len(pages) > MAX_SELECTS:
+        raise Exception(f"選択メニューで選べるロールは{OPTIONS_PER_SELECT * MAX_SELECTS}個までです。")
+
+    view = discord.ui.View(timeout=None)
+    for page, options in enumerate(pages):
+        first, last = options[0][0], options[-1][0]
+        select = discord.ui.Select(
+            custom_id=f"sakuraria:role_picker:{page}",
+            placeholder=f"{first} 〜 {last}" if len(pages) > 1 else "ロールを選択してください",
+            # 0件にすると選択を解除できる
+            min_values=0,
+            max_values=len(options) if multiple else 1,
+            options=[discord.SelectOption(label=role_name, value=value) for role_name, value in options]
+        )
+        view.add_item(RolePickerSelect(select, page))
+    return view
@@ -0,0 +1,58 @@
+import csv
+import io
+import re
+from typing import Dict, Iterable, List, Optional, Tuple
+
+import discord
+
+# メンション（<@123> / <@!123>）またはユーザーID
+MEMBER_ID_PATTERN = re.compile(r"^<@!?(\d{15,20})>$|^(\d{15,20})$")
+# メンションの一覧から取り出すときの区切り
+MENTION_PATTERN = re.compile(r"<@!?\d{15,20}>|\d{15,20}")
+
+
+def parse_roster_file(data: bytes) -> List[str]:
+    """アップロードされた CSV / テキストファイルから、メンバーを表す値（ID・名前）を取り出す
+
+    CSV の場合はセルごと、テキストの場合は行ごとに1件として扱う。
+    """
+    text = data.decode("utf-8-sig", errors="replace")
+    tokens = []
+    for row in csv.reader(io.StringIO(text)):
+        for cell in row:
+            cell = cell.strip()
+            if cell:
+                tokens.append(cell)
+    return tokens
+
+
+def parse_mentions(text: str) -> List[str]:
+    """メンション・IDを並べた文字列から値を取り出す"""
+    return MENTION_PATTERN.findall(text or "")
+
+
+def resolve_members(guild: discord.Guild, tokens: Iterable[str]) -> Tuple[List[discord.Member], List[str]]:
+    """ID・メンション・ユーザー名・表示名からメンバーを引く（重複は除き、見つからなかった値も返す）
+
+    名前で引く場合は一覧を1回だけ作るため、メンバー数によらず1件あたり O(1) で引ける。
+    """
+    by_name: Optional[Dict[str, discord.Member]] = None
+    members: Dict[int, discord.Member] = {}
+    unresolved = []
+    for token in tokens:
+        match = MEMBER_ID_PATTERN.match(token)
+        member = guild.get_member(int(match.group(1) or match.group(2))) if match else None
+        if member is None and not match:
+            if by_name is None:
+                # 表示名よりユーザー名を優先する
+                by_name = {}
+                for candidate in guild.members:
+                    by_name.setdefault(candidate.display_name, candidate)
+                for candidate in guild.members:
+                    by_name[candidate.name] = candidate
+            member = by_name.get(token.lstrip("@"))
+        if member is None:
+            unresolved.append(token)
+        else:
+            members.setdefault(member.id, member)
+    return list(members.values()), unresolved
@@ -0,0 +1,116 @@
+import asyncio
+import time
+from collections import Counter
+from typing import Any, Dict, Optional
+
+import discord
+
+try:
+    import resource
+except ImportError:  # Windows
+    resource = None
+
+
+def build_intents(profile: Dict) -> discord.Intents:
+    """プロファイルのインテントを作る（既定のインテントに対して有効・無効を上書きする）"""
+    intents = discord.Intents.default()
+    for name, enabled in profile["intents"].items():
+        setattr(intents, name, enabled)
+    return intents
+
+
+def build_member_cache_flags(profile: Dict, intents: discord.Intents) -> discord.MemberCacheFlags:
+    """プロファイルのメンバーキャッシュの設定を作る（"intents" ならインテントで可能な範囲すべてをキャッシュする）"""
+    if profile["member_cache"] == "intents":
+        return discord.MemberCacheFlags.from_intents(intents)
+    flags = discord.MemberCacheFlags.none()
+    for name in profile["member_cache"]:
+        setattr(flags, name, True)
+    return flags
+
+
+def client_options(profile: Dict, gateway_stats: bool = False) -> Dict[str, Any]:
+    """プロファイルから Bot に渡す引数を作る"""
+    intents = build_intents(profile)
+    return {
+        "intents": intents,
+        "member_cache_flags": build_member_cache_flags(profile, intents),
+        "max_messages": profile["max_messages"],
+        "chunk_guilds_at_startup": profile["chunk_guilds_at_startup"],
+        # ゲートウェイの受信量を数えるために生の受信イベントを有効にする
+        "enable_debug_events": gateway_stats
+    }
+
+
+def memory_usage_mb() -> Optional[float]:
+    """プロセスの常駐メモリ（MB）を返す（取得できない環境では None）"""
+    try:
+        # Linux では現在の常駐メモリを /proc から読む
+        with open("/proc/self/statm") as f:
+            pages = int(f.read().split()[1])
+        return pages * resource.getpagesize() / (1024 * 1024)
+    except (OSError, AttributeError, ValueError, IndexError):
+        pass
+    if resource is None:
+        return None
+    # それ以外では最大常駐メモリで代用する（macOS はバイト、Linux はKB単位）
+    peak = resource.getrusage(resource.RUSAGE_SELF).ru_maxrss
+    return peak / (1024 * 1024) if peak > 1 << 30 else peak / 1024
+
+
+class GatewayStats:
+    """ゲートウェイから受信したバイト数とイベントの種類ごとの件数を数える"""
+
+    def __init__(self):
+        self.started = time.monotonic()
+        self.bytes = 0
+        self.messages = 0
+        self.events: Counter = Counter()
+
+    def received(self, message) -> None:
+        self.messages += 1
+        # 展開後のペイロードは文字列で届くため、文字数ではなく UTF-8 のバイト数を数える
+        self.bytes += len(message.encode("utf-8")) if isinstance(message, str) else len(message)
+
+    def event(self, event_type: str) -> None:
+        self.events[event_type] += 1
+
+    def snapshot(self) -> Dict[str, Any]:
+        return {"time": time.monotonic(), "bytes": self.bytes, "messages": self.messages, "events": Counter(self.events)}
+
+
+def format_bytes(size: float) -> str:
+    """バイト数を読みやすい単位で表す"""
+    for unit in ("B", "KB", "MB"):
+        if size < 1024:
+            return f"{size:.1f}{unit}"
+        size /= 1024
+    return f"{size:.1f}GB"
+
+
+# 起動時のメンバー一覧の読み込みを行わない場合に、必要になったときだけサーバーごとに読み込む
+_chunk_locks: Dict[int, asyncio.Lock] = {}
+
+
+async def ensure_members_loaded(guild: discord.Guild) -> None:
+    """サーバーの全メンバーをキャッシュに読み込む（読み込み済みなら何もしない）"""
+    if guild.chunked:
+        return
+    lock = _chunk_locks.setdefault(guild.id, asyncio.Lock())
+    async with lock:
+        if guild.chunked:
+            return
+        started = time.perf_counter()
+        members = await guild.chunk(cache=True)
+        print(f"{guild.name} のメンバー一覧を読み込みました: {len(members)}人（{time.perf_counter() - started:.1f}秒）")
+
+
+async def get_or_fetch_member(guild: discord.Guild, user_id: int) -> Optional[discord.Member]:
+    """メンバーをキャッシュから取得し、なければAPIから取得する（サーバーにいなければ None）"""
+    member = guild.get_member(user_id)
+    if member is not None:
+        return member
+    try:
+        return await guild.fetch_member(user_id)
+    except discord.NotFound:
+        return None
@@ -0,0 +1,252 @@
+from typing import Any, Dict, List, NamedTuple, Optional
+
+import discord
+
+from utils.helpers import get_category_by_name, get_role_by_name, get_text_channel_by_name
+from utils.provisioning import ProvisioningScheduler
+from config.settings import ARCHIVE_SETTINGS
+
+# 権限の上書き設定：ロール名（@everyone は既定ロール）→ PermissionOverwrite に渡す値
+OverwriteSpec = Dict[str, Dict[str, bool]]
+
+DEFAULT_ROLE_KEY = "@everyone"
+
+
+# slot は期の中での役割（student / staff / chat など）、class_number は期全体のものなら0
+class RoleSpec(NamedTuple):
+    name: str
+    color: discord.Color
+    hoist: bool
+    slot: str = ""
+    class_number: int = 0
+
+
+class CategorySpec(NamedTuple):
+    name: str
+    overwrites: OverwriteSpec
+    slot: str = ""
+
+
+class ChannelSpec(NamedTuple):
+    name: str
+    category: str
+    overwrites: OverwriteSpec
+    position: int
+    slot: str = ""
+    class_number: int = 0
+
+
+class SeasonLayout(NamedTuple):
+    """1つの期に必要なロール・カテゴリ・チャンネルの構成"""
+    semester: int
+    class_count: int
+    roles: List[RoleSpec]
+    categories: List[CategorySpec]
+    channels: List[ChannelSpec]
+
+
+class LayoutChange(NamedTuple):
+    """構成と実際のサーバーとの差分1件"""
+    action: str          # "create" または "update"
+    kind: str            # "role" / "category" / "channel"
+    spec: Any
+    target: Any = None   # 更新対象の既存オブジェクト
+    detail: str = ""
+
+    @property
+    def key(self) -> str:
+        return f"{self.kind}:{self.spec.name}"
+
+
+def build_season_layout(semester: int, class_count: int) -> SeasonLayout:
+    """指定した学期の構成を組み立てる"""
+    roles = [
+        RoleSpec(f"{semester}期生", discord.Color.blue(), False, "student"),
+        RoleSpec(f"{semester}期職員", discord.Color.green(), False, "staff")
+    ]
+    for i in range(1, class_count + 1):
+        roles.append(RoleSpec(f"{semester}-{i}生徒", discord.Color.blue(), True, "student", i))
+        roles.append(RoleSpec(f"{semester}-{i}職員", discord.Color.green(), False, "staff", i))
+
+    teacher_category = f"👨‍🏫 {semester}期職員"
+    student_category = f"👨‍🎓 {semester}期生徒"
+    categories = [
+        CategorySpec(teacher_category, {
+            DEFAULT_ROLE_KEY: {"view_channel": False},
+            f"{semester}期職員": {"view_channel": True}
+        }, "staff"),
+        CategorySpec(student_category, {}, "student")
+    ]
+
+    channels = [
+        ChannelSpec(f"📗📢｜{semester}期連絡", student_category, {
+            DEFAULT_ROLE_KEY: {"view_channel": False},
+            f"{semester}期生": {"view_channel": True},
+            f"{semester}期職員": {"view_channel": True}
+        }, 0, "notice")
+    ]
+    for i in range(1, class_count + 1):
+        channels.append(ChannelSpec(f"📗📝｜{semester}-{i}教員", teacher_category, {}, i - 1, "staff", i))
+    for i in range(1, class_count + 1):
+        overwrites_class_channel = {
+            DEFAULT_ROLE_KEY: {"view_channel": False},
+            f"{semester}-{i}生徒": {"view_channel": True, "send_messages": True},
+            f"{semester}期職員": {"view_channel": True, "send_messages": True}
+        }
+        class_channels = (
+            (f"📗💬｜{semester}-{i}雑談", "chat"),
+            (f"📗📸｜{semester}-{i}写真", "photo"),
+            (f"📗📢｜{semester}-{i}連絡", "notice")
+        )
+        for offset, (name, slot) in enumerate(class_channels):
+            channels.append(ChannelSpec(name, student_category, overwrites_class_channel, 3 * (i - 1) + offset + 1, slot, i))
+
+    return SeasonLayout(semester, class_count, roles, categories, channels)
+
+
+def build_archive_category_spec(semester: int, index: int = 0, staff: bool = False) -> CategorySpec:
+    """OB移行したチャンネルを入れるアーカイブカテゴリ（閲覧のみ）。index は2つ目以降のカテゴリの番号
+
+    教員用チャンネルのカテゴリ（staff=True）は期職員だけが、生徒用のカテゴリは期生・期職員が閲覧できる。
+    """
+    name = ARCHIVE_SETTINGS["staff_category_name" if staff else "category_name"].format(semester=semester)
+    overwrites = {
+        DEFAULT_ROLE_KEY: {"view_channel": False},
+        f"{semester}期職員": {"view_channel": True, "send_messages": False}
+    }
+    if not staff:
+        overwrites[f"{semester}期生"] = {"view_channel": True, "send_messages": False}
+    slot = "archive_staff" if staff else "archive"
+    return CategorySpec(f"{name} {index + 1}" if index else name, overwrites, f"{slot}{index + 1}" if index else slot)
+
+
+def read_only_overwrites(guild: discord.Guild, overwrites: Dict) -> Dict:
+    """チャンネルの権限の上書きを、閲覧できる範囲はそのままに発言だけできないようにしたものにする"""
+    return {
+        target: discord.PermissionOverwrite(**{**dict(overwrite), "send_messages": False, "send_messages_in_threads": False})
+        for target, overwrite in {guild.default_role: discord.PermissionOverwrite(), **overwrites}.items()
+    }
+
+
+def find_channel(guild: discord.Guild, name: str) -> Optional[discord.TextChannel]:
+    """チャンネルを名前で取得する（OB移行後の📙の名前にも対応）"""
+    return get_text_channel_by_name(guild, name) or get_text_channel_by_name(guild, name.replace("📗", "📙", 1))
+
+
+def resolve_overwrites(guild: discord.Guild, spec: OverwriteSpec, values: Dict[str, Any]) -> Dict:
+    """権限の上書き設定を実際のロールに対応付ける（予約済みのロールは作成結果を使う）"""
+    overwrites = {}
+    for role_name, permissions in spec.items():
+        if role_name == DEFAULT_ROLE_KEY:
+            role = guild.default_role
+        else:
+            role = values.get(f"role:{role_name}") or get_role_by_name(guild, role_name)
+        if role:
+            overwrites[role] = discord.PermissionOverwrite(**permissions)
+    return overwrites
+
+
+def _overwrites_match(guild: discord.Guild, current: Dict, spec: OverwriteSpec) -> bool:
+    desired = resolve_overwrites(guild, spec, {})
+    if len(desired) != len(spec):
+        # 参照しているロールが見つからない
+        return False
+    return all(current.get(target) == overwrite for target, overwrite in desired.items())
+
+
+def diff_season_layout(guild: discord.Guild, layout: SeasonLayout, archived: bool = False) -> List[LayoutChange]:
+    """構成とサーバーのキャッシュを比べ、作成・更新が必要なものを一覧にする（APIは呼ばない）
+
+    archived=True（チャンネルをアーカイブカテゴリへ移した期）の場合はロールだけを比べ、
+    カテゴリ・チャンネルを元の構成に戻さない。
+    """
+    changes = []
+    for spec in layout.roles:
+        role = get_role_by_name(guild, spec.name)
+        if not role:
+            changes.append(LayoutChange("create", "role", spec))
+        elif role.color != spec.color or role.hoist != spec.hoist:
+            changes.append(LayoutChange("update", "role", spec, role, "色・表示設定"))
+    if archived:
+        return changes
+
+    for spec in layout.categories:
+        category = get_category_by_name(guild, spec.name)
+        if not category:
+            changes.append(LayoutChange("create", "category", spec))
+        elif not _overwrites_match(guild, category.overwrites, spec.overwrites):
+            changes.append(LayoutChange("update", "category", spec, category, "権限"))
+
+    for spec in layout.channels:
+        channel = find_channel(guild, spec.name)
+        if not channel:
+            changes.append(LayoutChange("create", "channel", spec))
+            continue
+        drifted = []
+        category = get_category_by_name(guild, spec.category)
+        if not category or channel.category_id != category.id:
+            drifted.append("カテゴリ")
+        if spec.overwrites and not _overwrites_match(guild, channel.overwrites, spec.overwrites):
+            drifted.append("権限")
+        if drifted:
+            changes.append(LayoutChange("update", "channel", spec, channel, "・".join(drifted)))
+    return changes
+
+
+def schedule_changes(scheduler: ProvisioningScheduler, guild: discord.Guild, changes: List[LayoutChange]) -> None:
+    """差分をスケジューラーに登録する（ロール → カテゴリ → チャンネルの依存関係つき）"""
+    order = {"role": 0, "category": 1, "channel": 2}
+    for change in sorted(changes, key=lambda change: order[change.kind]):
+        spec = change.spec
+        role_keys = [f"role:{role_name}" for role_name in spec.overwrites if role_name != DEFAULT_ROLE_KEY] if change.kind != "role" else []
+        category_keys = [f"category:{spec.category}"] if change.kind == "channel" else []
+        depends_on = scheduler.registered(*role_keys, *category_keys)
+        route = "roles" if change.kind == "role" else "channels"
+        if change.action == "update":
+            route = f"{route}:update"
+        scheduler.add(change.key, route, _change_factory(guild, change), depends_on=depends_on)
+
+
+def _change_factory(guild: discord.Guild, change: LayoutChange):
+    spec = change.spec
+
+    def category_of(values):
+        return values.get(f"category:{spec.category}") or get_category_by_name(guild, spec.category)
+
+    async def apply(values):
+        if change.kind == "role":
+            if change.action == "create":
+                return await guild.create_role(name=spec.name, color=spec.color, hoist=spec.hoist)
+            await change.target.edit(color=spec.color, hoist=spec.hoist)
+            return change.target
+        overwrites = resolve_overwrites(guild, spec.overwrites, values)
+        if change.kind == "category":
+            if change.action == "create":
+                return await guild.create_category(spec.name, overwrites=overwrites)
+            await change.target.edit(overwrites=overwrites)
+            return change.target
+        if change.action == "create":
+            return await guild.create_text_channel(
+                name=spec.name,
+                category=category_of(values),
+                overwrites=overwrites,
+                position=spec.position
+            )
+        fields = {"category": category_of(values)}
+        if spec.overwrites:
+            fields["overwrites"] = overwrites
+        await change.target.edit(**fields)
+        return change.target
+
+    return apply
+
+
+def describe_changes(changes: List[LayoutChange]) -> str:
+    """差分を一覧表示用の文字列にする"""
+    labels = {"role": "👥 ロール", "category": "📁 カテゴリ", "channel": "💬 チャンネル"}
+    lines = []
+    for change in changes:
+        mark = "＋" if change.action == "create" else "～"
+        detail = f"（{change.detail}）" if change.detail else ""
+        lines.append(f"{mark} {labels[change.kind]} {change.spec.name}{detail}")
+    return "\n".join(lines)
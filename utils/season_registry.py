@@ -0,0 +1,223 @@
+import asyncio
+import copy
+from typing import Any, Dict, Iterator, List, NamedTuple, Optional, Tuple
+
+import discord
+
+from utils.helpers import get_category_by_name, get_role_by_name
+from utils.season_layout import SeasonLayout, build_season_layout, find_channel
+
+# 構成が記録されていない期を名前から探すときに確認するクラス数の上限
+DISCOVERY_MAX_CLASSES = 9
+
+
+class SeasonRole(NamedTuple):
+    """期のロール1つが期の中でどの役割か"""
+    guild_id: int
+    semester: int
+    class_number: int  # 期全体のロールなら0
+    slot: str          # student / staff
+
+
+def empty_season(guild_id: int, semester: int) -> Dict:
+    """空の期の構成を作る"""
+    return {
+        "guild_id": guild_id,
+        "semester": semester,
+        "class_count": 0,
+        "roles": {},
+        "categories": {},
+        "channels": {},
+        "classes": {},
+        "reaction_messages": {}
+    }
+
+
+def season_role_ids(season: Dict) -> Iterator[int]:
+    """期のロールのID（期全体 → クラスごとの順）"""
+    yield from season["roles"].values()
+    for class_entry in season["classes"].values():
+        yield from class_entry["roles"].values()
+
+
+def is_archived(season: Dict) -> bool:
+    """OB移行でチャンネルをアーカイブカテゴリへ移した期か（アーカイブカテゴリの記録で判断する）"""
+    return any(slot.startswith("archive") for slot in season["categories"])
+
+
+def season_channel_ids(season: Dict) -> Iterator[int]:
+    """期のテキストチャンネルのID（期全体 → クラスごとの順）"""
+    yield from season["channels"].values()
+    for class_entry in season["classes"].values():
+        yield from class_entry["channels"].values()
+
+
+class SeasonRegistry:
+    """期ごとのロール・カテゴリ・チャンネル・リアクションロールメッセージをIDで記録する
+
+    期の作成時に作成したもののIDを記録してストアに保存し、OB移行・削除・リアクションの処理では
+    チャンネル名の部分一致ではなくこの記録から対象を引く。
+    """
+
+    def __init__(self, store):
+        self.store = store
+        self._seasons: Dict[Tuple[int, int], Dict] = {}
+        self._roles: Dict[int, SeasonRole] = {}
+        self._loaded = False
+        self._load_lock = asyncio.Lock()
+
+    async def load(self) -> None:
+        """記録をストアから読み込む（プロセスにつき1回だけ）"""
+        async with self._load_lock:
+            if self._loaded:
+                return
+            for season in await self.store.load_seasons():
+                self._set(season)
+            self._loaded = True
+            print(f"期の構成を読み込みました: {len(self._seasons)}件")
+
+    def get(self, guild_id: int, semester: int) -> Optional[Dict]:
+        """記録されている期の構成を返す"""
+        return self._seasons.get((guild_id, semester))
+
+    def semesters(self, guild_id: int) -> List[int]:
+        """サーバーで記録されている学期の一覧"""
+        return sorted(semester for (season_guild_id, semester) in self._seasons if season_guild_id == guild_id)
+
+    def season_role(self, role_id: int) -> Optional[SeasonRole]:
+        """ロールが期のどの役割かを返す"""
+        return self._roles.get(role_id)
+
+    def parent_role_id(self, role_id: int) -> Optional[int]:
+        """クラスロールの親ロール（期生・期職員）のIDを返す"""
+        season_role = self._roles.get(role_id)
+        if not season_role or not season_role.class_number:
+            return None
+        return self._seasons[(season_role.guild_id, season_role.semester)]["roles"].get(season_role.slot)
+
+    async def record(
+        self,
+        guild: discord.Guild,
+        layout: SeasonLayout,
+        values: Optional[Dict[str, Any]] = None,
+        merge: bool = False
+    ) -> Dict:
+        """構成に含まれるもののIDを記録する（作成結果を優先し、なければ名前で探す）
+
+        merge=True の場合は作成結果の分だけを既存の記録に追加する（個別の作成コマンド用）。
+        """
+        values = values or {}
+        season = copy.deepcopy(self._seasons.get((guild.id, layout.semester)) or empty_season(guild.id, layout.semester))
+        if merge:
+            season["class_count"] = max(season["class_count"], layout.class_count)
+        else:
+            season.update(roles={}, categories={}, channels={}, classes={}, class_count=layout.class_count)
+
+        def entry(class_number: int) -> Dict:
+            if not class_number:
+                return season
+            return season["classes"].setdefault(str(class_number), {"roles": {}, "channels": {}})
+
+        def resolve(key: str, lookup):
+            if key in values or merge:
+                return values.get(key)
+            return lookup()
+
+        for spec in layout.roles:
+            role = resolve(f"role:{spec.name}", lambda: get_role_by_name(guild, spec.name))
+            if role:
+                entry(spec.class_number)["roles"][spec.slot] = role.id
+        for spec in layout.categories:
+            category = resolve(f"category:{spec.name}", lambda: get_category_by_name(guild, spec.name))
+            if category:
+                season["categories"][spec.slot] = category.id
+        for spec in layout.channels:
+            channel = resolve(f"channel:{spec.name}", lambda: find_channel(guild, spec.name))
+            if channel:
+                entry(spec.class_number)["channels"][spec.slot] = channel.id
+
+        await self._save(season)
+        return season
+
+    async def record_categories(self, guild_id: int, semester: int, categories: Dict[str, int]) -> None:
+        """カテゴリを追加で記録する（アーカイブカテゴリなど。期の削除で一緒に削除される）"""
+        season = copy.deepcopy(self._seasons.get((guild_id, semester)) or empty_season(guild_id, semester))
+        season["categories"].update(categories)
+        await self._save(season)
+
+    async def forget_categories(self, guild_id: int, semester: int, slots: List[str]) -> None:
+        """削除したカテゴリを記録から消す"""
+        season = self._seasons.get((guild_id, semester))
+        if not season or not any(slot in season["categories"] for slot in slots):
+            return
+        season = copy.deepcopy(season)
+        for slot in slots:
+            season["categories"].pop(slot, None)
+        await self._save(season)
+
+    async def record_reaction_message(self, guild_id: int, semester: int, kind: str, channel_id: int, message_id: int) -> None:
+        """リアクションロールメッセージを記録する"""
+        season = copy.deepcopy(self._seasons.get((guild_id, semester)) or empty_season(guild_id, semester))
+        season["reaction_messages"][kind] = {"channel_id": channel_id, "message_id": message_id}
+        await self._save(season)
+
+    async def forget_reaction_message(self, guild_id: int, message_id: int) -> None:
+        """削除されたリアクションロールメッセージを記録から消す"""
+        for (season_guild_id, _), season in list(self._seasons.items()):
+            if season_guild_id != guild_id:
+                continue
+            kinds = [kind for kind, recorded in season["reaction_messages"].items() if recorded["message_id"] == message_id]
+            if kinds:
+                season = copy.deepcopy(season)
+                for kind in kinds:
+                    del season["reaction_messages"][kind]
+                await self._save(season)
+
+    async def topology(self, guild: discord.Guild, semester: int) -> Optional[Dict]:
+        """期の構成を返す
+
+        ロールが記録されていない期（記録を始める前に作成した期など）は名前から探して記録する。
+        見つからなければ None を返す。
+        """
+        season = self._seasons.get((guild.id, semester))
+        if season and season["roles"]:
+            return season
+        # 名前で見つかったクラスの数から構成を組み立てる
+        probe = build_season_layout(semester, DISCOVERY_MAX_CLASSES)
+        class_count = max(
+            [spec.class_number for spec in probe.roles if get_role_by_name(guild, spec.name)]
+            + [spec.class_number for spec in probe.channels if find_channel(guild, spec.name)]
+            + [0]
+        )
+        season = await self.record(guild, build_season_layout(semester, class_count))
+        if not season["roles"] and not season["categories"] and not season["channels"] and not season["reaction_messages"]:
+            await self.remove(guild.id, semester)
+            return None
+        return season
+
+    async def remove(self, guild_id: int, semester: int) -> None:
+        """期の記録を削除する"""
+        season = self._seasons.pop((guild_id, semester), None)
+        if season:
+            self._drop_roles(season)
+        await self.store.delete_season(guild_id, semester)
+
+    async def _save(self, season: Dict) -> None:
+        self._set(season)
+        await self.store.save_season(season)
+
+    def _set(self, season: Dict) -> None:
+        key = (season["guild_id"], season["semester"])
+        previous = self._seasons.get(key)
+        if previous:
+            self._drop_roles(previous)
+        self._seasons[key] = season
+        for slot, role_id in season["roles"].items():
+            self._roles[role_id] = SeasonRole(season["guild_id"], season["semester"], 0, slot)
+        for class_number, class_entry in season["classes"].items():
+            for slot, role_id in class_entry["roles"].items():
+                self._roles[role_id] = SeasonRole(season["guild_id"], season["semester"], int(class_number), slot)
+
+    def _drop_roles(self, season: Dict) -> None:
+        for role_id in season_role_ids(season):
+            self._roles.pop(role_id, None)
@@ -0,0 +1,42 @@
+import time
+from contextlib import contextmanager
+from typing import List, Optional, Tuple
+
+
+class StartupTimer:
+    """起動の各段階（拡張機能の読み込み・ログイン・キャッシュの準備・コマンドの同期）にかかった時間を記録する"""
+
+    def __init__(self):
+        self.started = time.perf_counter()
+        self.phases: List[Tuple[str, float]] = []
+        self._current: Optional[Tuple[str, float]] = None
+
+    def begin(self, name: str) -> None:
+        """段階を開始する（前の段階が続いていれば終了する）"""
+        self.end()
+        self._current = (name, time.perf_counter())
+
+    def end(self) -> None:
+        """続いている段階を終了して記録する"""
+        if self._current is None:
+            return
+        name, started = self._current
+        self._current = None
+        elapsed = time.perf_counter() - started
+        self.phases.append((name, elapsed))
+        print(f"起動: {name} {elapsed:.2f}秒")
+
+    @contextmanager
+    def phase(self, name: str):
+        """with 文の中を1つの段階として記録する"""
+        self.begin(name)
+        try:
+            yield
+        finally:
+            self.end()
+
+    def summary(self) -> str:
+        """記録した段階と合計時間の一覧"""
+        lines = [f"- {name}: {elapsed:.2f}秒" for name, elapsed in self.phases]
+        lines.append(f"- 合計: {time.perf_counter() - self.started:.2f}秒")
+        return "\n".join(lines)
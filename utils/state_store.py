@@ -0,0 +1,392 @@
+import abc
+import asyncio
+import copy
+import json
+import os
+import sqlite3
+from concurrent.futures import ThreadPoolExecutor
+from typing import Callable, Dict, List, Optional
+
+from config.settings import STATE_STORE_SETTINGS
+
+# スキーマの変更履歴（PRAGMA user_version の値に対応して順に適用する）
+SQLITE_MIGRATIONS = [
+    """
+    CREATE TABLE IF NOT EXISTS reaction_roles (
+        message_id INTEGER PRIMARY KEY,
+        data TEXT NOT NULL
+    )
+    """,
+    """
+    CREATE TABLE IF NOT EXISTS jobs (
+        job_id TEXT PRIMARY KEY,
+        guild_id INTEGER,
+        status TEXT NOT NULL,
+        updated_at REAL NOT NULL,
+        data TEXT NOT NULL
+    );
+    CREATE INDEX IF NOT EXISTS jobs_status ON jobs (status);
+    CREATE INDEX IF NOT EXISTS jobs_guild ON jobs (guild_id, updated_at);
+    """,
+    """
+    CREATE TABLE IF NOT EXISTS seasons (
+        guild_id INTEGER NOT NULL,
+        semester INTEGER NOT NULL,
+        data TEXT NOT NULL,
+        PRIMARY KEY (guild_id, semester)
+    )
+    """,
+    """
+    CREATE TABLE IF NOT EXISTS meta (
+        key TEXT PRIMARY KEY,
+        data TEXT NOT NULL
+    )
+    """,
+]
+
+
+class StateStore(abc.ABC):
+    """Botの状態（リアクションロールの設定・バックグラウンドジョブ・期の構成・コマンドの同期結果）を保存するストアの基底クラス
+
+    ファイルへの書き込みはすべてイベントループの外で行う。
+    """
+
+    def __init__(self):
+        # 書き込み順を保つため専用のスレッド1つで処理する
+        self._executor = ThreadPoolExecutor(max_workers=1, thread_name_prefix="state-store")
+
+    async def _run(self, func: Callable, *args):
+        loop = asyncio.get_running_loop()
+        return await loop.run_in_executor(self._executor, func, *args)
+
+    @abc.abstractmethod
+    async def load_reaction_roles(self) -> Dict[int, Dict]:
+        """保存されているリアクションロールの設定をすべて読み込む"""
+        ...
+
+    @abc.abstractmethod
+    async def save_reaction_role(self, message_id: int, data: Dict) -> None:
+        """リアクションロールの設定を1件保存する"""
+        ...
+
+    @abc.abstractmethod
+    async def delete_reaction_role(self, message_id: int) -> None:
+        """リアクションロールの設定を1件削除する"""
+        ...
+
+    @abc.abstractmethod
+    async def save_job(self, job: Dict) -> None:
+        """バックグラウンドジョブの状態を1件保存する"""
+        ...
+
+    @abc.abstractmethod
+    async def load_jobs(self, status: Optional[str] = None, guild_id: Optional[int] = None, limit: Optional[int] = None) -> List[Dict]:
+        """バックグラウンドジョブの状態を新しい順に読み込む"""
+        ...
+
+    @abc.abstractmethod
+    async def load_job(self, job_id: str) -> Optional[Dict]:
+        """バックグラウンドジョブの状態をIDで読み込む"""
+        ...
+
+    @abc.abstractmethod
+    async def load_seasons(self) -> List[Dict]:
+        """記録されている期の構成をすべて読み込む"""
+        ...
+
+    @abc.abstractmethod
+    async def save_season(self, season: Dict) -> None:
+        """期の構成を1件保存する（guild_id と semester で区別する）"""
+        ...
+
+    @abc.abstractmethod
+    async def delete_season(self, guild_id: int, semester: int) -> None:
+        """期の構成を1件削除する"""
+        ...
+
+    @abc.abstractmethod
+    async def load_meta(self, key: str) -> Optional[Dict]:
+        """Bot自体の状態（コマンドの同期結果など）をキーで読み込む"""
+        ...
+
+    @abc.abstractmethod
+    async def save_meta(self, key: str, value: Dict) -> None:
+        """Bot自体の状態をキーで保存する"""
+        ...
+
+    async def close(self) -> None:
+        """ストアを閉じる"""
+        await self._run(self._close)
+        self._executor.shutdown(wait=True)
+
+    def _close(self) -> None:
+        pass
+
+
+class SQLiteStateStore(StateStore):
+    """SQLite（WALモード）を使うストア。変更のあった行だけを書き込む"""
+
+    def __init__(self, path: str, legacy_json_path: Optional[str] = None):
+        super().__init__()
+        self.path = path
+        self.legacy_json_path = legacy_json_path
+        self._conn: Optional[sqlite3.Connection] = None
+
+    def _connection(self) -> sqlite3.Connection:
+        if self._conn is None:
+            conn = sqlite3.connect(self.path)
+            conn.execute("PRAGMA journal_mode=WAL")
+            conn.execute("PRAGMA synchronous=NORMAL")
+            self._migrate(conn)
+            self._conn = conn
+            self._import_legacy_json()
+        return self._conn
+
+    def _migrate(self, conn: sqlite3.Connection) -> None:
+        version = conn.execute("PRAGMA user_version").fetchone()[0]
+        for index, statement in enumerate(SQLITE_MIGRATIONS[version:], start=version + 1):
+            with conn:
+                conn.executescript(statement)
+                conn.execute(f"PRAGMA user_version = {index}")
+
+    def _import_legacy_json(self) -> None:
+        """旧形式の reaction_roles.json があれば初回起動時に取り込む"""
+        if not self.legacy_json_path or not os.path.exists(self.legacy_json_path):
+            return
+        if self._conn.execute("SELECT 1 FROM reaction_roles LIMIT 1").fetchone():
+            return
+        with open(self.legacy_json_path, 'r', encoding='utf-8') as f:
+            legacy = json.load(f)
+        with self._conn:
+            self._conn.executemany(
+                "INSERT OR REPLACE INTO reaction_roles (message_id, data) VALUES (?, ?)",
+                [(int(message_id), json.dumps(data, ensure_ascii=False)) for message_id, data in legacy.items()]
+            )
+        os.replace(self.legacy_json_path, self.legacy_json_path + ".migrated")
+        print(f"{self.legacy_json_path} からリアクションロールの設定を移行しました: {len(legacy)}件")
+
+    def _load_reaction_roles(self) -> Dict[int, Dict]:
+        rows = self._connection().execute("SELECT message_id, data FROM reaction_roles").fetchall()
+        return {message_id: json.loads(data) for message_id, data in rows}
+
+    def _save_reaction_role(self, message_id: int, data: Dict) -> None:
+        conn = self._connection()
+        with conn:
+            conn.execute(
+                "INSERT OR REPLACE INTO reaction_roles (message_id, data) VALUES (?, ?)",
+                (message_id, json.dumps(data, ensure_ascii=False))
+            )
+
+    def _delete_reaction_role(self, message_id: int) -> None:
+        conn = self._connection()
+        with conn:
+            conn.execute("DELETE FROM reaction_roles WHERE message_id = ?", (message_id,))
+
+    def _save_job(self, job: Dict) -> None:
+        conn = self._connection()
+        with conn:
+            conn.execute(
+                "INSERT OR REPLACE INTO jobs (job_id, guild_id, status, updated_at, data) VALUES (?, ?, ?, ?, ?)",
+                (job["job_id"], job["guild_id"], job["status"], job["updated_at"], json.dumps(job, ensure_ascii=False))
+            )
+
+    def _load_jobs(self, status: Optional[str], guild_id: Optional[int], limit: Optional[int]) -> List[Dict]:
+        query = "SELECT data FROM jobs"
+        conditions, params = [], []
+        if status is not None:
+            conditions.append("status = ?")
+            params.append(status)
+        if guild_id is not None:
+            conditions.append("guild_id = ?")
+            params.append(guild_id)
+        if conditions:
+            query += " WHERE " + " AND ".join(conditions)
+        query += " ORDER BY updated_at DESC"
+        if limit is not None:
+            query += " LIMIT ?"
+            params.append(limit)
+        return [json.loads(data) for (data,) in self._connection().execute(query, params).fetchall()]
+
+    def _load_job(self, job_id: str) -> Optional[Dict]:
+        row = self._connection().execute("SELECT data FROM jobs WHERE job_id = ?", (job_id,)).fetchone()
+        return json.loads(row[0]) if row else None
+
+    def _load_seasons(self) -> List[Dict]:
+        return [json.loads(data) for (data,) in self._connection().execute("SELECT data FROM seasons").fetchall()]
+
+    def _save_season(self, season: Dict) -> None:
+        conn = self._connection()
+        with conn:
+            conn.execute(
+                "INSERT OR REPLACE INTO seasons (guild_id, semester, data) VALUES (?, ?, ?)",
+                (season["guild_id"], season["semester"], json.dumps(season, ensure_ascii=False))
+            )
+
+    def _delete_season(self, guild_id: int, semester: int) -> None:
+        conn = self._connection()
+        with conn:
+            conn.execute("DELETE FROM seasons WHERE guild_id = ? AND semester = ?", (guild_id, semester))
+
+    def _load_meta(self, key: str) -> Optional[Dict]:
+        row = self._connection().execute("SELECT data FROM meta WHERE key = ?", (key,)).fetchone()
+        return json.loads(row[0]) if row else None
+
+    def _save_meta(self, key: str, value: Dict) -> None:
+        conn = self._connection()
+        with conn:
+            conn.execute("INSERT OR REPLACE INTO meta (key, data) VALUES (?, ?)", (key, json.dumps(value, ensure_ascii=False)))
+
+    def _close(self) -> None:
+        if self._conn is not None:
+            self._conn.close()
+            self._conn = None
+
+    async def load_reaction_roles(self) -> Dict[int, Dict]:
+        return await self._run(self._load_reaction_roles)
+
+    async def save_reaction_role(self, message_id: int, data: Dict) -> None:
+        await self._run(self._save_reaction_role, message_id, data)
+
+    async def delete_reaction_role(self, message_id: int) -> None:
+        await self._run(self._delete_reaction_role, message_id)
+
+    async def save_job(self, job: Dict) -> None:
+        await self._run(self._save_job, copy.deepcopy(job))
+
+    async def load_jobs(self, status: Optional[str] = None, guild_id: Optional[int] = None, limit: Optional[int] = None) -> List[Dict]:
+        return await self._run(self._load_jobs, status, guild_id, limit)
+
+    async def load_job(self, job_id: str) -> Optional[Dict]:
+        return await self._run(self._load_job, job_id)
+
+    async def load_seasons(self) -> List[Dict]:
+        return await self._run(self._load_seasons)
+
+    async def save_season(self, season: Dict) -> None:
+        await self._run(self._save_season, copy.deepcopy(season))
+
+    async def delete_season(self, guild_id: int, semester: int) -> None:
+        await self._run(self._delete_season, guild_id, semester)
+
+    async def load_meta(self, key: str) -> Optional[Dict]:
+        return await self._run(self._load_meta, key)
+
+    async def save_meta(self, key: str, value: Dict) -> None:
+        await self._run(self._save_meta, key, copy.deepcopy(value))
+
+
+class JsonStateStore(StateStore):
+    """JSONファイルを使うストア
+
+    書き込みは一時ファイルに書いてから置き換えるため、途中で落ちても壊れたファイルは残らない。
+    """
+
+    def __init__(self, path: str):
+        super().__init__()
+        self.path = path
+        # リアクションロール以外の状態は別のファイルに保存する
+        base, _ = os.path.splitext(path)
+        self._paths = {"reaction_roles": path, "jobs": f"{base}_jobs.json", "seasons": f"{base}_seasons.json", "meta": f"{base}_meta.json"}
+        self._cache: Dict[str, Dict[str, Dict]] = {}
+
+    def _entries(self, name: str = "reaction_roles") -> Dict[str, Dict]:
+        if name not in self._cache:
+            self._cache[name] = {}
+            if os.path.exists(self._paths[name]):
+                with open(self._paths[name], 'r', encoding='utf-8') as f:
+                    self._cache[name] = json.load(f)
+        return self._cache[name]
+
+    def _write(self, name: str = "reaction_roles") -> None:
+        path = self._paths[name]
+        tmp_path = path + ".tmp"
+        with open(tmp_path, 'w', encoding='utf-8') as f:
+            json.dump(self._entries(name), f, ensure_ascii=False, indent=4)
+            f.flush()
+            os.fsync(f.fileno())
+        os.replace(tmp_path, path)
+
+    def _save_reaction_role(self, message_id: int, data: Dict) -> None:
+        self._entries()[str(message_id)] = data
+        self._write()
+
+    def _delete_reaction_role(self, message_id: int) -> None:
+        if self._entries().pop(str(message_id), None) is not None:
+            self._write()
+
+    def _save_job(self, job: Dict) -> None:
+        self._entries("jobs")[job["job_id"]] = job
+        self._write("jobs")
+
+    def _load_jobs(self, status: Optional[str], guild_id: Optional[int], limit: Optional[int]) -> List[Dict]:
+        jobs = [
+            job for job in self._entries("jobs").values()
+            if (status is None or job["status"] == status) and (guild_id is None or job["guild_id"] == guild_id)
+        ]
+        jobs.sort(key=lambda job: job["updated_at"], reverse=True)
+        return jobs[:limit] if limit is not None else jobs
+
+    def _load_job(self, job_id: str) -> Optional[Dict]:
+        return self._entries("jobs").get(job_id)
+
+    def _load_seasons(self) -> List[Dict]:
+        return list(self._entries("seasons").values())
+
+    def _save_season(self, season: Dict) -> None:
+        self._entries("seasons")[f"{season['guild_id']}:{season['semester']}"] = season
+        self._write("seasons")
+
+    def _delete_season(self, guild_id: int, semester: int) -> None:
+        if self._entries("seasons").pop(f"{guild_id}:{semester}", None) is not None:
+            self._write("seasons")
+
+    def _load_meta(self, key: str) -> Optional[Dict]:
+        return self._entries("meta").get(key)
+
+    def _save_meta(self, key: str, value: Dict) -> None:
+        self._entries("meta")[key] = value
+        self._write("meta")
+
+    async def load_reaction_roles(self) -> Dict[int, Dict]:
+        entries = await self._run(self._entries)
+        return {int(message_id): data for message_id, data in entries.items()}
+
+    async def save_reaction_role(self, message_id: int, data: Dict) -> None:
+        await self._run(self._save_reaction_role, message_id, data)
+
+    async def delete_reaction_role(self, message_id: int) -> None:
+        await self._run(self._delete_reaction_role, message_id)
+
+    async def save_job(self, job: Dict) -> None:
+        await self._run(self._save_job, copy.deepcopy(job))
+
+    async def load_jobs(self, status: Optional[str] = None, guild_id: Optional[int] = None, limit: Optional[int] = None) -> List[Dict]:
+        return await self._run(self._load_jobs, status, guild_id, limit)
+
+    async def load_job(self, job_id: str) -> Optional[Dict]:
+        return await self._run(self._load_job, job_id)
+
+    async def load_seasons(self) -> List[Dict]:
+        return await self._run(self._load_seasons)
+
+    async def save_season(self, season: Dict) -> None:
+        await self._run(self._save_season, copy.deepcopy(season))
+
+    async def delete_season(self, guild_id: int, semester: int) -> None:
+        await self._run(self._delete_season, guild_id, semester)
+
+    async def load_meta(self, key: str) -> Optional[Dict]:
+        return await self._run(self._load_meta, key)
+
+    async def save_meta(self, key: str, value: Dict) -> None:
+        await self._run(self._save_meta, key, copy.deepcopy(value))
+
+
+def create_state_store(settings: Dict = STATE_STORE_SETTINGS) -> StateStore:
+    """設定に応じたストアを作成する"""
+    backend = settings["backend"]
+    if backend == "sqlite":
+        return SQLiteStateStore(settings["path"], legacy_json_path=settings.get("legacy_json_path"))
+    if backend == "json":
+        return JsonStateStore(settings["legacy_json_path"])
+    raise ValueError(f"不明なストアの種類です: {backend}")
@@ -0,0 +1,92 @@
+from typing import Any, Awaitable, Callable, Dict, List, Optional
+
+import discord
+
+from utils.helpers import OBJECT_LABELS, delete_object_target
+from utils.provisioning import DependencyFailedError, ProvisionResult, ProvisioningScheduler
+from config.settings import TEARDOWN_SETTINGS
+
+# 削除対象の種類ごとの API の経路（レート制限の単位）
+TEARDOWN_ROUTES = {
+    "message": "messages",
+    "channel": "channels",
+    "category": "channels",
+    "role": "roles"
+}
+
+# 手順の実行方法：手順名と処理を受け取って実行する（ジョブでは完了した手順を保存する JobContext.step を渡す）
+StepRunner = Callable[[str, Callable[[], Awaitable[Any]]], Awaitable[None]]
+
+
+def target_key(target: Dict) -> str:
+    """削除対象を区別するキー（ジョブの手順名にも使う）"""
+    return f"{target['type']}:{target['id']}"
+
+
+def schedule_teardown(
+    scheduler: ProvisioningScheduler,
+    guild: discord.Guild,
+    targets: List[Dict],
+    step: Optional[StepRunner] = None
+) -> None:
+    """削除対象をスケジューラーに登録する（メッセージ → チャンネル → カテゴリの順に、子を先に削除する）"""
+    keys = {target_key(target) for target in targets}
+    children: Dict[str, List[str]] = {}
+    for target in targets:
+        if target["type"] == "message":
+            parent = f"channel:{target['channel_id']}"
+        elif target["type"] == "channel" and target.get("parent_id"):
+            parent = f"category:{target['parent_id']}"
+        else:
+            continue
+        if parent in keys:
+            children.setdefault(parent, []).append(target_key(target))
+
+    for target in targets:
+        key = target_key(target)
+        if key in scheduler:
+            continue
+        scheduler.add(key, TEARDOWN_ROUTES[target["type"]], _teardown_factory(guild, target, step), depends_on=children.get(key, []))
+
+
+def _teardown_factory(guild: discord.Guild, target: Dict, step: Optional[StepRunner]):
+    async def delete():
+        # 既に削除されている（404）場合も成功として扱う
+        await delete_object_target(guild, target)
+
+    async def apply(values):
+        if step:
+            await step(target_key(target), delete)
+        else:
+            await delete()
+
+    return apply
+
+
+def describe_teardown_failures(targets: List[Dict], results: Dict[str, ProvisionResult]) -> List[str]:
+    """削除に失敗した対象を一覧にする（子の削除に失敗したため削除しなかった親は件数だけ示す）"""
+    lines = []
+    skipped = 0
+    for target in targets:
+        result = results.get(target_key(target))
+        if not result or result.ok:
+            continue
+        if isinstance(result.error, DependencyFailedError):
+            skipped += 1
+            continue
+        lines.append(f"❌ {OBJECT_LABELS[target['type']]} {target['name']} の削除に失敗しました: {result.error}")
+    if skipped:
+        lines.append(f"⚠️ 中身の削除に失敗したため、{skipped}件のチャンネル・カテゴリを削除しませんでした。")
+    return lines
+
+
+async def run_teardown(
+    guild: discord.Guild,
+    targets: List[Dict],
+    step: Optional[StepRunner] = None,
+    on_result: Optional[Callable[[ProvisionResult], None]] = None
+) -> Dict[str, ProvisionResult]:
+    """削除対象を経路ごとの同時実行数の範囲で並行に削除し、キーごとの結果を返す"""
+    scheduler = ProvisioningScheduler.from_settings(TEARDOWN_SETTINGS)
+    schedule_teardown(scheduler, guild, targets, step)
+    return await scheduler.run(on_result)